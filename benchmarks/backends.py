@@ -0,0 +1,77 @@
+#! /usr/bin/env python3
+"""Benchmark of the backends of `Analyser.process_stays()`, run with `python -m benchmarks.backends` from the repository root."""
+
+import time
+
+import pandas as pd
+import typer
+
+from pyaki.kdigo import Analyser, Backend
+from pyaki.utils import Dataset, DatasetType
+
+
+def load_cohort(path: str, copies: int) -> list[Dataset]:
+    """
+    Build a cohort by replicating the validation data with new stay identifiers.
+
+    Parameters
+    ----------
+    path : str
+        Path to the validation data.
+    copies : int
+        Number of copies of the validation data.
+
+    Returns
+    -------
+    list[Dataset]
+        The datasets of the cohort.
+    """
+    data = pd.read_csv(path, parse_dates=["charttime"])
+    offset = data["stay_id"].max() + 1
+    data = pd.concat([data.assign(stay_id=data["stay_id"] + i * offset) for i in range(copies)])
+
+    return [
+        Dataset(DatasetType.URINEOUTPUT, data[["stay_id", "charttime", "urineoutput"]].dropna()),
+        Dataset(DatasetType.CREATININE, data[["stay_id", "charttime", "creat"]].dropna()),
+        Dataset(DatasetType.DEMOGRAPHICS, data[["stay_id", "weight"]].dropna()),
+        Dataset(DatasetType.RRT, data[["stay_id", "charttime", "rrt_status"]].dropna()),
+    ]
+
+
+def main(
+    path: str = "tests/data/validation_data.csv",
+    copies: int = 50,
+    workers: int = 8,
+    chunk_size: int = 64,
+    repeat: int = 3,
+) -> None:
+    """
+    Compare the runtime of the serial, thread pool and process pool backends.
+
+    Parameters
+    ----------
+    path : str, default: "tests/data/validation_data.csv"
+        Path to the validation data.
+    copies : int, default: 50
+        Number of copies of the validation data in the cohort.
+    workers : int, default: 8
+        Number of workers of the thread and process pools.
+    chunk_size : int, default: 64
+        Number of stays processed by a worker at once.
+    repeat : int, default: 3
+        Number of runs per backend, the best run is reported.
+    """
+    analyser = Analyser(load_cohort(path, copies))
+
+    for backend in Backend:
+        runtimes = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            analyser.process_stays(backend=backend, workers=workers, chunk_size=chunk_size)
+            runtimes.append(time.perf_counter() - start)
+
+        print(f"{backend:>10}: {min(runtimes):.2f}s")
+
+
+if __name__ == "__main__":
+    typer.run(main)
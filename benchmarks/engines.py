@@ -0,0 +1,47 @@
+#! /usr/bin/env python3
+"""Benchmark of the engines of `Analyser`, run with `python -m benchmarks.engines` from the repository root."""
+
+import time
+
+import typer
+
+from pyaki.kdigo import Analyser, Engine
+
+from .backends import load_cohort
+
+
+def main(
+    path: str = "tests/data/validation_data.csv",
+    copies: int = 50,
+    repeat: int = 3,
+) -> None:
+    """
+    Compare the runtime of preprocessing and probing with the pandas and Polars engines.
+
+    Parameters
+    ----------
+    path : str, default: "tests/data/validation_data.csv"
+        Path to the validation data.
+    copies : int, default: 50
+        Number of copies of the validation data in the cohort.
+    repeat : int, default: 3
+        Number of runs per engine, the best run is reported.
+    """
+    datasets = load_cohort(path, copies)
+
+    for engine in Engine:
+        preprocessing, probing = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            analyser = Analyser([dataset._replace(df=dataset.df.copy()) for dataset in datasets], engine=engine)
+            preprocessing.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            analyser.process_stays()
+            probing.append(time.perf_counter() - start)
+
+        print(f"{engine:>10}: preprocessing {min(preprocessing):.2f}s, probing {min(probing):.2f}s")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -5,10 +5,16 @@ This package provides a Python API and CLI tool for analysing time series to cla
 
 Modules:
 - bin: Command line interface for the pyaki package.
+- cache: On-disk cache for the results of the preprocessing.
+- duckdb_preprocessing: Preprocessing of datasets as SQL queries in an in-process DuckDB database.
 - kdigo: Implementation of the KDIGO criteria for classification of acute kidney injury.
+- partitioned: Analysis of cohorts that are partitioned by stay, e.g. with Dask.
+- polars_engine: Polars implementation of the built-in preprocessors and probes.
 - preprocessing: Preprocessing of time series data.
 - probes: Implementation of the probes for classification of acute kidney injury.
+- store: Memory-mapped on-disk storage of preprocessed datasets.
 - utils: Utility functions for the pyaki package.
+- writer: Partitioned writer for the analysis results.
 
 Usage:
 ```python
@@ -18,4 +18,7 @@ Options:
     --demographics-file        TEXT  [default: demographics.csv]
     --help                           Show this message and exit.
 ```
+
+To split a cohort between independent processes, run `pyaki-cli PATH --shard-index i --num-shards n` for every
+`i` and combine the results with `pyaki-merge PATH n`.
 """
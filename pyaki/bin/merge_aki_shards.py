@@ -0,0 +1,71 @@
+#! /usr/bin/env python3
+"""pyaki CLI tool to merge the results of cohort partitions processed by `pyaki-cli --shard-index`."""
+
+import csv
+import json
+from pathlib import Path
+
+import pandas as pd
+import typer
+
+from pyaki.bin.process_aki_stages import shard_name
+from pyaki.writer import OutputFormat, ShardWriter
+
+
+def main(path: str, num_shards: int, output_format: OutputFormat = OutputFormat.CSV) -> None:
+    """
+    CLI tool to merge the results of cohort partitions.
+
+    The results of all partitions, written by `pyaki-cli` as single files or as directories of shards, are
+    combined into a single file `aki.csv` or `aki.parquet`, ordered by stay.
+
+    Parameters
+    ----------
+    path : str
+        Path to the folder containing the results of the partitions.
+    num_shards : int
+        The number of partitions the cohort was split into.
+    output_format : OutputFormat, default: OutputFormat.CSV
+        The file format of the results of the partitions and the merged results.
+    """
+    root_dir = Path(path)
+
+    files: list[Path] = []
+    for shard_index in range(num_shards):
+        name = shard_name(shard_index, num_shards)
+        if (file := root_dir / f"{name}.{output_format}").is_file():
+            files.append(file)
+        elif (manifest_file := root_dir / name / ShardWriter.MANIFEST_FILE).is_file():
+            with open(manifest_file) as f:
+                files.extend(root_dir / name / shard["file"] for shard in json.load(f)["shards"])
+        else:
+            raise typer.BadParameter(f"Results of shard {shard_index} are missing in {root_dir}")
+
+    if output_format == OutputFormat.PARQUET:
+        df = pd.concat(pd.read_parquet(file) for file in files)
+        df.sort_index(level=0, sort_remaining=False, kind="stable").to_parquet(root_dir / "aki.parquet")
+        return
+
+    # align the partitions by column name, as the partitions may have different columns
+    names: dict[str, str] = {}
+    frames: list[pd.DataFrame] = []
+    for file in files:
+        # restore the header, as reading the CSV files renames duplicate columns
+        with open(file, newline="") as f:
+            header = next(csv.reader(f))
+
+        frames.append(pd.read_csv(file, index_col=[0, 1]))
+        names.update(zip(frames[-1].columns, header[2:]))
+
+    df = pd.concat(frames)
+    df.index.names, df.columns = header[:2], [names[column] for column in df.columns]
+    df.sort_index(level=0, sort_remaining=False, kind="stable").to_csv(root_dir / "aki.csv")
+
+
+def run() -> None:
+    """Run the CLI tool"""
+    typer.run(main)
+
+
+if __name__ == "__main__":
+    run()
@@ -1,13 +1,68 @@
 #! /usr/bin/env python3
 """pyaki CLI tool to process AKI stages from time series data."""
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 from pathlib import Path
+from typing import Literal, NamedTuple, Optional
 
+import numpy as np
 import pandas as pd
 import typer
+from pandas.api.types import is_float_dtype, is_integer_dtype
 
-from pyaki.kdigo import Analyser
+from pyaki.kdigo import Analyser, Engine
+from pyaki.preprocessors import (
+    CreatininePreProcessor,
+    DemographicsPreProcessor,
+    RRTPreProcessor,
+    TimeIndexCreator,
+    UrineOutputPreProcessor,
+)
 from pyaki.utils import Dataset, DatasetType
+from pyaki.writer import OutputFormat, ShardWriter
+
+CSV_ENGINE: Literal["c", "pyarrow"] = (
+    "pyarrow" if find_spec("pyarrow") is not None else "c"
+)  # the pyarrow reader releases the GIL
+READ_CHUNK_SIZE: int = 2**20  # rows read at once when the rows of other partitions are dropped
+STAY_COLUMN: str = "stay_id"
+TIME_COLUMN: str = "charttime"
+
+
+class Schema(NamedTuple):
+    """
+    Named tuple representing the columns read from an input file.
+
+    Attributes
+    ----------
+    dtypes : dict[str, str]
+        The dtypes of the value columns to read, mapped by column name. Other value columns are not loaded.
+    required : tuple[str, ...]
+        The columns that must be present in the file. The stay identifiers keep their inferred dtype, so that
+        integer and string identifiers of any size are supported.
+    """
+
+    dtypes: dict[str, str]
+    required: tuple[str, ...]
+
+
+SCHEMAS: dict[DatasetType, Schema] = {
+    DatasetType.URINEOUTPUT: Schema({"urineoutput": "float32"}, (STAY_COLUMN, TIME_COLUMN)),
+    DatasetType.CREATININE: Schema({"creat": "float32"}, (STAY_COLUMN, TIME_COLUMN)),
+    DatasetType.RRT: Schema({"rrt_status": "float32"}, (STAY_COLUMN, TIME_COLUMN)),
+    DatasetType.DEMOGRAPHICS: Schema(
+        {
+            "weight": "float32",
+            "height": "float32",
+            "age": "float32",
+            "gender": "category",
+            "baseline_constant": "float32",
+        },
+        (STAY_COLUMN,),
+    ),
+}
 
 
 def main(
@@ -16,6 +71,17 @@ def main(
     creatinine_file: str = "creatinine.csv",
     rrt_file: str = "rrt.csv",
     demographics_file: str = "demographics.csv",
+    time_format: Optional[str] = None,
+    epoch_unit: Optional[str] = None,
+    cache_dates: bool = True,
+    assume_sorted: bool = False,
+    workers: int = 4,
+    output_format: OutputFormat = OutputFormat.CSV,
+    shard_size: Optional[int] = None,
+    resume: bool = False,
+    shard_index: Optional[int] = None,
+    num_shards: Optional[int] = None,
+    engine: Engine = Engine.PANDAS,
 ) -> None:
     """
     CLI tool to process AKI stages from time series data.
@@ -35,24 +101,198 @@ def main(
         Name of the file containing rrt data.
     demographics_file : str, default: "demographics.csv"
         Name of the file containing demographic data of the patient like the patients weight.
+    time_format : str, optional
+        The strftime format of the timestamps, e.g. "%Y-%m-%d %H:%M:%S". If not provided, the format is inferred.
+    epoch_unit : str, optional
+        The unit of integer epoch timestamps, e.g. "s" or "ms". If provided, the timestamps are read as integers.
+    cache_dates : bool, default: True
+        Whether to cache the parsed timestamps, which speeds up parsing of repeated timestamps.
+    assume_sorted : bool, default: False
+        Whether the data files are sorted by stay and time, which skips the check for sortedness and sorting the
+        stays when resampling.
+    workers : int, default: 4
+        The number of files read concurrently.
+    output_format : OutputFormat, default: OutputFormat.CSV
+        The file format of the results.
+    shard_size : int, optional
+        The number of stays per result file. If provided, the results are written as shards with a manifest to
+        the directory `aki` while the stays are processed, instead of to a single file.
+    resume : bool, default: False
+        Whether to resume an interrupted run from the shards in the directory `aki`, skipping completed stays.
+        Requires `shard_size` and the same configuration as the interrupted run.
+    shard_index : int, optional
+        The index of the partition of the cohort to process, from 0 to `num_shards` - 1. Only stays whose hashed
+        identifier falls into the partition are processed, so that several independent processes can split the
+        cohort. The results are written to `aki.shard-{shard_index}-of-{num_shards}` and can be combined with
+        `pyaki-merge`.
+    num_shards : int, optional
+        The number of partitions of the cohort. Requires `shard_index`.
+    engine : Engine, default: Engine.PANDAS
+        The engine used for preprocessing and probing. The Polars engine requires the optional `polars` package.
     """
+    if resume and shard_size is None:
+        raise typer.BadParameter("--resume requires --shard-size")
+    if (shard_index is None) != (num_shards is None):
+        raise typer.BadParameter("--shard-index and --num-shards must be given together")
+    shard = None
+    if shard_index is not None and num_shards is not None:
+        if not 0 <= shard_index < num_shards:
+            raise typer.BadParameter("--shard-index must be between 0 and --num-shards - 1")
+        shard = (shard_index, num_shards)
+
     root_dir = Path(path)
-    datasets = []
+    files = {
+        dtype: file
+        for dtype, file in [
+            (DatasetType.URINEOUTPUT, root_dir / urineoutput_file),
+            (DatasetType.CREATININE, root_dir / creatinine_file),
+            (DatasetType.RRT, root_dir / rrt_file),
+            (DatasetType.DEMOGRAPHICS, root_dir / demographics_file),
+        ]
+        if file.is_file()
+    }
+
+    def read(dtype: DatasetType) -> pd.DataFrame:
+        start_time = time.perf_counter()
+        df = _read_dataset(files[dtype], SCHEMAS[dtype], time_format, epoch_unit, cache_dates, shard)
+        typer.echo(f"Read {files[dtype].name} ({len(df)} rows) in {time.perf_counter() - start_time:.2f}s")
+        return df
+
+    # read the files concurrently, keeping the order of the datasets
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        datasets = [Dataset(dtype, df) for dtype, df in zip(files, executor.map(read, files))]
+
+    preprocessors = [
+        TimeIndexCreator(time_format=time_format, assume_sorted=assume_sorted),
+        UrineOutputPreProcessor(assume_sorted=assume_sorted),
+        CreatininePreProcessor(assume_sorted=assume_sorted),
+        DemographicsPreProcessor(assume_sorted=assume_sorted),
+        RRTPreProcessor(assume_sorted=assume_sorted),
+    ]
+
+    ana: Analyser = Analyser(datasets, preprocessors=preprocessors, engine=engine)
+    output_name = "aki" if shard is None else shard_name(*shard)
+    if shard_size is not None:
+        with ShardWriter(root_dir / output_name, output_format, config_hash=ana.config_hash, resume=resume) as writer:
+            for df in ana.process_chunks(chunk_size=shard_size, skip_stays=writer.completed_stays):
+                writer.write(df)
+    elif output_format == OutputFormat.PARQUET:
+        ana.process_stays().to_parquet(root_dir / f"{output_name}.parquet")
+    else:
+        ana.process_stays().to_csv(root_dir / f"{output_name}.csv")
 
-    if (ou_file := root_dir / urineoutput_file).is_file():
-        datasets.append(Dataset(DatasetType.URINEOUTPUT, pd.read_csv(ou_file)))
 
-    if (scr_file := root_dir / creatinine_file).is_file():
-        datasets.append(Dataset(DatasetType.CREATININE, pd.read_csv(scr_file)))
+def shard_name(shard_index: int, num_shards: int) -> str:
+    """
+    Get the name of the results of a partition of the cohort.
+
+    Parameters
+    ----------
+    shard_index : int
+        The index of the partition.
+    num_shards : int
+        The number of partitions.
+
+    Returns
+    -------
+    str
+        The name of the result file, without suffix, or directory.
+    """
+    return f"aki.shard-{shard_index:05d}-of-{num_shards:05d}"
+
+
+def in_shard(stays: pd.Series, shard_index: int, num_shards: int) -> np.ndarray:
+    """
+    Check which rows belong to a partition of the cohort.
+
+    Stays are assigned to partitions by a hash of their identifier that is stable across processes and machines.
+    Integer identifiers read as floats, because a file misses some identifiers, are hashed as integers, so that
+    a stay is assigned to the same partition in every file. Rows without identifier belong to no partition.
+
+    Parameters
+    ----------
+    stays : pd.Series
+        The stay identifiers of the rows.
+    shard_index : int
+        The index of the partition.
+    num_shards : int
+        The number of partitions.
+
+    Returns
+    -------
+    np.ndarray
+        A boolean mask of the rows of the partition.
+    """
+    if is_float_dtype(stays) and np.all(np.mod(stays.dropna(), 1) == 0):
+        stays = stays.astype("Int64")
+    missing = stays.isna().to_numpy()
+    if is_integer_dtype(stays):
+        values = stays.to_numpy(dtype=np.int64, na_value=0)
+    else:
+        values = stays.astype(str).to_numpy(dtype=object)
+    return np.asarray(pd.util.hash_array(values) % num_shards == shard_index) & ~missing
+
+
+def _read_dataset(
+    file: Path,
+    schema: Schema,
+    time_format: Optional[str],
+    epoch_unit: Optional[str],
+    cache_dates: bool,
+    shard: Optional[tuple[int, int]] = None,
+) -> pd.DataFrame:
+    """
+    Read the columns of an input file declared in its schema, parsing the timestamps once while reading.
+
+    Parameters
+    ----------
+    file : Path
+        The CSV file to read.
+    schema : Schema
+        The schema of the file.
+    time_format : str, optional
+        The strftime format of the timestamps.
+    epoch_unit : str, optional
+        The unit of integer epoch timestamps.
+    cache_dates : bool
+        Whether to cache the parsed timestamps.
+    shard : tuple[int, int], optional
+        The index and the number of partitions of the cohort. If provided, the file is read in chunks and only
+        the rows of the partition are kept.
+
+    Returns
+    -------
+    pd.DataFrame
+        The dataset with typed columns.
+
+    Raises
+    ------
+    ValueError
+        If a required column is missing from the file.
+    """
+    columns = pd.read_csv(file, nrows=0).columns  # header only
+    if missing := [column for column in schema.required if column not in columns]:
+        raise ValueError(f"File {file} is missing the columns {', '.join(missing)}")
 
-    if (_rrt_file := root_dir / rrt_file).is_file():
-        datasets.append(Dataset(DatasetType.RRT, pd.read_csv(_rrt_file)))
+    dtypes = {column: dtype for column, dtype in schema.dtypes.items() if column in columns}
+    kwargs: dict = {"usecols": [*schema.required, *dtypes], "dtype": dtypes}
+    if TIME_COLUMN in schema.required and epoch_unit is not None:
+        kwargs["dtype"] = {**dtypes, TIME_COLUMN: "int64"}
+    elif TIME_COLUMN in schema.required:
+        kwargs.update(parse_dates=[TIME_COLUMN], date_format=time_format, cache_dates=cache_dates)
 
-    if (demo_file := root_dir / demographics_file).is_file():
-        datasets.append(Dataset(DatasetType.DEMOGRAPHICS, pd.read_csv(demo_file)))
+    if shard is None:
+        df: pd.DataFrame = pd.read_csv(file, engine=CSV_ENGINE, **kwargs)
+    else:
+        # the pyarrow reader does not read in chunks, the rows of other partitions are dropped chunk by chunk
+        with pd.read_csv(file, chunksize=READ_CHUNK_SIZE, **kwargs) as reader:
+            chunks = [chunk[in_shard(chunk[STAY_COLUMN], *shard)] for chunk in reader]
+        # the categories are inferred per chunk
+        df = pd.concat(chunks, ignore_index=True).astype(dtypes)
 
-    ana: Analyser = Analyser(datasets)
-    ana.process_stays().to_csv(root_dir / "aki.csv")
+    if TIME_COLUMN in schema.required and epoch_unit is not None:
+        df[TIME_COLUMN] = pd.to_datetime(df[TIME_COLUMN], unit=epoch_unit)  # type: ignore
+    return df
 
 
 def run() -> None:
@@ -0,0 +1,197 @@
+"""
+This module contains a content-addressed on-disk cache for the results of the preprocessors.
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from pyaki.preprocessors import Preprocessor
+from pyaki.store import CohortStore
+from pyaki.utils import Dataset, fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class PreprocessingCache:
+    """
+    Class for caching the output of every preprocessing stage on disk.
+
+    Every stage is addressed by a key derived from the hash of the input datasets and the configuration of
+    the preprocessors up to and including that stage. Changing the input data or the configuration of a
+    preprocessor therefore invalidates that stage and all following stages, while the longest unchanged
+    prefix of the preprocessing chain is loaded from the cache. The stage outputs are written as
+    `CohortStore` directories; if the cache exceeds `max_size`, the least recently used entries are evicted.
+
+    Parameters
+    ----------
+    path : str or Path
+        The directory of the cache.
+    max_size : int, default: 2**30
+        The maximum size of the cache in bytes.
+
+    Examples
+    --------
+    ```pycon
+    >>> analyser = Analyser(datasets, cache=PreprocessingCache(".pyaki_cache"))
+    ```
+    """
+
+    ENTRY_FILE: str = "entry.json"
+
+    def __init__(self, path: str | Path, max_size: int = 2**30) -> None:
+        self._path: Path = Path(path)
+        self._max_size: int = max_size
+
+    def process(self, datasets: list[Dataset], preprocessors: list[Preprocessor]) -> list[Dataset]:
+        """
+        Apply the preprocessors to the datasets, loading unchanged stages from the cache.
+
+        Parameters
+        ----------
+        datasets : list[Dataset]
+            The input datasets.
+        preprocessors : list[Preprocessor]
+            The preprocessors to apply, in order.
+
+        Returns
+        -------
+        list[Dataset]
+            The preprocessed datasets.
+        """
+        keys: list[str] = []
+        key = self._hash_datasets(datasets)
+        for preprocessor in preprocessors:
+            key = hashlib.sha256(f"{key}:{fingerprint(preprocessor)}".encode()).hexdigest()
+            keys.append(key)
+
+        # find the last stage that is cached
+        start, elapsed = 0, 0.0
+        for stage in range(len(keys), 0, -1):
+            if (entry := self._load(keys[stage - 1], mmap=stage == len(keys))) is not None:
+                datasets, elapsed = entry
+                logger.info("Preprocessing cache hit for %d of %d stages, saved %.2fs", stage, len(keys), elapsed)
+                start = stage
+                break
+
+        for stage in range(start, len(keys)):
+            start_time = time.perf_counter()
+            datasets = preprocessors[stage].process(datasets)
+            elapsed += time.perf_counter() - start_time
+            self._save(keys[stage], datasets, elapsed)
+
+        if start < len(keys):
+            self._evict()
+
+        return datasets
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        if self._path.exists():
+            shutil.rmtree(self._path)
+
+    def _load(self, key: str, mmap: bool) -> tuple[list[Dataset], float] | None:
+        """
+        Load the datasets of a cache entry.
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry.
+        mmap : bool
+            Flag indicating whether to memory-map the datasets read-only.
+
+        Returns
+        -------
+        tuple[list[Dataset], float] or None
+            The cached datasets and the time it took to compute them, or None if the entry does not exist.
+        """
+        store = CohortStore(self._path / key)
+        if not store.exists() or not (self._path / key / self.ENTRY_FILE).is_file():
+            return None
+
+        (self._path / key / self.ENTRY_FILE).touch()  # mark as recently used
+        return store.read(mmap=mmap), self._elapsed(key)
+
+    def _save(self, key: str, datasets: list[Dataset], elapsed: float) -> None:
+        """
+        Save the datasets as cache entry.
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry.
+        datasets : list[Dataset]
+            The datasets to save.
+        elapsed : float
+            The time in seconds it took to compute the datasets from the input datasets.
+        """
+        try:
+            CohortStore(self._path / key).write(datasets)
+        except TypeError as e:
+            logger.warning("Skip caching of preprocessing stage: %s", e)
+            shutil.rmtree(self._path / key, ignore_errors=True)
+            return
+
+        with open(self._path / key / self.ENTRY_FILE, "w") as f:
+            json.dump({"elapsed": elapsed}, f)
+
+    def _elapsed(self, key: str) -> float:
+        """
+        Read the time it took to compute a cache entry.
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry.
+
+        Returns
+        -------
+        float
+            The time in seconds, or 0 if the entry does not exist.
+        """
+        try:
+            with open(self._path / key / self.ENTRY_FILE) as f:
+                return float(json.load(f)["elapsed"])
+        except FileNotFoundError:
+            return 0.0
+
+    def _evict(self) -> None:
+        """Evict the least recently used entries until the cache fits into `max_size`."""
+        entries = [path for path in self._path.iterdir() if (path / self.ENTRY_FILE).is_file()]
+        sizes = {path: sum(file.stat().st_size for file in path.rglob("*") if file.is_file()) for path in entries}
+
+        size = sum(sizes.values())
+        for path in sorted(entries, key=lambda path: (path / self.ENTRY_FILE).stat().st_mtime):
+            if size <= self._max_size:
+                break
+
+            logger.info("Evict preprocessing cache entry %s", path.name)
+            shutil.rmtree(path)
+            size -= sizes[path]
+
+    @staticmethod
+    def _hash_datasets(datasets: list[Dataset]) -> str:
+        """
+        Hash the content of the datasets.
+
+        Parameters
+        ----------
+        datasets : list[Dataset]
+            The datasets to hash.
+
+        Returns
+        -------
+        str
+            The hex digest of the datasets.
+        """
+        digest = hashlib.sha256()
+        for dtype, df in datasets:
+            digest.update(f"{dtype}:{list(df.index.names)}:{list(df.columns)}:{list(df.dtypes.astype(str))}".encode())
+            digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        return digest.hexdigest()
@@ -0,0 +1,411 @@
+"""
+This module contains the preprocessing of datasets as SQL queries in an in-process DuckDB database.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import duckdb
+import pandas as pd
+
+from pyaki.preprocessors import (
+    CreatininePreProcessor,
+    DemographicsPreProcessor,
+    Preprocessor,
+    RRTPreProcessor,
+    TimeIndexCreator,
+    UrineOutputPreProcessor,
+)
+from pyaki.utils import Dataset, DatasetType
+
+logger = logging.getLogger(__name__)
+
+_ROW: str = "__row"  # name of the column numbering the rows
+
+
+class DuckDBPreprocessing:
+    """
+    Class for running the preprocessors as SQL queries in an in-process DuckDB database.
+
+    The built-in preprocessors are translated to SQL: the hourly binning is a `time_bucket()` aggregation joined
+    onto a grid of the hours of every stay, and the interpolation and filling are window functions. The datasets
+    are scanned directly from CSV or Parquet files, or from pandas DataFrames, and DuckDB spills intermediate
+    results to disk if they exceed the memory limit, so cohorts larger than memory can be preprocessed. The
+    preprocessed datasets are returned as pandas DataFrames indexed like the output of the pandas preprocessors,
+    except that the identifier columns are not repeated as value columns, and are analysed by an `Analyser`
+    without preprocessors.
+
+    Parameters
+    ----------
+    preprocessors : list[Preprocessor], optional
+        The preprocessors to apply. If not provided, the default preprocessors of `Analyser` are applied.
+    stay_identifier : str, default: "stay_id"
+        The column name in the input data representing the stay identifier.
+    time_identifier : str, default: "charttime"
+        The column name in the input data representing the time identifier.
+    database : str, default: ":memory:"
+        The DuckDB database file, or ":memory:" for an in-memory database.
+    memory_limit : str, optional
+        The memory limit of DuckDB, e.g. "4GB". Larger intermediate results are spilled to `temp_directory`.
+    temp_directory : str or Path, optional
+        The directory for intermediate results spilled to disk.
+
+    Raises
+    ------
+    ValueError
+        If a preprocessor is not supported.
+
+    Examples
+    --------
+    ```pycon
+    >>> datasets = DuckDBPreprocessing(memory_limit="4GB").process(
+    ...     [
+    ...         (DatasetType.URINEOUTPUT, "urineoutput.parquet"),
+    ...         (DatasetType.CREATININE, "creatinine.csv"),
+    ...         (DatasetType.DEMOGRAPHICS, "demographics.csv"),
+    ...         (DatasetType.RRT, "rrt.csv"),
+    ...     ]
+    ... )
+    >>> result_df = Analyser(datasets, preprocessors=[]).process_stays()
+    ```
+    """
+
+    def __init__(
+        self,
+        preprocessors: Optional[list[Preprocessor]] = None,
+        stay_identifier: str = "stay_id",
+        time_identifier: str = "charttime",
+        database: str = ":memory:",
+        memory_limit: Optional[str] = None,
+        temp_directory: Optional[str | Path] = None,
+    ) -> None:
+        if preprocessors is None:  # apply default preprocessors if not provided
+            preprocessors = [
+                TimeIndexCreator(stay_identifier=stay_identifier, time_identifier=time_identifier),
+                UrineOutputPreProcessor(stay_identifier=stay_identifier, time_identifier=time_identifier),
+                CreatininePreProcessor(stay_identifier=stay_identifier, time_identifier=time_identifier),
+                DemographicsPreProcessor(stay_identifier=stay_identifier),
+                RRTPreProcessor(stay_identifier=stay_identifier, time_identifier=time_identifier),
+            ]
+
+        for preprocessor in preprocessors:
+            if type(preprocessor) not in _PREPROCESSORS:
+                raise ValueError(f"DuckDB preprocessing does not support {type(preprocessor).__name__}")
+            if isinstance(preprocessor, RRTPreProcessor) and preprocessor._intervals:
+                raise ValueError("DuckDB preprocessing does not support RRT intervals")
+            if isinstance(preprocessor, CreatininePreProcessor) and preprocessor._sparse:
+                raise ValueError("DuckDB preprocessing does not support sparse creatinine")
+
+        self._preprocessors: list[Preprocessor] = preprocessors
+        self._stay_identifier: str = stay_identifier
+        self._time_identifier: str = time_identifier
+        self._database: str = database
+        self._config: dict[str, Any] = {}
+        if memory_limit is not None:
+            self._config["memory_limit"] = memory_limit
+        if temp_directory is not None:
+            self._config["temp_directory"] = str(temp_directory)
+
+    def process(self, sources: list[tuple[DatasetType, str | Path | pd.DataFrame]]) -> list[Dataset]:
+        """
+        Preprocess the datasets.
+
+        Parameters
+        ----------
+        sources : list[tuple[DatasetType, str or Path or pd.DataFrame]]
+            The datasets with their dataset type, each given as the path of a CSV or Parquet file, a glob pattern of
+            Parquet files, or a pandas DataFrame.
+
+        Returns
+        -------
+        list[Dataset]
+            The preprocessed datasets, in the order of the sources.
+        """
+        stay, time = self._stay_identifier, self._time_identifier
+
+        datasets = []
+        with duckdb.connect(self._database, config=self._config) as connection:
+            for dtype, source in sources:
+                view = _register(connection, dtype, source)
+                for i, preprocessor in enumerate(self._preprocessors):
+                    if dtype not in _dataset_types(preprocessor):
+                        continue
+
+                    types = _types(connection, view)
+                    if isinstance(preprocessor, TimeIndexCreator) and types.get(time, "TIMESTAMP") == "TIMESTAMP":
+                        continue  # the timestamps are missing or already parsed
+
+                    columns = [column for column in types if column not in (stay, time)]
+                    sql = _PREPROCESSORS[type(preprocessor)](preprocessor, view, stay, time, columns)
+                    connection.execute(f"CREATE OR REPLACE TEMP VIEW {_quote(f'{dtype}_{i}')} AS {sql}")
+                    view = _quote(f"{dtype}_{i}")
+
+                logger.info("Preprocess dataset of type %s with DuckDB", dtype)
+                datasets.append(Dataset(dtype, self._fetch(connection, view)))
+
+        return datasets
+
+    def _fetch(self, connection: duckdb.DuckDBPyConnection, view: str) -> pd.DataFrame:
+        """
+        Fetch a preprocessed dataset as pandas DataFrame.
+
+        Parameters
+        ----------
+        connection : duckdb.DuckDBPyConnection
+            The database connection.
+        view : str
+            The quoted name of the view of the dataset.
+
+        Returns
+        -------
+        pd.DataFrame
+            The dataset, indexed by the stay and time identifiers it contains and sorted by them.
+        """
+        keys = [
+            column for column in (self._stay_identifier, self._time_identifier) if column in _types(connection, view)
+        ]
+        order = f"ORDER BY {', '.join(map(_quote, keys))}" if keys else ""
+        df = connection.execute(f"SELECT * FROM {view} {order}").df()
+
+        for column in df.columns:
+            if column == self._time_identifier:
+                df[column] = df[column].astype("datetime64[ns]")
+            elif column != self._stay_identifier and pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = df[column].astype(float)  # like the missing values of the pandas preprocessors
+
+        return df.set_index(keys) if keys else df
+
+
+def _quote(name: str) -> str:
+    """Helper function to quote an SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    """Helper function to quote an SQL string literal."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _types(connection: duckdb.DuckDBPyConnection, view: str) -> dict[str, str]:
+    """Helper function to get the column names and types of a view."""
+    relation = connection.sql(f"SELECT * FROM {view}")
+    return {name: str(dtype) for name, dtype in zip(relation.columns, relation.types)}
+
+
+def _register(connection: duckdb.DuckDBPyConnection, dtype: DatasetType, source: str | Path | pd.DataFrame) -> str:
+    """
+    Helper function to make a source of a dataset available as view.
+
+    Parameters
+    ----------
+    connection : duckdb.DuckDBPyConnection
+        The database connection.
+    dtype : DatasetType
+        The type of the dataset.
+    source : str or Path or pd.DataFrame
+        The path of a CSV or Parquet file, a glob pattern of Parquet files, or a pandas DataFrame.
+
+    Returns
+    -------
+    str
+        The quoted name of the view.
+    """
+    view = _quote(f"{dtype}_source")
+    if isinstance(source, pd.DataFrame):
+        if any(name is not None for name in source.index.names):
+            source = source.reset_index()
+        connection.register(f"{dtype}_source", source)
+        return view
+
+    path = str(source)
+    scan = f"read_parquet({_literal(path)})" if path.endswith(".parquet") else f"read_csv({_literal(path)})"
+    connection.execute(f"CREATE OR REPLACE TEMP VIEW {view} AS SELECT * FROM {scan}")
+    return view
+
+
+def _dataset_types(preprocessor: Preprocessor) -> set[DatasetType]:
+    """Helper function to get the dataset types processed by a preprocessor."""
+    if isinstance(preprocessor, TimeIndexCreator):
+        return set(preprocessor.DATASETS)
+    return set(preprocessor.process.dataset_types)  # type: ignore
+
+
+def _resample_hourly(view: str, stay: str, time: str, aggregates: list[str], values: list[str]) -> str:
+    """
+    Helper function to aggregate the rows of every stay to hourly bins, like a grouped `resample("1h")`.
+
+    Every stay gets a row for every hour between its first and its last bin, with missing values for empty bins.
+
+    Parameters
+    ----------
+    view : str
+        The quoted name of the view of the dataset.
+    stay : str
+        The stay identifier.
+    time : str
+        The time identifier.
+    aggregates : list[str]
+        The aggregate expressions of the bins.
+    values : list[str]
+        The expressions of the value columns, selected from the bins `b`.
+
+    Returns
+    -------
+    str
+        The SQL query of the hourly bins.
+    """
+    s, t = _quote(stay), _quote(time)
+    return f"""
+        WITH bins AS (
+            SELECT {s}, time_bucket(INTERVAL 1 HOUR, {t}) AS {t}, {", ".join(aggregates)}
+            FROM {view}
+            GROUP BY ALL
+        ), grid AS (
+            SELECT {s}, unnest(generate_series(min({t}), max({t}), INTERVAL 1 HOUR)) AS {t}
+            FROM bins
+            GROUP BY {s}
+        )
+        SELECT grid.{s}, grid.{t}, {", ".join(values)}
+        FROM grid LEFT JOIN bins AS b ON grid.{s} = b.{s} AND grid.{t} = b.{t}
+    """
+
+
+def _fill(view: str, stay: str, time: str, columns: list[str], frame: str) -> str:
+    """
+    Helper function to fill missing values with the nearest value in a window of rows.
+
+    Like the pandas preprocessors, the rows are ordered by stay and time, but the window is not restricted to a stay.
+
+    Parameters
+    ----------
+    view : str
+        The SQL query or quoted name of the view of the dataset.
+    stay : str
+        The stay identifier.
+    time : str
+        The time identifier.
+    columns : list[str]
+        The columns to fill.
+    frame : str
+        The window frame, with the nearest value first for `first_value()` or last for `last_value()`.
+
+    Returns
+    -------
+    str
+        The SQL query of the filled dataset.
+    """
+    s, t = _quote(stay), _quote(time)
+    agg = "first_value" if "FOLLOWING" in frame else "last_value"
+    fills = [f"{agg}({_quote(c)} IGNORE NULLS) OVER (ORDER BY {s}, {t} {frame}) AS {_quote(c)}" for c in columns]
+    return f"SELECT {s}, {t}, {', '.join(fills)} FROM {view}"
+
+
+def _process_time_index(preprocessor: TimeIndexCreator, view: str, stay: str, time: str, columns: list[str]) -> str:
+    """Helper function to parse the timestamps, see `TimeIndexCreator`."""
+    if preprocessor._time_format is None:
+        parsed = f"CAST({_quote(time)} AS TIMESTAMP)"
+    else:
+        parsed = f"strptime(CAST({_quote(time)} AS VARCHAR), {_literal(preprocessor._time_format)})"
+    return f"SELECT * REPLACE ({parsed} AS {_quote(time)}) FROM {view}"
+
+
+def _process_urineoutput(
+    preprocessor: UrineOutputPreProcessor, view: str, stay: str, time: str, columns: list[str]
+) -> str:
+    """Helper function to resample and interpolate the urine output, see `UrineOutputPreProcessor`."""
+    s, t, u = _quote(stay), _quote(time), _quote(preprocessor._urineoutput_column)
+    threshold = preprocessor._threshold
+    if not preprocessor._resample:
+        return f"SELECT * FROM {view}"
+
+    # empty bins and bins without urine output are missing
+    sql = _resample_hourly(
+        view,
+        stay,
+        time,
+        [f"CAST(coalesce(sum({_quote(c)}), 0) AS DOUBLE) AS {_quote(c)}" for c in columns],
+        [f"CASE WHEN b.{u} <> 0 THEN b.{_quote(c)} END AS {_quote(c)}" for c in columns],
+    )
+    if not preprocessor._interpolate:
+        return sql
+
+    # divide every value by the number of missing hours before it, up to the threshold
+    sql = f"""
+        WITH bins AS (
+            SELECT *, row_number() OVER (ORDER BY {s}, {t}) AS {_ROW} FROM ({sql})
+        ), gaps AS (
+            SELECT *, {_ROW} - coalesce(
+                max(CASE WHEN {u} IS NOT NULL THEN {_ROW} END) OVER (ORDER BY {_ROW} ROWS UNBOUNDED PRECEDING), 0
+            ) AS gap
+            FROM bins
+        )
+        SELECT * REPLACE (
+            {u} / (least(coalesce(lag(gap) OVER (ORDER BY {_ROW}), 0), {threshold}) + 1) AS {u}
+        )
+        FROM gaps
+    """
+    return _fill(f"({sql})", stay, time, columns, f"ROWS BETWEEN CURRENT ROW AND {threshold} FOLLOWING")
+
+
+def _process_creatinine(
+    preprocessor: CreatininePreProcessor, view: str, stay: str, time: str, columns: list[str]
+) -> str:
+    """Helper function to resample and forward fill the creatinine, see `CreatininePreProcessor`."""
+    c = _quote(preprocessor._creatinine_column)
+    if not preprocessor._ffill:
+        return _resample_hourly(
+            view,
+            stay,
+            time,
+            [f"CAST(avg({_quote(column)}) AS DOUBLE) AS {_quote(column)}" for column in columns],
+            [f"b.{_quote(column)}" for column in columns],
+        )
+
+    sql = _resample_hourly(
+        view,
+        stay,
+        time,
+        [f"CAST(avg({_quote(column)}) AS DOUBLE) AS {_quote(column)}" for column in columns],
+        [f"CASE WHEN b.{c} = 0 THEN NULL ELSE b.{_quote(column)} END AS {_quote(column)}" for column in columns],
+    )
+    threshold = preprocessor._threshold
+    preceding = "UNBOUNDED PRECEDING" if threshold is None else f"{threshold} PRECEDING"
+    return _fill(f"({sql})", stay, time, columns, f"ROWS BETWEEN {preceding} AND CURRENT ROW")
+
+
+def _process_demographics(
+    preprocessor: DemographicsPreProcessor, view: str, stay: str, time: str, columns: list[str]
+) -> str:
+    """Helper function to aggregate the demographics of every stay, see `DemographicsPreProcessor`."""
+    # the parallel aggregation does not keep the row order, the last values are taken in the order of the source
+    aggregates = [
+        f"last({_quote(c)} ORDER BY {_ROW}) FILTER (WHERE {_quote(c)} IS NOT NULL) AS {_quote(c)}" for c in columns
+    ]
+    return f"""
+        SELECT {_quote(stay)}, {", ".join(aggregates)}
+        FROM (SELECT *, row_number() OVER () AS {_ROW} FROM {view})
+        GROUP BY {_quote(stay)}
+    """
+
+
+def _process_rrt(preprocessor: RRTPreProcessor, view: str, stay: str, time: str, columns: list[str]) -> str:
+    """Helper function to resample and forward fill the RRT status, see `RRTPreProcessor`."""
+    t = _quote(time)
+    sql = _resample_hourly(
+        view,
+        stay,
+        time,
+        [f"last({_quote(c)} ORDER BY {t}) FILTER (WHERE {_quote(c)} IS NOT NULL) AS {_quote(c)}" for c in columns],
+        [f"b.{_quote(c)}" for c in columns],
+    )
+    return _fill(f"({sql})", stay, time, columns, "ROWS UNBOUNDED PRECEDING")
+
+
+_PREPROCESSORS: dict[type, Callable[[Any, str, str, str, list[str]], str]] = {
+    TimeIndexCreator: _process_time_index,
+    UrineOutputPreProcessor: _process_urineoutput,
+    CreatininePreProcessor: _process_creatinine,
+    DemographicsPreProcessor: _process_demographics,
+    RRTPreProcessor: _process_rrt,
+}
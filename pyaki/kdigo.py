@@ -2,11 +2,19 @@
 This module contains the analysis class for processing AKI stages from time series data.
 """
 
+import hashlib
 import logging
-from typing import Optional
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import StrEnum, auto
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Collection, Iterator, Optional
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
 
+from pyaki.cache import PreprocessingCache
 from pyaki.preprocessors import (
     CreatininePreProcessor,
     DemographicsPreProcessor,
@@ -22,11 +30,52 @@ from pyaki.probes import (
     RRTProbe,
     UrineOutputProbe,
 )
-from pyaki.utils import Dataset
+from pyaki.store import CohortStore
+from pyaki.utils import INTERVAL_END, Dataset, DatasetType, expand_intervals, fingerprint
+
+if TYPE_CHECKING:
+    from pyaki.polars_engine import PolarsEngine
 
 logger = logging.getLogger(__name__)
 
 
+class Backend(StrEnum):
+    """
+    Enumeration class representing different backends for processing stays.
+
+    Attributes
+    ----------
+    SERIAL : str
+        Stays are processed one after another in the calling thread.
+    THREADS : str
+        Chunks of stays are processed in a thread pool, sharing the data without copies. This is effective as far
+        as the pandas and NumPy kernels of the probes release the GIL.
+    PROCESSES : str
+        Chunks of stays are processed in a process pool. The analyser is pickled once for every worker process.
+    """
+
+    SERIAL = auto()
+    THREADS = auto()
+    PROCESSES = auto()
+
+
+class Engine(StrEnum):
+    """
+    Enumeration class representing different engines for preprocessing and probing.
+
+    Attributes
+    ----------
+    PANDAS : str
+        The preprocessors and probes are applied with their pandas implementation.
+    POLARS : str
+        The built-in preprocessors and probes are translated to Polars lazy queries, see `PolarsEngine`. Requires
+        the optional `polars` dependency.
+    """
+
+    PANDAS = auto()
+    POLARS = auto()
+
+
 class Analyser:
     """
     Class for data analysis using probes and preprocessors.
@@ -35,6 +84,13 @@ class Analyser:
     It processes the input data through the specified preprocessors and applies the probes to perform
     the analysis. The analysis results are returned as a DataFrame.
 
+    Attributes
+    ----------
+    MEASUREMENT_COLUMNS : dict[DatasetType, tuple[str, ...]]
+        The columns of each dataset type checked for negative values by `validate_data()`.
+    VALIDATION_CHUNK_SIZE : int
+        The number of rows checked at once by `validate_data()`.
+
     Parameters
     ----------
     data : list[Dataset]
@@ -50,6 +106,16 @@ class Analyser:
         The column name in the input data representing the stay identifier.
     time_identifier : str, default: "charttime"
         The column name in the input data representing the time identifier.
+    cache : PreprocessingCache, optional
+        A cache for the preprocessed data. If provided, preprocessing stages whose input data and configuration
+        are unchanged are loaded from the cache instead of being recomputed.
+    columns : list[str], optional
+        The columns of the analysis results. If provided, only the probes, preprocessors and datasets required for
+        these columns are applied and all other columns are dropped from the results. The `stage` column requires
+        all probes.
+    engine : Engine, default: Engine.PANDAS
+        The engine used for preprocessing and probing. The Polars engine only supports the built-in preprocessors
+        and probes, and neither the preprocessing cache nor `sweep()` and `to_store()`.
 
     Examples
     --------
@@ -62,8 +128,42 @@ class Analyser:
     ```pycon
     >>> result_df = analyser.process_stays()
     ```
+
+    Obtain the analysis results as AKI episodes instead of hourly stages
+    ```pycon
+    >>> episode_df = analyser.process_episodes()
+    ```
+
+    Summarise the stages of every stay without keeping the hourly results in memory
+    ```pycon
+    >>> summary_df = analyser.summarize()
+    ```
+
+    Only calculate the urine output stages, skipping the creatinine and RRT data
+    ```pycon
+    >>> result_df = Analyser(data=my_datasets, columns=["urineoutput_stage"]).process_stays()
+    ```
+
+    Preprocess and probe with Polars instead of pandas
+    ```pycon
+    >>> result_df = Analyser(data=my_datasets, engine=Engine.POLARS).process_stays()
+    ```
+
+    Store the preprocessed data and rerun the analysis with other probes without preprocessing
+    ```pycon
+    >>> analyser.to_store("cohort")
+    >>> result_df = Analyser.from_store("cohort", probes=[MyProbe()]).process_stays()
+    ```
     """
 
+    MEASUREMENT_COLUMNS: dict[DatasetType, tuple[str, ...]] = {
+        DatasetType.URINEOUTPUT: ("urineoutput",),
+        DatasetType.CREATININE: ("creat",),
+        DatasetType.DEMOGRAPHICS: ("weight", "height", "age", "baseline_constant"),
+        DatasetType.RRT: ("rrt_status",),
+    }
+    VALIDATION_CHUNK_SIZE: int = 2**16
+
     def __init__(
         self,
         data: list[Dataset],
@@ -71,6 +171,9 @@ class Analyser:
         preprocessors: Optional[list[Preprocessor]] = None,
         stay_identifier: str = "stay_id",
         time_identifier: str = "charttime",
+        cache: Optional[PreprocessingCache] = None,
+        columns: Optional[list[str]] = None,
+        engine: Engine = Engine.PANDAS,
     ) -> None:
         if probes is None:  # apply default probes if not provided
             probes = [
@@ -88,24 +191,132 @@ class Analyser:
                 RRTPreProcessor(stay_identifier=stay_identifier, time_identifier=time_identifier),
             ]
 
+        self._stay_identifier: str = stay_identifier
+        self._time_identifier: str = time_identifier
+        self._columns: Optional[list[str]] = columns
+
+        # restrict the analysis to the requested columns
+        if columns is not None:
+            data, probes, preprocessors = self._query(columns, data, probes, preprocessors)
+
         # validate datasets
         self.validate_data(data)
 
         # apply preprocessors to the input data
         logger.info("Start preprocessing")
-        for preprocessor in preprocessors:
-            data = preprocessor.process(data)
+        self._polars: Optional["PolarsEngine"] = None
+        self._frames: dict[DatasetType, Any] = {}
+        if engine == Engine.POLARS:
+            if cache is not None:
+                raise ValueError("The preprocessing cache requires the pandas engine")
+            self._polars = _polars_engine(preprocessors, probes, stay_identifier, time_identifier, columns)
+            self._frames = self._polars.preprocess(data)
+        elif cache is not None:
+            data = cache.process(data, preprocessors)
+        else:
+            for preprocessor in preprocessors:
+                data = preprocessor.process(data)
 
         logger.info("Finish preprocessing")
 
         self._data: list[Dataset] = data
+        self._offsets: dict[DatasetType, dict[Any, slice]] = {}  # row positions of the stays, see `from_store()`
         self._probes: list[Probe] = probes
-        self._stay_identifier: str = stay_identifier
+        self._config_hash: str = hashlib.sha256(
+            "\n".join(
+                [
+                    stay_identifier,
+                    time_identifier,
+                    repr(columns),
+                    str(engine),
+                    *(fingerprint(preprocessor) for preprocessor in preprocessors),
+                    *(fingerprint(probe) for probe in probes),
+                ]
+            ).encode()
+        ).hexdigest()
+        self._bindings: list[_ProbeBinding] = [_ProbeBinding(probe) for probe in probes]
+        self._precomputed: list[dict[str, pd.Series | pd.DataFrame]] = (
+            [] if self._polars is not None else self._precompute(probes)
+        )
+
+    @property
+    def config_hash(self) -> str:
+        """The hash of the configuration of the preprocessors, probes and requested columns."""
+        return self._config_hash
+
+    @classmethod
+    def from_store(
+        cls,
+        path: str | Path,
+        probes: Optional[list[Probe]] = None,
+        stay_identifier: str = "stay_id",
+    ) -> "Analyser":
+        """
+        Create an analyser from preprocessed datasets written by `to_store()`.
+
+        The datasets are memory-mapped from the store and no preprocessors are applied. The rows of a stay are
+        sliced by their stored offsets instead of looking up the stay in the index.
+
+        Parameters
+        ----------
+        path : str or Path
+            The directory of the cohort store.
+        probes : list[Probe], optional
+            A list of Probe objects representing the analysis probes to apply. If not provided, the default
+            probes will be used.
+        stay_identifier : str, default: "stay_id"
+            The index level in the stored data representing the stay identifier.
+
+        Returns
+        -------
+        Analyser
+            The analyser for the stored datasets.
+        """
+        store = CohortStore(path)
+        analyser = cls(
+            store.read(),
+            probes=probes,
+            preprocessors=[],
+            stay_identifier=stay_identifier,
+        )
+
+        for dtype, df in analyser._data:
+            if df.index.nlevels < 2 or df.index.names[0] != stay_identifier:
+                continue  # single rows of a stay are looked up in the index
+            try:
+                offsets = store.offsets(dtype)
+            except ValueError:  # rows of a stay are not contiguous
+                continue
+            analyser._offsets[dtype] = dict(zip(offsets.index, map(slice, offsets["start"], offsets["stop"])))
+
+        return analyser
+
+    def to_store(self, path: str | Path) -> None:
+        """
+        Write the preprocessed datasets to a cohort store.
+
+        Parameters
+        ----------
+        path : str or Path
+            The directory of the cohort store.
+
+        Raises
+        ------
+        ValueError
+            If the analyser uses the Polars engine.
+        """
+        if self._polars is not None:
+            raise ValueError("Writing a cohort store requires the pandas engine")
+        CohortStore(path).write(self._data, self._stay_identifier)
 
     def validate_data(self, datasets: list[Dataset]) -> None:
         """
         validate the input data for negative values.
 
+        Only the numeric `MEASUREMENT_COLUMNS` of each dataset type are checked, other columns like the stay and
+        time identifiers are skipped. The columns are scanned in chunks of `VALIDATION_CHUNK_SIZE` rows and the
+        scan stops at the first chunk with negative values.
+
         Parameters
         ----------
         datasets : list[Dataset]
@@ -114,40 +325,91 @@ class Analyser:
         Raises
         ------
         ValueError
-            If any of the datasets contain negative values.
+            If any of the datasets contain negative values. The message names the column and the stays and times
+            of the first offending rows.
         """
         for dtype, df in datasets:
-            try:
-                if (df < 0).values.any():
-                    raise ValueError(f"Dataset of Type {dtype} contains negative data")
-            except TypeError:
-                continue
+            for column in self.MEASUREMENT_COLUMNS.get(dtype, ()):
+                if column not in df.columns or not is_numeric_dtype(df[column]) or is_bool_dtype(df[column]):
+                    continue
 
-    def process_stays(self) -> pd.DataFrame:
+                series = df[column]
+                for start in range(0, len(series), self.VALIDATION_CHUNK_SIZE):
+                    # only the chunk is converted, not a copy of the whole column
+                    values = series.iloc[start : start + self.VALIDATION_CHUNK_SIZE].to_numpy(
+                        dtype=float, na_value=np.nan
+                    )
+                    negative = np.flatnonzero(values < 0)
+                    if len(negative) == 0:
+                        continue
+
+                    locations = [self._locate(df, position) for position in start + negative[:5]]
+                    raise ValueError(
+                        f"Dataset of Type {dtype} contains negative data in column {column}, "
+                        f"e.g. at ({'), ('.join(locations)})"
+                    )
+
+    def process_stays(
+        self,
+        backend: Backend = Backend.SERIAL,
+        workers: Optional[int] = None,
+        chunk_size: int = 64,
+    ) -> pd.DataFrame:
         """
         Process all stays in the input data.
 
         This method processes all stays in the input data by applying the configured probes.
         The analysis results for all stays are concatenated and returned as a single DataFrame.
 
+        Parameters
+        ----------
+        backend : Backend, default: Backend.SERIAL
+            The backend used to process the stays.
+        workers : int, optional
+            The number of workers of the thread or process pool. Defaults to the number of processors.
+        chunk_size : int, default: 64
+            The number of stays processed by a worker at once.
+
         Returns
         -------
         pd.DataFrame
             The analysis results for all stays.
         """
         logger.info("Start probing")
+        data = self._process(backend, workers, chunk_size, summarize=False)
+        logger.info("Finish probing")
+        return data
 
-        (_, df), *datasets = self._data
-        stay_ids: pd.Index = df.index.get_level_values(self._stay_identifier).unique()
-        for _, df in datasets:
-            stay_ids.join(df.index.get_level_values(self._stay_identifier).unique())
+    def process_chunks(
+        self,
+        backend: Backend = Backend.SERIAL,
+        workers: Optional[int] = None,
+        chunk_size: int = 64,
+        skip_stays: Optional[Collection[Any]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Process all stays in the input data in chunks of stays.
 
-        data: pd.DataFrame = self.process_stay(stay_ids.values[0])
-        for stay_id in stay_ids.values[1:]:
-            data = pd.concat([data, self.process_stay(stay_id)])
+        The analysis results of every chunk are yielded as soon as the chunk is processed, in the order of
+        the stays, which allows to write the results while the remaining stays are processed.
 
-        logger.info("Finish probing")
-        return data
+        Parameters
+        ----------
+        backend : Backend, default: Backend.SERIAL
+            The backend used to process the stays.
+        workers : int, optional
+            The number of workers of the thread or process pool. Defaults to the number of processors.
+        chunk_size : int, default: 64
+            The number of stays per chunk.
+        skip_stays : Collection, optional
+            The identifiers of stays that are not processed, e.g. stays completed by a previous run.
+
+        Returns
+        -------
+        Iterator[pd.DataFrame]
+            The analysis results for the stays of every chunk.
+        """
+        return self._iter_chunks(backend, workers, chunk_size, summarize=False, skip_stays=skip_stays)
 
     def process_stay(self, stay_id: str) -> pd.DataFrame:
         """
@@ -167,27 +429,657 @@ class Analyser:
             The analysis results for the specific stay.
         """
         logger.debug("Processing stay with id: %s", stay_id)
+        if self._polars is not None:
+            return self._polars.probe(self._frames, [stay_id])
 
-        datasets: list[Dataset] = [
-            Dataset(dtype, data.loc[stay_id])  # type: ignore
-            for dtype, data in self._data
-            if stay_id in data.index
-        ]
+        return self._probe_stay(stay_id, self._stay_datasets(stay_id), self._bindings, self._precomputed)
+
+    def process_episodes(
+        self,
+        backend: Backend = Backend.SERIAL,
+        workers: Optional[int] = None,
+        chunk_size: int = 64,
+    ) -> pd.DataFrame:
+        """
+        Process all stays in the input data and summarise the results as AKI episodes.
+
+        An episode is a run of consecutive hours of a stay with the same stage. Episodes are obtained by run-length
+        encoding the `stage` column of `process_stays()`, which is much smaller than the hourly results for
+        typical cohorts. Hours with an unknown stage do not belong to any episode.
+
+        Parameters
+        ----------
+        backend : Backend, default: Backend.SERIAL
+            The backend used to process the stays.
+        workers : int, optional
+            The number of workers of the thread or process pool. Defaults to the number of processors.
+        chunk_size : int, default: 64
+            The number of stays processed by a worker at once.
+
+        Returns
+        -------
+        pd.DataFrame
+            The episodes of all stays, with the columns `stay_identifier`, `start`, `end` (exclusive), `stage`
+            and `criterion`. The criterion is the name of the first probe stage column that reaches the stage
+            at the start of the episode, without the `_stage` suffix, or None for stage 0.
+        """
+        return self._episodes(self.process_stays(backend, workers, chunk_size))
+
+    def summarize(
+        self,
+        backend: Backend = Backend.SERIAL,
+        workers: Optional[int] = None,
+        chunk_size: int = 64,
+    ) -> pd.DataFrame:
+        """
+        Process all stays in the input data and summarise the stages of every stay.
+
+        The results of every stay are summarised as soon as the stay is processed, so the hourly results of the
+        cohort are never held in memory at once.
+
+        Parameters
+        ----------
+        backend : Backend, default: Backend.SERIAL
+            The backend used to process the stays.
+        workers : int, optional
+            The number of workers of the thread or process pool. Defaults to the number of processors.
+        chunk_size : int, default: 64
+            The number of stays processed by a worker at once.
+
+        Returns
+        -------
+        pd.DataFrame
+            The summary of every stay, indexed by stay, with the maximum stage `max_stage` and, for every stage
+            from 0 to 3, the first time the stage was reached `first_stage_{stage}` and the number of hours spent
+            in the stage `hours_stage_{stage}`.
+        """
+        logger.info("Start summarizing")
+        data = self._process(backend, workers, chunk_size, summarize=True)
+        logger.info("Finish summarizing")
+        return data
+
+    def sweep(self, configurations: dict[str, list[Probe]]) -> pd.DataFrame:
+        """
+        Process all stays with several probe configurations.
+
+        The preprocessed data is shared between all configurations, every stay is sliced only once and
+        intermediate results of probes, like creatinine baselines or rolling urine output windows, are
+        calculated once for all configurations that share them.
+
+        Parameters
+        ----------
+        configurations : dict[str, list[Probe]]
+            The probes to apply, mapped by the name of the configuration.
+
+        Returns
+        -------
+        pd.DataFrame
+            The analysis results of all configurations, with the name of the configuration as additional
+            outer index level `configuration`.
+
+        Examples
+        --------
+        ```pycon
+        >>> configurations = {
+        ...     f"{method}_{timeframe}": [
+        ...         AbsoluteCreatinineProbe(method=method, baseline_timeframe=timeframe),
+        ...         RelativeCreatinineProbe(method=method, baseline_timeframe=timeframe),
+        ...     ]
+        ...     for method, timeframe in itertools.product(CreatinineBaselineMethod, ["2d", "7d", "14d"])
+        ... }
+        >>> result_df = analyser.sweep(configurations)
+        ```
+
+        Raises
+        ------
+        ValueError
+            If the analyser uses the Polars engine.
+        """
+        if self._polars is not None:
+            raise ValueError("Sweeping probe configurations requires the pandas engine")
+
+        logger.info("Start probing %d configurations", len(configurations))
+
+        shared: dict = {}
+        precomputed = {name: self._precompute(probes, shared) for name, probes in configurations.items()}
+        bindings = {name: [_ProbeBinding(probe) for probe in probes] for name, probes in configurations.items()}
+
+        results: dict[str, list[pd.DataFrame]] = {name: [] for name in configurations}
+        for stay_id in self._stay_ids():
+            datasets = self._stay_datasets(stay_id)
+            for name in configurations:
+                results[name].append(self._probe_stay(stay_id, datasets, bindings[name], precomputed[name]))
+
+        logger.info("Finish probing")
+        return pd.concat({name: pd.concat(data) for name, data in results.items()}, names=["configuration"])
+
+    def _episodes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run-length encode the hourly analysis results to episodes.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The analysis results, as returned by `process_stays()`.
+
+        Returns
+        -------
+        pd.DataFrame
+            The episodes, see `process_episodes()`.
+        """
+        stays = df.index.get_level_values(self._stay_identifier).to_numpy()
+        times = pd.DatetimeIndex(df.index.get_level_values(-1))
+        stages = df["stage"].to_numpy(dtype=float)
+
+        criteria = df[[column for column in df.columns if str(column).endswith("_stage")]]
+        names = np.array([str(column).removesuffix("_stage") for column in criteria.columns] + [None], dtype=object)
+        reached = criteria.to_numpy(dtype=float) == stages[:, None]
+        first = np.where(reached.any(axis=1) & (stages > 0), reached.argmax(axis=1), len(criteria.columns))
+
+        # an episode starts with every new stay or change of the stage
+        keys = np.nan_to_num(stages, nan=-1)
+        starts = np.flatnonzero(np.r_[True, (stays[1:] != stays[:-1]) | (keys[1:] != keys[:-1])])
+        stops = np.r_[starts[1:], len(df)] - 1
+
+        episodes = pd.DataFrame(
+            {
+                self._stay_identifier: stays[starts],
+                "start": times[starts],
+                "end": times[stops] + pd.Timedelta("1h"),
+                "stage": stages[starts],
+                "criterion": names[first[starts]],
+            }
+        )
+        return episodes[episodes["stage"].notna()].reset_index(drop=True)
+
+    def _locate(self, df: pd.DataFrame, position: int) -> str:
+        """
+        Describe the stay and time of a row of the input data.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The DataFrame containing the row.
+        position : int
+            The position of the row.
+
+        Returns
+        -------
+        str
+            The identifiers of the row, taken from the identifier columns or else from the index.
+        """
+        identifiers = [c for c in (self._stay_identifier, self._time_identifier) if c in df.columns]
+        if identifiers:
+            return ", ".join(f"{c}={df[c].iat[position]}" for c in identifiers)
+
+        label = df.index[position]
+        labels = label if isinstance(label, tuple) else (label,)
+        return ", ".join(f"{name}={value}" for name, value in zip(df.index.names, labels))
+
+    def _query(
+        self,
+        columns: list[str],
+        data: list[Dataset],
+        probes: list[Probe],
+        preprocessors: list[Preprocessor],
+    ) -> tuple[list[Dataset], list[Probe], list[Preprocessor]]:
+        """
+        Select the datasets, probes and preprocessors required to calculate the requested columns.
+
+        Parameters
+        ----------
+        columns : list[str]
+            The requested columns of the analysis results.
+        data : list[Dataset]
+            The input datasets.
+        probes : list[Probe]
+            The configured probes.
+        preprocessors : list[Preprocessor]
+            The configured preprocessors.
+
+        Returns
+        -------
+        tuple[list[Dataset], list[Probe], list[Preprocessor]]
+            The required datasets, probes and preprocessors.
+
+        Raises
+        ------
+        ValueError
+            If a requested column is neither calculated by a probe nor contained in the input datasets.
+        """
+        available = {
+            "stage",
+            *(probe.RESNAME for probe in probes),
+            *(column for _, df in data for column in df.columns),
+        }
+        if unknown := [column for column in columns if column not in available]:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+        if "stage" not in columns:
+            probes = [probe for probe in probes if probe.RESNAME in columns]
+
+        required = {dtype for dtype, df in data if not df.columns.intersection(columns).empty}
+        for probe in probes:
+            required |= _dataset_types(probe.probe)
+
+        logger.info("Query requires datasets %s", ", ".join(sorted(required)))
+        return (
+            [dataset for dataset in data if dataset.dataset_type in required],
+            probes,
+            [
+                preprocessor
+                for preprocessor in preprocessors
+                if not _dataset_types(preprocessor.process).isdisjoint(required)
+            ],
+        )
+
+    def _process(self, backend: Backend, workers: Optional[int], chunk_size: int, summarize: bool) -> pd.DataFrame:
+        """
+        Process all stays with the given backend.
+
+        Parameters
+        ----------
+        backend : Backend
+            The backend used to process the stays.
+        workers : int, optional
+            The number of workers of the thread or process pool.
+        chunk_size : int
+            The number of stays processed by a worker at once.
+        summarize : bool
+            Flag indicating whether to summarise the results of every stay, see `summarize()`.
+
+        Returns
+        -------
+        pd.DataFrame
+            The analysis results or summaries of all stays.
+        """
+        if backend == Backend.SERIAL:
+            return self._process_chunk(self._stay_ids(), summarize)
+
+        return pd.concat(self._iter_chunks(backend, workers, chunk_size, summarize))
+
+    def _iter_chunks(
+        self,
+        backend: Backend,
+        workers: Optional[int],
+        chunk_size: int,
+        summarize: bool,
+        skip_stays: Optional[Collection[Any]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Process all stays in chunks with the given backend, yielding the chunks in order.
+
+        Parameters
+        ----------
+        backend : Backend
+            The backend used to process the stays.
+        workers : int, optional
+            The number of workers of the thread or process pool.
+        chunk_size : int
+            The number of stays per chunk.
+        summarize : bool
+            Flag indicating whether to summarise the results of every stay, see `summarize()`.
+        skip_stays : Collection, optional
+            The identifiers of stays that are not processed.
+
+        Yields
+        ------
+        pd.DataFrame
+            The analysis results or summaries of the stays of a chunk.
+        """
+        stay_ids = self._stay_ids()
+        if skip_stays:
+            stay_ids = stay_ids[~stay_ids.isin(list(skip_stays))]
+        chunks = [stay_ids[i : i + chunk_size] for i in range(0, len(stay_ids), chunk_size)]
+        if backend == Backend.SERIAL:
+            for chunk in chunks:
+                yield self._process_chunk(chunk, summarize)
+            return
+
+        executor: Executor
+        if backend == Backend.THREADS:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            process_chunk = self._process_chunk
+        elif backend == Backend.PROCESSES:
+            # forking a process that has started the Polars thread pool can deadlock
+            context = multiprocessing.get_context("spawn") if self._polars is not None else None
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(self,)
+            )
+            process_chunk = _process_chunk_in_worker
+        else:
+            raise ValueError(f"Invalid backend: {backend}")
+
+        with executor:
+            yield from executor.map(process_chunk, chunks, [summarize] * len(chunks))
+
+    def _process_chunk(self, stay_ids: pd.Index, summarize: bool = False) -> pd.DataFrame:
+        """
+        Process a chunk of stays.
+
+        Parameters
+        ----------
+        stay_ids : pd.Index
+            The identifiers of the stays to process.
+        summarize : bool, default: False
+            Flag indicating whether to summarise the results of every stay, see `summarize()`.
+
+        Returns
+        -------
+        pd.DataFrame
+            The analysis results or summaries of the stays.
+        """
+        if self._polars is not None:
+            df = self._polars.probe(self._frames, stay_ids)
+            if not summarize:
+                return df
+
+            stays = df.groupby(level=self._stay_identifier, sort=False)
+            return pd.DataFrame(
+                [self._summarize_stay(stay_df) for _, stay_df in stays],
+                index=pd.Index(list(stays.groups), name=self._stay_identifier),
+            )
+
+        if summarize:
+            return pd.DataFrame(
+                [self._summarize_stay(self.process_stay(stay_id)) for stay_id in stay_ids],
+                index=pd.Index(stay_ids, name=self._stay_identifier),
+            )
+
+        return pd.concat([self.process_stay(stay_id) for stay_id in stay_ids])
+
+    @staticmethod
+    def _summarize_stay(df: pd.DataFrame) -> dict[str, Any]:
+        """
+        Summarise the analysis results of a stay.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The analysis results of the stay.
+
+        Returns
+        -------
+        dict[str, Any]
+            The summary of the stay, see `summarize()`.
+        """
+        stages = df["stage"].to_numpy(dtype=float)
+        times = df.index.get_level_values(-1)
+
+        summary: dict[str, Any] = {"max_stage": np.nan if np.isnan(stages).all() else np.nanmax(stages)}
+        for stage in range(4):
+            reached = stages == stage
+            summary[f"first_stage_{stage}"] = times[reached.argmax()] if reached.any() else pd.NaT
+            summary[f"hours_stage_{stage}"] = int(reached.sum())
 
-        for probe in self._probes:
-            datasets = probe.probe(datasets)
+        return summary
+
+    def _stay_ids(self) -> pd.Index:
+        """
+        Get the identifiers of all stays in the input data.
+
+        Returns
+        -------
+        pd.Index
+            The stay identifiers.
+        """
+        if self._polars is not None:
+            return self._polars.stay_ids(self._frames)
+
+        (_, df), *datasets = self._data
+        stay_ids: pd.Index = df.index.get_level_values(self._stay_identifier).unique()
+        for _, df in datasets:
+            stay_ids.join(df.index.get_level_values(self._stay_identifier).unique())
+
+        return stay_ids
+
+    def _stay_datasets(self, stay_id: str) -> list[Dataset]:
+        """
+        Slice the data of a specific stay from the input data.
+
+        Parameters
+        ----------
+        stay_id : str
+            The identifier of the stay.
+
+        Returns
+        -------
+        list[Dataset]
+            The datasets of the stay.
+        """
+        datasets = []
+        for dtype, data in self._data:
+            if dtype in self._offsets:
+                if (rows := self._offsets[dtype].get(stay_id)) is not None:
+                    datasets.append(Dataset(dtype, data.iloc[rows].droplevel(0)))
+            elif stay_id in data.index:
+                datasets.append(Dataset(dtype, data.loc[stay_id]))  # type: ignore
+        return datasets
+
+    def _probe_stay(
+        self,
+        stay_id: str,
+        datasets: list[Dataset],
+        bindings: list["_ProbeBinding"],
+        precomputed: list[dict[str, pd.Series | pd.DataFrame]],
+    ) -> pd.DataFrame:
+        """
+        Apply probes to the datasets of a specific stay and merge their results.
+
+        Parameters
+        ----------
+        stay_id : str
+            The identifier of the stay.
+        datasets : list[Dataset]
+            The datasets of the stay.
+        bindings : list[_ProbeBinding]
+            The bound probes to apply.
+        precomputed : list[dict[str, pd.Series | pd.DataFrame]]
+            The intermediate results of the probes for all stays, see `Probe.precompute()`.
+
+        Returns
+        -------
+        pd.DataFrame
+            The analysis results for the specific stay.
+        """
+        frames: dict[DatasetType, pd.DataFrame] = dict(datasets)
+        for binding, intermediates in zip(bindings, precomputed):
+            kwargs = {name: value.loc[stay_id] for name, value in intermediates.items() if stay_id in value.index}
+            binding(frames, **kwargs)
+        datasets = [Dataset(dtype, df) for dtype, df in frames.items()]
+
+        # expand interval based results to hourly rows before merging
+        datasets = [
+            Dataset(dtype, expand_intervals(df) if isinstance(df, pd.DataFrame) and INTERVAL_END in df.columns else df)
+            for dtype, df in datasets
+        ]
+        if self._columns is not None:  # drop unused columns before merging
+            keep = [*self._columns, *(binding.probe.RESNAME for binding in bindings)]
+            datasets = [Dataset(dtype, df.filter(items=keep)) for dtype, df in datasets]
 
         (_, df), *datasets = datasets
         for _, _df in datasets:
             if isinstance(_df, pd.Series):
                 _df = pd.DataFrame([_df], index=df.index)
-            columns = set(_df.columns) - set(df.columns)
-            df = df.merge(_df[[*columns]], how="outer", left_index=True, right_index=True)
+            columns = [column for column in _df.columns if column not in df.columns]  # keep a stable order
+            df = df.merge(_df[columns], how="outer", left_index=True, right_index=True)
 
         df["stage"] = df.filter(like="stage").max(axis=1)
+        if self._columns is not None:
+            df = df[[column for column in self._columns if column in df.columns]]
+
         return df.set_index(
             pd.MultiIndex.from_arrays(
                 [[stay_id] * len(df), df.index.values],
                 names=(self._stay_identifier, df.index.name),
             )
         )
+
+    def _precompute(
+        self, probes: list[Probe], shared: Optional[dict] = None
+    ) -> list[dict[str, pd.Series | pd.DataFrame]]:
+        """
+        Precompute the intermediate results of the probes for all stays.
+
+        Parameters
+        ----------
+        probes : list[Probe]
+            The probes to precompute the intermediate results for.
+        shared : dict, optional
+            A mapping to share intermediate results between probes with the same configuration.
+
+        Returns
+        -------
+        list[dict[str, pd.Series | pd.DataFrame]]
+            The intermediate results of each probe.
+        """
+        shared = {} if shared is None else shared
+        return [probe.precompute(self._data, self._stay_identifier, shared) for probe in probes]
+
+
+def _polars_engine(
+    preprocessors: list[Preprocessor],
+    probes: list[Probe],
+    stay_identifier: str,
+    time_identifier: str,
+    columns: Optional[list[str]],
+) -> "PolarsEngine":
+    """
+    Create the Polars engine, importing the optional Polars dependency.
+
+    Parameters
+    ----------
+    preprocessors : list[Preprocessor]
+        The preprocessors to apply.
+    probes : list[Probe]
+        The probes to apply.
+    stay_identifier : str
+        The column name in the input data representing the stay identifier.
+    time_identifier : str
+        The column name in the input data representing the time identifier.
+    columns : list[str], optional
+        The columns of the analysis results.
+
+    Returns
+    -------
+    PolarsEngine
+        The engine.
+
+    Raises
+    ------
+    ImportError
+        If Polars is not installed.
+    """
+    try:
+        from pyaki.polars_engine import PolarsEngine
+    except ImportError as e:
+        raise ImportError("Engine.POLARS requires polars, install it with `pip install pyaki[polars]`") from e
+
+    return PolarsEngine(preprocessors, probes, stay_identifier, time_identifier, columns)
+
+
+def _dataset_types(method: Callable) -> set[DatasetType]:
+    """
+    Get the dataset types required by a probe or preprocessor method.
+
+    Parameters
+    ----------
+    method : Callable
+        The `probe()` or `process()` method.
+
+    Returns
+    -------
+    set[DatasetType]
+        The dataset types declared with `dataset_as_df()`, or all dataset types for undecorated methods.
+    """
+    return set(getattr(method, "dataset_types", DatasetType))
+
+
+class _ProbeBinding:
+    """
+    Class binding a probe to the datasets of a stay.
+
+    The datasets required by `probe()` are resolved once from the `dataset_as_df()` and `df_to_dataset()`
+    decorators, so the probe function is called directly with the DataFrames of a stay instead of going
+    through the decorators for every stay. Probes without these decorators are called through `probe()`.
+
+    Parameters
+    ----------
+    probe : Probe
+        The probe to bind.
+    """
+
+    def __init__(self, probe: Probe) -> None:
+        self.probe: Probe = probe
+
+        method = probe.probe
+        self._mapping: Optional[dict[str, DatasetType]] = getattr(method, "dataset_mapping", None)
+        self._dataset_type: Optional[DatasetType] = getattr(method, "dataset_type", None)
+        self._func: Optional[Callable] = None
+        if self._mapping is not None and self._dataset_type is not None:
+            self._func = method.__wrapped__.__wrapped__  # type: ignore
+
+    def __call__(self, frames: dict[DatasetType, pd.DataFrame], **kwargs: Any) -> None:
+        """
+        Apply the probe to the datasets of a stay, replacing its dataset with the result.
+
+        Parameters
+        ----------
+        frames : dict[DatasetType, pd.DataFrame]
+            The datasets of the stay, mapped by dataset type.
+        **kwargs
+            Additional keyword arguments for the probe.
+        """
+        if self._func is None or self._mapping is None or self._dataset_type is None:
+            datasets = self.probe.probe([Dataset(dtype, df) for dtype, df in frames.items()], **kwargs)
+            frames.clear()
+            frames.update(datasets)
+            return
+
+        if any(dtype not in frames for dtype in self._mapping.values()):
+            logger.warning("Skip %s because one or more datasets are missing to probe", type(self.probe).__name__)
+            return
+
+        result = self._func(self.probe, **{name: frames[dtype] for name, dtype in self._mapping.items()}, **kwargs)
+        if self._dataset_type in frames:
+            frames[self._dataset_type] = result
+
+    def __reduce__(self) -> tuple[type, tuple[Probe]]:
+        # the unwrapped probe function cannot be pickled by reference, so rebind after unpickling
+        return _ProbeBinding, (self.probe,)
+
+
+_worker_analyser: Optional[Analyser] = None
+
+
+def _init_worker(analyser: Analyser) -> None:
+    """
+    Initialize a worker process of the process pool backend with the analyser.
+
+    Parameters
+    ----------
+    analyser : Analyser
+        The analyser used by the worker process.
+    """
+    global _worker_analyser
+    _worker_analyser = analyser
+
+
+def _process_chunk_in_worker(stay_ids: pd.Index, summarize: bool = False) -> pd.DataFrame:
+    """
+    Process a chunk of stays in a worker process of the process pool backend.
+
+    Parameters
+    ----------
+    stay_ids : pd.Index
+        The identifiers of the stays to process.
+    summarize : bool, default: False
+        Flag indicating whether to summarise the results of every stay.
+
+    Returns
+    -------
+    pd.DataFrame
+        The analysis results or summaries of the stays.
+    """
+    assert _worker_analyser is not None, "worker process is not initialized"
+    return _worker_analyser._process_chunk(stay_ids, summarize)
@@ -0,0 +1,217 @@
+"""
+This module contains the analysis of cohorts that are partitioned by stay, e.g. for cohorts larger than memory.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import pandas as pd
+
+from pyaki.kdigo import Analyser
+from pyaki.preprocessors import Preprocessor
+from pyaki.probes import Probe
+from pyaki.utils import Dataset, DatasetType
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionedAnalyser:
+    """
+    Class for analysing a cohort that is partitioned by stay.
+
+    Every partition holds all rows of its stays in every dataset, so the partitions are preprocessed and probed
+    independently by an `Analyser`, with only one partition in memory at once. A partition is given as one
+    DataFrame, Parquet file or Dask delayed object per dataset type.
+
+    Parameters
+    ----------
+    dataset_types : list[DatasetType]
+        The types of the datasets of every partition.
+    partitions : list[list[Any]]
+        The partitions, each a list with one `pd.DataFrame`, path of a Parquet file, or `dask.delayed` DataFrame
+        per dataset type. Datasets that are None are missing in the partition.
+    probes : list[Probe], optional
+        The probes to apply, see `Analyser`.
+    preprocessors : list[Preprocessor], optional
+        The preprocessors to apply, see `Analyser`.
+    stay_identifier : str, default: "stay_id"
+        The column name in the input data representing the stay identifier.
+    time_identifier : str, default: "charttime"
+        The column name in the input data representing the time identifier.
+    columns : list[str], optional
+        The columns of the analysis results, see `Analyser`.
+
+    Examples
+    --------
+    Analyse a directory with one subdirectory of Parquet files per dataset type, one partition at a time
+    ```pycon
+    >>> analyser = PartitionedAnalyser.from_parquet("cohort")
+    >>> for result_df in analyser.process_partitions():
+    ...     ...
+    ```
+
+    Build a lazy Dask graph from Dask DataFrames partitioned by stay
+    ```pycon
+    >>> analyser = PartitionedAnalyser.from_dask([(DatasetType.URINEOUTPUT, urineoutput_ddf), ...])
+    >>> result_ddf = dask.dataframe.from_delayed(analyser.to_delayed())
+    ```
+    """
+
+    def __init__(
+        self,
+        dataset_types: list[DatasetType],
+        partitions: list[list[Any]],
+        probes: Optional[list[Probe]] = None,
+        preprocessors: Optional[list[Preprocessor]] = None,
+        stay_identifier: str = "stay_id",
+        time_identifier: str = "charttime",
+        columns: Optional[list[str]] = None,
+    ) -> None:
+        if any(len(partition) != len(dataset_types) for partition in partitions):
+            raise ValueError("Every partition needs one dataset per dataset type")
+
+        self._dataset_types: list[DatasetType] = dataset_types
+        self._partitions: list[list[Any]] = partitions
+        self._kwargs: dict[str, Any] = {
+            "probes": probes,
+            "preprocessors": preprocessors,
+            "stay_identifier": stay_identifier,
+            "time_identifier": time_identifier,
+            "columns": columns,
+        }
+
+    @classmethod
+    def from_parquet(cls, path: str | Path, **kwargs: Any) -> "PartitionedAnalyser":
+        """
+        Create an analyser for a directory of Parquet files partitioned by stay.
+
+        The directory contains one subdirectory per dataset type, named like the dataset type, e.g. `creatinine`.
+        Files with the same name in different subdirectories belong to the same partition.
+
+        Parameters
+        ----------
+        path : str or Path
+            The directory of the partitioned datasets.
+        **kwargs
+            Additional keyword arguments for the analyser.
+
+        Returns
+        -------
+        PartitionedAnalyser
+            The analyser for the partitioned datasets.
+        """
+        root_dir = Path(path)
+        dataset_types = [dtype for dtype in DatasetType if (root_dir / dtype).is_dir()]
+        names = sorted({file.name for dtype in dataset_types for file in (root_dir / dtype).glob("*.parquet")})
+
+        partitions = [
+            [file if (file := root_dir / dtype / name).is_file() else None for dtype in dataset_types] for name in names
+        ]
+        logger.info("Found %d partitions of %d datasets in %s", len(partitions), len(dataset_types), root_dir)
+        return cls(dataset_types, partitions, **kwargs)
+
+    @classmethod
+    def from_dask(cls, datasets: list[tuple[DatasetType, Any]], **kwargs: Any) -> "PartitionedAnalyser":
+        """
+        Create an analyser for Dask DataFrames partitioned by stay.
+
+        The n-th partitions of all DataFrames must contain the same stays.
+
+        Parameters
+        ----------
+        datasets : list[tuple[DatasetType, dask.dataframe.DataFrame]]
+            The Dask DataFrames, with their dataset type.
+        **kwargs
+            Additional keyword arguments for the analyser.
+
+        Returns
+        -------
+        PartitionedAnalyser
+            The analyser for the partitioned datasets.
+
+        Raises
+        ------
+        ValueError
+            If the DataFrames have different numbers of partitions.
+        """
+        if len({ddf.npartitions for _, ddf in datasets}) > 1:
+            raise ValueError("All Dask DataFrames need the same number of partitions")
+
+        partitions = [list(partition) for partition in zip(*(ddf.to_delayed() for _, ddf in datasets))]
+        return cls([dtype for dtype, _ in datasets], partitions, **kwargs)
+
+    def process_partitions(self) -> Iterator[pd.DataFrame]:
+        """
+        Process the partitions one after another.
+
+        Yields
+        ------
+        pd.DataFrame
+            The analysis results for the stays of a partition.
+        """
+        for i, partition in enumerate(self._partitions):
+            logger.info("Processing partition %d of %d", i + 1, len(self._partitions))
+            yield _process_partition(self._dataset_types, partition, self._kwargs)
+
+    def process_stays(self) -> pd.DataFrame:
+        """
+        Process all partitions and concatenate their results.
+
+        Returns
+        -------
+        pd.DataFrame
+            The analysis results for all stays.
+        """
+        return pd.concat(self.process_partitions())
+
+    def to_delayed(self) -> list[Any]:
+        """
+        Build a lazy Dask graph that processes the partitions.
+
+        The graph can be computed with any Dask scheduler, e.g. `dask.compute(*delayed, scheduler="threads")`,
+        or converted to a Dask DataFrame with `dask.dataframe.from_delayed()`.
+
+        Returns
+        -------
+        list[dask.delayed.Delayed]
+            The delayed analysis results of every partition.
+
+        Raises
+        ------
+        ImportError
+            If Dask is not installed.
+        """
+        try:
+            from dask import delayed
+        except ImportError as e:
+            raise ImportError("to_delayed() requires dask, install it with `pip install pyaki[dask]`") from e
+
+        process_partition = delayed(_process_partition, pure=True)
+        return [process_partition(self._dataset_types, partition, self._kwargs) for partition in self._partitions]
+
+
+def _process_partition(dataset_types: list[DatasetType], partition: list[Any], kwargs: dict[str, Any]) -> pd.DataFrame:
+    """
+    Helper function to preprocess and probe the datasets of a partition.
+
+    Parameters
+    ----------
+    dataset_types : list[DatasetType]
+        The types of the datasets.
+    partition : list[Any]
+        The DataFrames or paths of Parquet files of the datasets, or None for missing datasets.
+    kwargs : dict[str, Any]
+        The keyword arguments for the analyser.
+
+    Returns
+    -------
+    pd.DataFrame
+        The analysis results for the stays of the partition.
+    """
+    datasets = [
+        Dataset(dtype, df if isinstance(df, pd.DataFrame) else pd.read_parquet(df))
+        for dtype, df in zip(dataset_types, partition)
+        if df is not None
+    ]
+    return Analyser(datasets, **kwargs).process_stays()
@@ -0,0 +1,533 @@
+"""
+This module contains the Polars engine, which runs the preprocessors and probes as Polars lazy queries.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Any, Callable, Collection, Optional
+
+import pandas as pd
+import polars as pl
+import polars.selectors as cs
+
+from pyaki.preprocessors import (
+    CreatininePreProcessor,
+    DemographicsPreProcessor,
+    Preprocessor,
+    RRTPreProcessor,
+    TimeIndexCreator,
+    UrineOutputPreProcessor,
+)
+from pyaki.probes import (
+    AbsoluteCreatinineProbe,
+    AbstractCreatinineProbe,
+    CreatinineBaselineMethod,
+    Probe,
+    RelativeCreatinineProbe,
+    RRTProbe,
+    UrineOutputMethod,
+    UrineOutputProbe,
+)
+from pyaki.utils import Dataset, DatasetType
+
+logger = logging.getLogger(__name__)
+
+_PATIENT: str = "__patient"  # name of the column marking rows of stays with demographics
+_BASELINE: str = "__baseline"  # name of the column holding the creatinine baseline
+
+
+class PolarsEngine:
+    """
+    Class for running the preprocessors and probes of an analysis as Polars lazy queries.
+
+    The engine translates the configuration of the built-in preprocessors and probes to Polars expressions
+    instead of calling their pandas implementation: the hourly binning is a `group_by_dynamic()` aggregation and
+    the rolling windows are evaluated over the stays with `over()`. The results match the pandas implementation,
+    except that the identifier columns are not repeated as value columns and all numeric columns are returned as
+    float64. Custom preprocessors and probes cannot be translated and are rejected.
+
+    Attributes
+    ----------
+    BASELINE_METHODS : set[CreatinineBaselineMethod]
+        The creatinine baseline methods supported by the engine.
+
+    Parameters
+    ----------
+    preprocessors : list[Preprocessor]
+        The preprocessors to apply.
+    probes : list[Probe]
+        The probes to apply.
+    stay_identifier : str, default: "stay_id"
+        The column name in the input data representing the stay identifier.
+    time_identifier : str, default: "charttime"
+        The column name in the input data representing the time identifier.
+    columns : list[str], optional
+        The columns of the analysis results, see `Analyser`.
+
+    Raises
+    ------
+    ValueError
+        If a preprocessor or probe is not supported by the engine.
+
+    Examples
+    --------
+    ```pycon
+    >>> analyser = Analyser(datasets, engine=Engine.POLARS)
+    ```
+    """
+
+    BASELINE_METHODS: set[CreatinineBaselineMethod] = {
+        CreatinineBaselineMethod.ROLLING_MIN,
+        CreatinineBaselineMethod.ROLLING_MEAN,
+        CreatinineBaselineMethod.FIXED_MEAN,
+        CreatinineBaselineMethod.OVERALL_FIRST,
+        CreatinineBaselineMethod.OVERALL_MIN,
+        CreatinineBaselineMethod.OVERALL_MEAN,
+    }
+
+    def __init__(
+        self,
+        preprocessors: list[Preprocessor],
+        probes: list[Probe],
+        stay_identifier: str = "stay_id",
+        time_identifier: str = "charttime",
+        columns: Optional[list[str]] = None,
+    ) -> None:
+        for preprocessor in preprocessors:
+            if type(preprocessor) not in _PREPROCESSORS:
+                raise ValueError(f"The polars engine does not support {type(preprocessor).__name__}")
+            if isinstance(preprocessor, RRTPreProcessor) and preprocessor._intervals:
+                raise ValueError("The polars engine does not support RRT intervals")
+            if isinstance(preprocessor, UrineOutputPreProcessor) and not preprocessor._resample:
+                raise ValueError("The polars engine does not support irregular urine output")
+            if isinstance(preprocessor, CreatininePreProcessor) and preprocessor._sparse:
+                raise ValueError("The polars engine does not support sparse creatinine")
+
+        for probe in probes:
+            if type(probe) not in _PROBES:
+                raise ValueError(f"The polars engine does not support {type(probe).__name__}")
+            if isinstance(probe, AbstractCreatinineProbe) and probe._method not in self.BASELINE_METHODS:
+                raise ValueError(f"The polars engine does not support the creatinine baseline method {probe._method}")
+            if isinstance(probe, UrineOutputProbe) and probe._irregular:
+                raise ValueError("The polars engine does not support irregular urine output")
+
+        self._preprocessors: list[Preprocessor] = preprocessors
+        self._probes: list[Probe] = probes
+        self._stay_identifier: str = stay_identifier
+        self._time_identifier: str = time_identifier
+        self._columns: Optional[list[str]] = columns
+
+    def preprocess(self, datasets: list[Dataset]) -> dict[DatasetType, pl.DataFrame]:
+        """
+        Apply the preprocessors to the datasets.
+
+        Parameters
+        ----------
+        datasets : list[Dataset]
+            The input datasets.
+
+        Returns
+        -------
+        dict[DatasetType, pl.DataFrame]
+            The preprocessed datasets, mapped by dataset type in the order of the input datasets.
+        """
+        frames = {dtype: _to_polars(df).lazy() for dtype, df in datasets}
+        for preprocessor in self._preprocessors:
+            process = _PREPROCESSORS[type(preprocessor)]
+            for dtype in _dataset_types(preprocessor).intersection(frames):
+                frames[dtype] = process(preprocessor, frames[dtype], self._stay_identifier, self._time_identifier)
+
+        return dict(zip(frames, pl.collect_all(list(frames.values()))))
+
+    def stay_ids(self, frames: dict[DatasetType, pl.DataFrame]) -> pd.Index:
+        """
+        Get the identifiers of the stays in the preprocessed datasets.
+
+        Like the pandas implementation, the stays are taken from the first dataset.
+
+        Parameters
+        ----------
+        frames : dict[DatasetType, pl.DataFrame]
+            The preprocessed datasets.
+
+        Returns
+        -------
+        pd.Index
+            The stay identifiers.
+        """
+        df = next(iter(frames.values()))
+        stay_ids: pd.Index = pd.Index(df[self._stay_identifier].unique(maintain_order=True).to_pandas())
+        return stay_ids
+
+    def probe(self, frames: dict[DatasetType, pl.DataFrame], stay_ids: Collection[Any]) -> pd.DataFrame:
+        """
+        Apply the probes to the preprocessed datasets of the given stays and merge their results.
+
+        Parameters
+        ----------
+        frames : dict[DatasetType, pl.DataFrame]
+            The preprocessed datasets.
+        stay_ids : Collection
+            The identifiers of the stays to process.
+
+        Returns
+        -------
+        pd.DataFrame
+            The analysis results for the stays, indexed by stay and time.
+        """
+        stay, time = self._stay_identifier, self._time_identifier
+        stays = pl.Series(list(stay_ids))
+        lfs = {dtype: df.lazy().filter(pl.col(stay).is_in(stays)) for dtype, df in frames.items()}
+
+        patient = lfs.get(DatasetType.DEMOGRAPHICS)
+        for probe in self._probes:
+            dtype = probe.probe.dataset_type  # type: ignore
+            if any(_dtype not in lfs for _dtype in probe.probe.dataset_types):  # type: ignore
+                logger.warning("Skip %s because one or more datasets are missing to probe", type(probe).__name__)
+                continue
+            lfs[dtype] = _PROBES[type(probe)](probe, lfs[dtype], patient, stay, time)
+
+        # columns in the order of the datasets, as merged by the pandas implementation
+        names: list[str] = []
+        for lf in lfs.values():
+            names += [name for name in lf.collect_schema().names() if name not in (stay, time, *names)]
+
+        keep = None if self._columns is None else {*self._columns, *(probe.RESNAME for probe in self._probes)}
+        stages = [name for name in names if "stage" in name and (keep is None or name in keep)]
+
+        series = [lf for dtype, lf in lfs.items() if dtype != DatasetType.DEMOGRAPHICS]
+        df, *others = series
+        for other in others:
+            df = df.join(other, on=[stay, time], how="full", coalesce=True)
+        if patient is not None:
+            df = df.join(patient, on=stay, how="left")
+
+        df = df.sort([stay, time]).with_columns(
+            (pl.max_horizontal(stages) if stages else pl.lit(None)).cast(pl.Float64).alias("stage")
+        )
+        names.append("stage")
+        if self._columns is not None:
+            names = [name for name in self._columns if name in names]
+
+        result = (
+            df.select(stay, time, *names)
+            .with_columns(cs.numeric().exclude(stay).cast(pl.Float64), pl.col(time).cast(pl.Datetime("ns")))
+            .collect()
+            .to_pandas()
+        )
+        return result.set_index([stay, time])
+
+
+def _to_polars(df: pd.DataFrame) -> pl.DataFrame:
+    """
+    Helper function to convert a pandas DataFrame to Polars, moving named index levels to columns.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The pandas DataFrame.
+
+    Returns
+    -------
+    pl.DataFrame
+        The Polars DataFrame.
+    """
+    if any(name is not None for name in df.index.names):
+        df = df.reset_index()
+    return pl.from_pandas(df)
+
+
+def _dataset_types(preprocessor: Preprocessor) -> set[DatasetType]:
+    """
+    Helper function to get the dataset types processed by a preprocessor.
+
+    Parameters
+    ----------
+    preprocessor : Preprocessor
+        The preprocessor.
+
+    Returns
+    -------
+    set[DatasetType]
+        The dataset types.
+    """
+    if isinstance(preprocessor, TimeIndexCreator):
+        return set(preprocessor.DATASETS)
+    return set(preprocessor.process.dataset_types)  # type: ignore
+
+
+def _value_columns(lf: pl.LazyFrame, stay: str, time: str) -> list[str]:
+    """
+    Helper function to get the columns of a dataset that are not identifiers.
+
+    Parameters
+    ----------
+    lf : pl.LazyFrame
+        The dataset.
+    stay : str
+        The stay identifier.
+    time : str
+        The time identifier.
+
+    Returns
+    -------
+    list[str]
+        The names of the columns.
+    """
+    return [name for name in lf.collect_schema().names() if name not in (stay, time)]
+
+
+def _resample_hourly(lf: pl.LazyFrame, stay: str, time: str, agg: Callable[[pl.Expr], pl.Expr]) -> pl.LazyFrame:
+    """
+    Helper function to aggregate the rows of every stay to hourly bins, like a grouped `resample("1h")`.
+
+    Every stay gets a row for every hour between its first and its last bin, with missing values for empty bins.
+
+    Parameters
+    ----------
+    lf : pl.LazyFrame
+        The dataset, sorted by stay and time.
+    stay : str
+        The stay identifier.
+    time : str
+        The time identifier.
+    agg : Callable[[pl.Expr], pl.Expr]
+        The aggregation applied to the value columns.
+
+    Returns
+    -------
+    pl.LazyFrame
+        The hourly bins, sorted by stay and time.
+    """
+    dtype = lf.collect_schema()[time]
+    bins = lf.group_by_dynamic(time, every="1h", group_by=stay).agg(agg(pl.exclude(stay, time)))
+    grid = bins.group_by(stay).agg(
+        pl.datetime_range(
+            pl.col(time).min(),
+            pl.col(time).max(),
+            "1h",
+            time_unit=getattr(dtype, "time_unit", None),
+            time_zone=getattr(dtype, "time_zone", None),
+        )
+    )
+    return grid.explode(time).join(bins, on=[stay, time], how="left").sort([stay, time])
+
+
+def _process_time_index(preprocessor: TimeIndexCreator, lf: pl.LazyFrame, stay: str, time: str) -> pl.LazyFrame:
+    """Helper function to parse and sort the timestamps, see `TimeIndexCreator`."""
+    schema = lf.collect_schema()
+    if time not in schema:
+        return lf
+
+    if not isinstance(schema[time], pl.Datetime):
+        lf = lf.with_columns(pl.col(time).str.to_datetime(format=preprocessor._time_format))
+    if preprocessor._assume_sorted:
+        return lf
+    return lf.sort([name for name in (stay, time) if name in schema], maintain_order=True)
+
+
+def _process_urineoutput(preprocessor: UrineOutputPreProcessor, lf: pl.LazyFrame, stay: str, time: str) -> pl.LazyFrame:
+    """Helper function to resample and interpolate the urine output, see `UrineOutputPreProcessor`."""
+    columns = _value_columns(lf, stay, time)
+    values = pl.col(preprocessor._urineoutput_column)
+
+    lf = _resample_hourly(lf, stay, time, lambda columns: columns.sum())
+    lf = lf.with_columns(pl.when(values != 0).then(pl.col(column)).alias(column) for column in columns)
+    if not preprocessor._interpolate:
+        return lf
+
+    # like the pandas implementation, gaps are counted and filled across the boundaries of stays
+    missing = values.is_null()
+    gap = missing.cast(pl.Int64).cum_sum().over((~missing).cum_sum())
+    lf = lf.with_columns(values / (gap.shift(1).clip(upper_bound=preprocessor._threshold) + 1).fill_null(1))
+    return lf.with_columns(pl.col(columns).fill_null(strategy="backward", limit=preprocessor._threshold))
+
+
+def _process_creatinine(preprocessor: CreatininePreProcessor, lf: pl.LazyFrame, stay: str, time: str) -> pl.LazyFrame:
+    """Helper function to resample and forward fill the creatinine, see `CreatininePreProcessor`."""
+    columns = _value_columns(lf, stay, time)
+    values = pl.col(preprocessor._creatinine_column)
+
+    lf = _resample_hourly(lf, stay, time, lambda columns: columns.mean())
+    if not preprocessor._ffill:
+        return lf
+
+    lf = lf.with_columns(pl.when(values == 0).then(None).otherwise(pl.col(column)).alias(column) for column in columns)
+    return lf.with_columns(pl.col(columns).fill_null(strategy="forward", limit=preprocessor._threshold))
+
+
+def _process_demographics(
+    preprocessor: DemographicsPreProcessor, lf: pl.LazyFrame, stay: str, time: str
+) -> pl.LazyFrame:
+    """Helper function to aggregate the demographics of every stay, see `DemographicsPreProcessor`."""
+    return lf.group_by(stay).agg(pl.exclude(stay).drop_nulls().last()).sort(stay)
+
+
+def _process_rrt(preprocessor: RRTPreProcessor, lf: pl.LazyFrame, stay: str, time: str) -> pl.LazyFrame:
+    """Helper function to resample and forward fill the RRT status, see `RRTPreProcessor`."""
+    columns = _value_columns(lf, stay, time)
+    lf = _resample_hourly(lf, stay, time, lambda columns: columns.drop_nulls().last())
+    return lf.with_columns(pl.col(columns).fill_null(strategy="forward"))
+
+
+def _approx_gte(x: pl.Expr, y: float) -> pl.Expr:
+    """Helper function to check if x is greater than or approximately equal to y, see `approx_gte()`."""
+    return (x >= y) | ((x - y).abs() <= 1e-8 + 1e-5 * abs(y))
+
+
+def _with_patient(
+    lf: pl.LazyFrame, patient: pl.LazyFrame, stay: str, columns: list[str], stage: pl.Expr, name: str
+) -> pl.LazyFrame:
+    """
+    Helper function to calculate a stage from the patient information of every stay.
+
+    Stays without patient information get no stage, like stays that are skipped by the pandas implementation.
+
+    Parameters
+    ----------
+    lf : pl.LazyFrame
+        The dataset to add the stage to.
+    patient : pl.LazyFrame
+        The demographics dataset.
+    stay : str
+        The stay identifier.
+    columns : list[str]
+        The columns of the demographics used by the stage expression.
+    stage : pl.Expr
+        The expression of the stage.
+    name : str
+        The name of the stage column.
+
+    Returns
+    -------
+    pl.LazyFrame
+        The dataset with the stage column.
+    """
+    patient = patient.select(stay, *columns, pl.lit(True).alias(_PATIENT))
+    return (
+        lf.join(patient, on=stay, how="left", maintain_order="left")
+        .with_columns(pl.when(pl.col(_PATIENT)).then(stage).cast(pl.Float64).alias(name))
+        .drop(*columns, _PATIENT)
+    )
+
+
+def _probe_urineoutput(
+    probe: UrineOutputProbe, lf: pl.LazyFrame, patient: Optional[pl.LazyFrame], stay: str, time: str
+) -> pl.LazyFrame:
+    """Helper function to calculate the urine output stage, see `UrineOutputProbe`."""
+    assert patient is not None
+    if probe._patient_weight_column not in patient.collect_schema():
+        raise ValueError("Missing weight for stay")
+
+    how = "max" if probe._method == UrineOutputMethod.STRICT else "mean"
+    values = pl.col(probe._column)
+    weight = pl.col(probe._patient_weight_column)
+
+    def rolling(agg: str, window: int) -> pl.Expr:
+        rolling: pl.Expr = getattr(values, f"rolling_{agg}")(window)
+        return rolling.over(stay)
+
+    # the first matching condition determines the stage, so the conditions are ordered from the highest stage
+    stage = (
+        pl.when(values.is_null())
+        .then(None)
+        .when(rolling(how, 12) / weight < probe._anuria_limit)
+        .then(3)
+        .when(rolling(how, 24) / weight < 0.3)
+        .then(3)
+        .when(rolling(how, 12) / weight < 0.5)
+        .then(2)
+        .when(rolling(how, 6) / weight < 0.5)
+        .then(1)
+        .when(rolling("min", 6) >= 0)
+        .then(0)
+    )
+    return _with_patient(lf, patient, stay, [probe._patient_weight_column], stage, probe.RESNAME)
+
+
+def _creatinine_baseline(probe: AbstractCreatinineProbe, stay: str, time: str) -> pl.Expr:
+    """Helper function to calculate the creatinine baseline, see `AbstractCreatinineProbe.creatinine_baseline()`."""
+    values = pl.col(probe._column)
+    positive = pl.when(values > 0).then(values)
+    timeframe = timedelta(seconds=pd.Timedelta(probe._baseline_timeframe).total_seconds())
+
+    if probe._method in (CreatinineBaselineMethod.ROLLING_MIN, CreatinineBaselineMethod.ROLLING_MEAN):
+        agg = "min" if probe._method == CreatinineBaselineMethod.ROLLING_MIN else "mean"
+        rolling = getattr(positive, f"rolling_{agg}_by")(time, window_size=timeframe).over(stay)
+        return pl.when(values > 0).then(rolling).forward_fill().over(stay)
+    if probe._method == CreatinineBaselineMethod.FIXED_MEAN:
+        return pl.when(pl.col(time) <= pl.col(time).first() + timeframe).then(values).mean().over(stay)
+    if probe._method == CreatinineBaselineMethod.OVERALL_FIRST:
+        return positive.drop_nulls().first().over(stay)
+    if probe._method == CreatinineBaselineMethod.OVERALL_MIN:
+        return positive.min().over(stay)
+    if probe._method == CreatinineBaselineMethod.OVERALL_MEAN:
+        return positive.mean().over(stay)
+
+    raise ValueError(f"The polars engine does not support the creatinine baseline method {probe._method}")
+
+
+def _probe_absolute_creatinine(
+    probe: AbsoluteCreatinineProbe, lf: pl.LazyFrame, patient: Optional[pl.LazyFrame], stay: str, time: str
+) -> pl.LazyFrame:
+    """Helper function to calculate the absolute creatinine stage, see `AbsoluteCreatinineProbe`."""
+    assert patient is not None
+    values = pl.col(probe._column)
+    stage = (
+        pl.when(values.is_null())
+        .then(None)
+        .when(_approx_gte(values, 4))
+        .then(3)
+        .when(_approx_gte(values - pl.col(_BASELINE), 0.3))
+        .then(1)
+        .otherwise(0)
+    )
+    lf = lf.with_columns(_creatinine_baseline(probe, stay, time).alias(_BASELINE))
+    return _with_patient(lf, patient, stay, [], stage, probe.RESNAME).drop(_BASELINE)
+
+
+def _probe_relative_creatinine(
+    probe: RelativeCreatinineProbe, lf: pl.LazyFrame, patient: Optional[pl.LazyFrame], stay: str, time: str
+) -> pl.LazyFrame:
+    """Helper function to calculate the relative creatinine stage, see `RelativeCreatinineProbe`."""
+    assert patient is not None
+    values = pl.col(probe._column)
+    ratio = values / pl.col(_BASELINE)
+    stage = (
+        pl.when(values.is_null())
+        .then(None)
+        .when(_approx_gte(ratio, 3))
+        .then(3)
+        .when(_approx_gte(ratio, 2))
+        .then(2)
+        .when(_approx_gte(ratio, 1.5))
+        .then(1)
+        .otherwise(0)
+    )
+    lf = lf.with_columns(_creatinine_baseline(probe, stay, time).alias(_BASELINE))
+    return _with_patient(lf, patient, stay, [], stage, probe.RESNAME).drop(_BASELINE)
+
+
+def _probe_rrt(
+    probe: RRTProbe, lf: pl.LazyFrame, patient: Optional[pl.LazyFrame], stay: str, time: str
+) -> pl.LazyFrame:
+    """Helper function to calculate the RRT stage, see `RRTProbe`."""
+    values = pl.col(probe._column)
+    stage = pl.when(values.is_null()).then(None).when(values == 1).then(3).otherwise(0)
+    return lf.with_columns(stage.cast(pl.Float64).alias(probe.RESNAME))
+
+
+_PREPROCESSORS: dict[type, Callable[[Any, pl.LazyFrame, str, str], pl.LazyFrame]] = {
+    TimeIndexCreator: _process_time_index,
+    UrineOutputPreProcessor: _process_urineoutput,
+    CreatininePreProcessor: _process_creatinine,
+    DemographicsPreProcessor: _process_demographics,
+    RRTPreProcessor: _process_rrt,
+}
+
+_PROBES: dict[type, Callable[[Any, pl.LazyFrame, Optional[pl.LazyFrame], str, str], pl.LazyFrame]] = {
+    UrineOutputProbe: _probe_urineoutput,
+    AbsoluteCreatinineProbe: _probe_absolute_creatinine,
+    RelativeCreatinineProbe: _probe_relative_creatinine,
+    RRTProbe: _probe_rrt,
+}
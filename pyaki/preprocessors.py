@@ -2,13 +2,19 @@
 This module contains the preprocessors used in the pyaki package.
 """
 
+import logging
 from abc import ABC
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 from pandas.api.types import is_datetime64_any_dtype
 
-from pyaki.utils import Dataset, DatasetType, dataset_as_df, df_to_dataset
+from pyaki.utils import INTERVAL_END, Dataset, DatasetType, dataset_as_df, df_to_dataset
+
+logger = logging.getLogger(__name__)
+
+_SORTED = "sorted"  # key of the DataFrame attribute marking datasets sorted by stay and time
 
 
 class Preprocessor(ABC):
@@ -21,13 +27,20 @@ class Preprocessor(ABC):
         The column name that identifies stays or admissions in the dataset.
     time_identifier : str, default: "charttime"
         The column name that identifies the timestamp or time variable in the dataset.
+    assume_sorted : bool, default: False
+        Flag indicating whether the datasets are known to be sorted by stay and time, so that grouping the rows
+        by stay does not sort the stays. Datasets found sorted or sorted by `TimeIndexCreator` are not sorted
+        again either.
     """
 
-    def __init__(self, stay_identifier: str = "stay_id", time_identifier: str = "charttime") -> None:
+    def __init__(
+        self, stay_identifier: str = "stay_id", time_identifier: str = "charttime", assume_sorted: bool = False
+    ) -> None:
         super().__init__()
 
         self._stay_identifier: str = stay_identifier
         self._time_identifier: str = time_identifier
+        self._assume_sorted: bool = assume_sorted
 
     def process(self, datasets: list[Dataset]) -> list[Dataset]:
         """
@@ -45,15 +58,47 @@ class Preprocessor(ABC):
         """
         raise NotImplementedError()
 
+    def _is_sorted_by_stay(self, df: pd.DataFrame) -> bool:
+        """
+        Check whether a dataset is known to be sorted by stay and time, without scanning it.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The dataset to check.
+
+        Returns
+        -------
+        bool
+            True if the datasets are assumed sorted or the dataset was found sorted or sorted by `TimeIndexCreator`.
+        """
+        return self._assume_sorted or bool(df.attrs.get(_SORTED, False))
+
 
 class TimeIndexCreator(Preprocessor):
     """
     Preprocessor for creating a time index in the datasets.
 
+    The rows of every dataset are sorted by stay and time, unless they already are. The sortedness is checked
+    in a single vectorized pass, which can be skipped with `assume_sorted` if the data is known to be sorted.
+    The sorted datasets are marked, so that the following preprocessors do not sort them again.
+
     Attributes
     ----------
     DATASETS : list[DatasetType]
         The list of dataset types that require a time index.
+
+    Parameters
+    ----------
+    stay_identifier : str, default: "stay_id"
+        The column name that identifies stays or admissions in the dataset.
+    time_identifier : str, default: "charttime"
+        The column name that identifies the timestamp or time variable in the dataset.
+    time_format : str, optional
+        The strftime format of the timestamps. If not provided, the format is inferred, which is considerably
+        slower for large datasets.
+    assume_sorted : bool, default: False
+        Flag indicating whether the datasets are known to be sorted by stay and time, which skips the check.
     """
 
     DATASETS: list[DatasetType] = [
@@ -62,6 +107,17 @@ class TimeIndexCreator(Preprocessor):
         DatasetType.RRT,
     ]
 
+    def __init__(
+        self,
+        stay_identifier: str = "stay_id",
+        time_identifier: str = "charttime",
+        time_format: Optional[str] = None,
+        assume_sorted: bool = False,
+    ) -> None:
+        super().__init__(stay_identifier, time_identifier, assume_sorted)
+
+        self._time_format: Optional[str] = time_format
+
     def process(self, datasets: list[Dataset]) -> list[Dataset]:
         """
         Process the datasets by creating a time index if the dataset type requires it.
@@ -83,12 +139,45 @@ class TimeIndexCreator(Preprocessor):
                 continue
 
             if not is_datetime64_any_dtype(df[self._time_identifier]):
-                df[self._time_identifier] = pd.to_datetime(df[self._time_identifier])
+                df[self._time_identifier] = pd.to_datetime(df[self._time_identifier], format=self._time_format)
+
+            keys = [column for column in (self._stay_identifier, self._time_identifier) if column in df.columns]
+            if not self._is_sorted_by_stay(df) and not self._is_sorted(df, keys):
+                logger.debug("Sort dataset of type %s by %s", dtype, ", ".join(keys))
+                df = df.sort_values(keys, kind="stable")
 
-            _datasets.append(Dataset(dtype, df.set_index(self._time_identifier)))
+            df = df.set_index(self._time_identifier)
+            df.attrs[_SORTED] = True
+            _datasets.append(Dataset(dtype, df))
 
         return _datasets
 
+    @staticmethod
+    def _is_sorted(df: pd.DataFrame, keys: list[str]) -> bool:
+        """
+        Check whether the rows of a dataset are sorted lexicographically by the given columns.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The dataset to check.
+        keys : list[str]
+            The columns to sort by, in order of precedence.
+
+        Returns
+        -------
+        bool
+            True if the rows are sorted.
+        """
+        ordered = np.zeros(max(len(df) - 1, 0), dtype=bool)  # pairs of rows that are ordered by a previous key
+        equal = np.ones_like(ordered)
+        for key in keys:
+            values = df[key].to_numpy()
+            ordered |= equal & (values[1:] > values[:-1])
+            equal &= values[1:] == values[:-1]
+
+        return bool((ordered | equal).all())
+
 
 class UrineOutputPreProcessor(Preprocessor):
     """
@@ -106,6 +195,11 @@ class UrineOutputPreProcessor(Preprocessor):
         Flag indicating whether to perform interpolation on missing values.
     threshold : int, default: 6
         The threshold value for limiting the interpolation range.
+    resample : bool, default: True
+        Flag indicating whether to resample the urine output to an hourly grid. If False, the charted volumes are
+        only indexed by stay and time, for a `UrineOutputProbe` with `irregular=True`.
+    assume_sorted : bool, default: False
+        Flag indicating whether the dataset is known to be sorted by stay and time, which skips sorting the stays.
     """
 
     def __init__(
@@ -115,11 +209,14 @@ class UrineOutputPreProcessor(Preprocessor):
         urineoutput_column: str = "urineoutput",
         interpolate: bool = True,
         threshold: int = 6,
+        resample: bool = True,
+        assume_sorted: bool = False,
     ) -> None:
-        super().__init__(stay_identifier, time_identifier)
+        super().__init__(stay_identifier, time_identifier, assume_sorted)
         self._interpolate: bool = interpolate
         self._threshold: int = threshold
         self._urineoutput_column: str = urineoutput_column
+        self._resample: bool = resample
 
     @dataset_as_df(df=DatasetType.URINEOUTPUT)
     @df_to_dataset(DatasetType.URINEOUTPUT)
@@ -138,7 +235,10 @@ class UrineOutputPreProcessor(Preprocessor):
             The processed urine output dataset as a pandas DataFrame.
         """
 
-        df = df.groupby(self._stay_identifier).resample("1h").sum()  # type: ignore
+        if not self._resample:
+            return df.set_index(self._stay_identifier, append=True).swaplevel()
+
+        df = df.groupby(self._stay_identifier, sort=not self._is_sorted_by_stay(df)).resample("1h").sum()  # type: ignore
         df[df[self._urineoutput_column] == 0] = None
 
         if not self._interpolate:
@@ -171,6 +271,10 @@ class CreatininePreProcessor(Preprocessor):
         Flag indicating whether to perform forward filling on missing values.
     threshold : int, default: 72
         The threshold value for limiting the forward filling range.
+    sparse : bool, default: False
+        Flag indicating whether to keep the creatinine as observed events instead of hourly rows.
+    assume_sorted : bool, default: False
+        Flag indicating whether the dataset is known to be sorted by stay and time, which skips sorting the stays.
     """
 
     def __init__(
@@ -180,12 +284,15 @@ class CreatininePreProcessor(Preprocessor):
         creatinine_column: str = "creat",
         ffill: bool = True,
         threshold: int = 72,
+        sparse: bool = False,
+        assume_sorted: bool = False,
     ) -> None:
-        super().__init__(stay_identifier, time_identifier)
+        super().__init__(stay_identifier, time_identifier, assume_sorted)
 
         self._ffill: bool = ffill
         self._threshold: Optional[int] = threshold
         self._creatinine_column: str = creatinine_column
+        self._sparse: bool = sparse
 
     @dataset_as_df(df=DatasetType.CREATININE)
     @df_to_dataset(DatasetType.CREATININE)
@@ -193,6 +300,11 @@ class CreatininePreProcessor(Preprocessor):
         """
         Process the creatinine dataset by resampling and performing forward filling on missing values.
 
+        If `sparse` is set, only the hours with observed creatinine are kept: every row represents the mean of an
+        hour, indexed by the stay and the hour, and holds until the exclusive end hour in the `INTERVAL_END`
+        column, i.e. the next observation or the end of the forward filling range. The probes calculate the
+        stages of these rows, and the Analyser expands them to hourly rows when merging the probe results.
+
         Parameters
         ----------
         df : pd.DataFrame
@@ -203,13 +315,62 @@ class CreatininePreProcessor(Preprocessor):
         pd.DataFrame
             The processed creatinine dataset as a pandas DataFrame.
         """
-        df = df.groupby(self._stay_identifier).resample("1h").mean()  # type: ignore
+        if self._sparse:
+            return self._to_events(df)
+
+        df = df.groupby(self._stay_identifier, sort=not self._is_sorted_by_stay(df)).resample("1h").mean()  # type: ignore
         if not self._ffill:
             return df
 
         df[df[self._creatinine_column] == 0] = None
         return df.ffill(limit=self._threshold)
 
+    def _to_events(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aggregate the observed creatinine of each stay to hourly events.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The input creatinine dataset as a pandas DataFrame.
+
+        Returns
+        -------
+        pd.DataFrame
+            The creatinine events as a pandas DataFrame.
+        """
+        events = pd.DataFrame(
+            {
+                self._stay_identifier: df[self._stay_identifier].to_numpy(),
+                self._time_identifier: pd.DatetimeIndex(df.index).floor("1h"),
+                self._creatinine_column: df[self._creatinine_column].to_numpy(),
+            }
+        )
+        if not self._is_sorted_by_stay(df):
+            events = events.sort_values([self._stay_identifier, self._time_identifier], kind="stable")
+
+        # the last hour of a stay ends the forward filling
+        ends = events.groupby(self._stay_identifier, sort=False)[self._time_identifier].max() + pd.Timedelta("1h")
+
+        events = (
+            events.dropna(subset=[self._creatinine_column])
+            .groupby([self._stay_identifier, self._time_identifier], sort=False)[self._creatinine_column]
+            .mean()
+            .reset_index()
+        )
+        hours = events[self._time_identifier]
+        if not self._ffill:
+            events[INTERVAL_END] = hours + pd.Timedelta("1h")
+            return events.set_index([self._stay_identifier, self._time_identifier])
+
+        events = events[events[self._creatinine_column] != 0].reset_index(drop=True)
+        stays, hours = events[self._stay_identifier], events[self._time_identifier]
+        events[INTERVAL_END] = hours.shift(-1).where(stays == stays.shift(-1), stays.map(ends))
+        if self._threshold is not None:
+            limit = hours + pd.Timedelta(hours=self._threshold + 1)
+            events[INTERVAL_END] = events[INTERVAL_END].where(events[INTERVAL_END] <= limit, limit)
+        return events.set_index([self._stay_identifier, self._time_identifier])
+
 
 class DemographicsPreProcessor(Preprocessor):
     """Preprocessor for processing the demographics dataset."""
@@ -230,11 +391,39 @@ class DemographicsPreProcessor(Preprocessor):
         pd.DataFrame
             The processed demographics dataset as a pandas DataFrame.
         """
-        return df.groupby(self._stay_identifier).last()
+        return df.groupby(self._stay_identifier, sort=not self._is_sorted_by_stay(df)).last()
 
 
 class RRTPreProcessor(Preprocessor):
-    """Preprocessor for processing the RRT dataset."""
+    """
+    Preprocessor for processing the RRT dataset.
+
+    Parameters
+    ----------
+    stay_identifier : str, default: "stay_id"
+        The column name that identifies stays or admissions in the dataset.
+    time_identifier : str, default: "charttime"
+        The column name that identifies the timestamp or time variable in the dataset.
+    rrt_column : str, default: "rrt_status"
+        The column name that represents the RRT status in the dataset.
+    intervals : bool, default: False
+        Flag indicating whether to store the RRT status as intervals instead of hourly rows.
+    assume_sorted : bool, default: False
+        Flag indicating whether the dataset is known to be sorted by stay and time, which skips sorting the stays.
+    """
+
+    def __init__(
+        self,
+        stay_identifier: str = "stay_id",
+        time_identifier: str = "charttime",
+        rrt_column: str = "rrt_status",
+        intervals: bool = False,
+        assume_sorted: bool = False,
+    ) -> None:
+        super().__init__(stay_identifier, time_identifier, assume_sorted)
+
+        self._rrt_column: str = rrt_column
+        self._intervals: bool = intervals
 
     @dataset_as_df(df=DatasetType.RRT)
     @df_to_dataset(DatasetType.RRT)
@@ -242,6 +431,11 @@ class RRTPreProcessor(Preprocessor):
         """
         Process the RRT dataset by upsampling the data and forward filling the last value. We expect the dataframe to contain a 1 for RRT in progress, and 0 for RRT not in progress.
 
+        If `intervals` is set, the status is run-length encoded instead: every row represents an interval of
+        constant status, indexed by the stay and the start hour of the interval, with the exclusive end hour
+        in the `INTERVAL_END` column. The Analyser expands these intervals to hourly rows when merging the
+        probe results.
+
         Parameters
         ----------
         df : pd.DataFrame
@@ -252,5 +446,51 @@ class RRTPreProcessor(Preprocessor):
         pd.DataFrame
             The processed RRT dataset as a pandas DataFrame.
         """
-        df = df.groupby(self._stay_identifier).resample("1h").last()  # type: ignore
+        if self._intervals:
+            return self._to_intervals(df)
+
+        df = df.groupby(self._stay_identifier, sort=not self._is_sorted_by_stay(df)).resample("1h").last()  # type: ignore
         return df.ffill()
+
+    def _to_intervals(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run-length encode the hourly RRT status of each stay.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The input RRT dataset as a pandas DataFrame.
+
+        Returns
+        -------
+        pd.DataFrame
+            The RRT status intervals as a pandas DataFrame.
+        """
+        events = pd.DataFrame(
+            {
+                self._stay_identifier: df[self._stay_identifier].to_numpy(),
+                self._time_identifier: pd.DatetimeIndex(df.index),
+                self._rrt_column: df[self._rrt_column].to_numpy(),
+            }
+        )
+        if not self._is_sorted_by_stay(df):
+            events = events.sort_values([self._stay_identifier, self._time_identifier], kind="stable")
+        events[self._time_identifier] = events[self._time_identifier].dt.floor("1h")
+
+        # the last hour of a stay ends its last interval
+        ends = events.groupby(self._stay_identifier, sort=False)[self._time_identifier].max() + pd.Timedelta("1h")
+
+        bins = (
+            events.dropna(subset=[self._rrt_column])
+            .groupby([self._stay_identifier, self._time_identifier], sort=False)[self._rrt_column]
+            .last()
+            .reset_index()
+        )
+        stays, status = bins[self._stay_identifier], bins[self._rrt_column]
+        intervals = bins[(stays != stays.shift()) | (status != status.shift())].reset_index(drop=True)
+
+        stays = intervals[self._stay_identifier]
+        intervals[INTERVAL_END] = (
+            intervals[self._time_identifier].shift(-1).where(stays == stays.shift(-1), stays.map(ends))
+        )
+        return intervals.set_index([self._stay_identifier, self._time_identifier])
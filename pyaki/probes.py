@@ -5,13 +5,13 @@ used for probing for the different KDIGO criteria.
 
 from abc import ABC, ABCMeta
 from enum import StrEnum, auto
-from typing import Any
+from typing import Any, Optional
 
 import numpy as np
 import pandas as pd
 from pandas import PeriodIndex
 
-from pyaki.utils import Dataset, DatasetType, approx_gte, dataset_as_df, df_to_dataset
+from pyaki.utils import INTERVAL_END, Dataset, DatasetType, approx_gte, dataset_as_df, df_to_dataset
 
 
 class Probe(ABC):
@@ -71,6 +71,34 @@ class Probe(ABC):
         """
         raise NotImplementedError()
 
+    def precompute(
+        self,
+        datasets: list[Dataset],
+        stay_identifier: str = "stay_id",
+        shared: Optional[dict[Any, Any]] = None,
+    ) -> dict[str, pd.Series | pd.DataFrame]:
+        """
+        Precompute intermediate results of the probe for all stays at once.
+
+        The returned values are indexed like the cohort datasets. The `Analyser` passes the rows of each stay
+        as keyword arguments to `probe()`. Probes without intermediate results return an empty mapping.
+
+        Parameters
+        ----------
+        datasets : list[Dataset]
+            A list of Dataset objects containing the data of all stays.
+        stay_identifier : str, default: "stay_id"
+            The index level that identifies the stays.
+        shared : dict, optional
+            A mapping to share intermediate results between probes with the same configuration.
+
+        Returns
+        -------
+        dict[str, pd.Series | pd.DataFrame]
+            The intermediate results, mapped by the name of the keyword argument of `probe()`.
+        """
+        return {}
+
 
 class UrineOutputMethod(StrEnum):
     """
@@ -110,6 +138,14 @@ class UrineOutputProbe(Probe):
         The name of the column representing the patient's weight in the patient DataFrame.
     anuria_limit : float, default: 0.1
         The anuria limit for urine output calculations.
+    method : UrineOutputMethod, default: UrineOutputMethod.MEAN
+        The method for aggregating the urine output of the windows.
+    irregular : bool, default: False
+        Flag indicating whether the urine output is the irregular series of charted volumes, instead of the hourly
+        series of `UrineOutputPreProcessor`. Each charted volume is spread evenly over the time since the previous
+        chart of the stay, or over the preceding hour for the first chart. The windows are the 6, 12 and 24 hours
+        before each chart, and the stage is only calculated once the stay is observed for the whole window. The
+        results are returned as hourly intervals that hold until the next charted hour, see `probe()`.
 
     Example
     -------
@@ -127,6 +163,7 @@ class UrineOutputProbe(Probe):
         patient_weight_column: str = "weight",
         anuria_limit: float = 0.1,
         method: UrineOutputMethod = UrineOutputMethod.MEAN,
+        irregular: bool = False,
     ) -> None:
         super().__init__()
 
@@ -135,6 +172,142 @@ class UrineOutputProbe(Probe):
 
         self._anuria_limit: float = anuria_limit
         self._method: UrineOutputMethod = method
+        self._irregular: bool = irregular
+
+    def precompute(
+        self,
+        datasets: list[Dataset],
+        stay_identifier: str = "stay_id",
+        shared: Optional[dict[Any, Any]] = None,
+    ) -> dict[str, pd.Series | pd.DataFrame]:
+        """
+        Precompute the rolling urine output aggregates for all stays at once.
+
+        Parameters
+        ----------
+        datasets : list[Dataset]
+            A list of Dataset objects containing the data of all stays.
+        stay_identifier : str, default: "stay_id"
+            The index level that identifies the stays.
+        shared : dict, optional
+            A mapping to share intermediate results between probes with the same configuration.
+
+        Returns
+        -------
+        dict[str, pd.Series | pd.DataFrame]
+            The rolling aggregates as `rolling` argument of `probe()`, or an empty mapping if the urine output
+            data is not indexed by stay and time in sorted order.
+        """
+        df = _cohort_df(datasets, DatasetType.URINEOUTPUT, stay_identifier)
+        if df is None:
+            return {}
+
+        shared = {} if shared is None else shared
+        key = ("urineoutput_rolling", self._column, self._method, self._irregular)
+        if key not in shared:
+            shared[key] = self.rolling_aggregates(df, stay_identifier)
+        return {"rolling": shared[key]}
+
+    def rolling_aggregates(self, df: pd.DataFrame, stay_identifier: Optional[str] = None) -> pd.DataFrame:
+        """
+        Calculate the rolling urine output aggregates used for the stage calculation.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The DataFrame containing the hourly urine output data.
+        stay_identifier : str, optional
+            The index level that identifies the stays. If provided, the windows are calculated for each stay.
+
+        Returns
+        -------
+        pd.DataFrame
+            The aggregates, indexed like the provided DataFrame, in columns named after the aggregation and
+            the window size in hours, e.g. `mean_6`.
+        """
+        if self._method == UrineOutputMethod.STRICT:
+            how = "max"
+        elif self._method == UrineOutputMethod.MEAN:
+            how = "mean"
+        else:
+            raise ValueError(f"Invalid method: {self._method}")
+
+        if self._irregular:
+            return self._irregular_aggregates(df, how, stay_identifier)
+
+        values: pd.Series = df[self._column]
+        aggregates = {}
+        for agg, window in [("min", 6), (how, 6), (how, 12), (how, 24)]:
+            if stay_identifier is None:
+                rolling = values.rolling(window)
+            else:
+                rolling = values.groupby(level=stay_identifier, sort=False).rolling(window)
+            aggregates[f"{agg}_{window}"] = getattr(rolling, agg)().to_numpy()
+
+        return pd.DataFrame(aggregates, index=df.index)
+
+    def _irregular_aggregates(self, df: pd.DataFrame, how: str, stay_identifier: Optional[str]) -> pd.DataFrame:
+        """
+        Calculate the urine output rates over time windows of the irregular series of charted volumes.
+
+        Every chart is the end of a segment of constant rate, starting at the previous chart of the stay. The mean
+        rate of a window is the difference of the cumulative volume, interpolated linearly at the window start,
+        and the minimum and maximum are taken over the rates of the segments overlapping the window. Windows that
+        start before the first segment of their stay are NaN. Charts of a stay at the same time are summed to one
+        segment and share its aggregates.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The DataFrame containing the charted urine output, sorted by stay and time.
+        how : str
+            The aggregation of the windows, either "mean" or "max".
+        stay_identifier : str, optional
+            The index level that identifies the stays. If not provided, all rows belong to one stay.
+
+        Returns
+        -------
+        pd.DataFrame
+            The aggregates in ml/h, like `rolling_aggregates()`.
+        """
+        hour = pd.Timedelta(hours=1).value
+        codes, times = _stay_codes_and_times(df.index, stay_identifier)
+        volumes = df[self._column].fillna(0).to_numpy(dtype=float)
+
+        # charts of a stay at the same time are summed, so that every segment has a duration
+        duplicate = np.zeros(len(codes), dtype=bool)
+        duplicate[1:] = (codes[1:] == codes[:-1]) & (times[1:] == times[:-1])
+        charts = np.cumsum(~duplicate) - 1  # the summed chart of every row
+        volumes = np.bincount(charts, weights=volumes, minlength=charts[-1] + 1 if len(charts) else 0)
+        codes, times = codes[~duplicate], times[~duplicate]
+
+        first = np.ones(len(codes), dtype=bool)
+        first[1:] = codes[1:] != codes[:-1]
+        segment_starts = np.where(first, times - hour, np.roll(times, 1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = volumes * hour / (times - segment_starts)
+
+        rows = np.arange(len(codes))
+        stay_starts = np.maximum.accumulate(np.where(first, rows, 0))
+        cumulative = np.cumsum(volumes)  # the cumulative volume at the end of every segment
+
+        aggregates = {}
+        for agg, window in [("min", 6), (how, 6), (how, 12), (how, 24)]:
+            window_starts = times - window * hour
+            observed = window_starts >= segment_starts[stay_starts]
+            # the first segment ending after the window start, which contains the window start if it is observed
+            starts = np.where(observed, _window_starts(codes, times, window * hour), rows)
+
+            if agg == "mean":
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    fraction = (window_starts - segment_starts[starts]) / (times[starts] - segment_starts[starts])
+                at_start = cumulative[starts] - volumes[starts] * (1 - fraction)
+                result = (cumulative - at_start) / window
+            else:
+                result = _range_reduce(rates, starts, rows, np.fmin if agg == "min" else np.fmax)
+            aggregates[f"{agg}_{window}"] = np.where(observed, result, np.nan)[charts]
+
+        return pd.DataFrame(aggregates, index=df.index)
 
     @dataset_as_df(df=DatasetType.URINEOUTPUT, patient=DatasetType.DEMOGRAPHICS)
     @df_to_dataset(DatasetType.URINEOUTPUT)
@@ -142,6 +315,7 @@ class UrineOutputProbe(Probe):
         self,
         df: pd.DataFrame,
         patient: pd.DataFrame,
+        rolling: Optional[pd.DataFrame] = None,
         **kwargs: Any,
     ) -> pd.DataFrame:
         """
@@ -156,6 +330,9 @@ class UrineOutputProbe(Probe):
             The DataFrame containing the urine output data. We expect the DataFrame to contain urine output values in ml, sampled hourly.
         patient : pd.DataFrame
             The DataFrame containing patient information. Should contain the patients weight in kg.
+        rolling : pd.DataFrame, optional
+            Precalculated rolling aggregates aligned with the rows of `df`, e.g. taken from
+            `rolling_aggregates()`. If not provided, the aggregates are calculated for the given stay.
 
         Returns
         -------
@@ -167,29 +344,67 @@ class UrineOutputProbe(Probe):
 
         df = df.copy()
 
+        if rolling is None:
+            rolling = self.rolling_aggregates(df)
+        else:
+            rolling = rolling.set_axis(df.index)
+        how = "max" if self._method == UrineOutputMethod.STRICT else "mean"
+
         weight: pd.Series = patient[self._patient_weight_column]
         # fmt: off
         df.loc[:, self.RESNAME] = np.nan  # set all urineoutput_stage values to NaN
-        df.loc[df.rolling(6).min()[self._column] >= 0, self.RESNAME] = 0
+        df.loc[rolling["min_6"] >= 0, self.RESNAME] = 0
 
-        if self._method == UrineOutputMethod.STRICT:
-            df.loc[(df.rolling(6).max()[self._column] / weight) < 0.5, self.RESNAME] = 1
-            df.loc[(df.rolling(12).max()[self._column] / weight) < 0.5, self.RESNAME] = 2
-            df.loc[(df.rolling(24).max()[self._column] / weight) < 0.3, self.RESNAME] = 3
-            df.loc[(df.rolling(12).max()[self._column] / weight) < self._anuria_limit, self.RESNAME] = 3
-        elif self._method == UrineOutputMethod.MEAN:
-            df.loc[(df.rolling(6).mean()[self._column] / weight) < 0.5, self.RESNAME] = 1
-            df.loc[(df.rolling(12).mean()[self._column] / weight) < 0.5, self.RESNAME] = 2
-            df.loc[(df.rolling(24).mean()[self._column] / weight) < 0.3, self.RESNAME] = 3
-            df.loc[(df.rolling(12).mean()[self._column] / weight) < self._anuria_limit, self.RESNAME] = 3
-        else:
-            raise ValueError(f"Invalid method: {self._method}")
+        df.loc[(rolling[f"{how}_6"] / weight) < 0.5, self.RESNAME] = 1
+        df.loc[(rolling[f"{how}_12"] / weight) < 0.5, self.RESNAME] = 2
+        df.loc[(rolling[f"{how}_24"] / weight) < 0.3, self.RESNAME] = 3
+        df.loc[(rolling[f"{how}_12"] / weight) < self._anuria_limit, self.RESNAME] = 3
         # fmt: on
 
         df.loc[pd.isna(df[self._column]), self.RESNAME] = np.nan
 
+        if self._irregular:
+            return self._to_intervals(df)
         return df
 
+    def _to_intervals(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Project the stages of the charts of a stay onto hourly intervals.
+
+        The charts are aggregated to the hours they fall into, with the summed urine output and the last stage of
+        each hour. The stage holds until the next charted hour, in the `INTERVAL_END` column, while the urine output
+        is only kept in the charted hour, so that the Analyser does not repeat the volumes when expanding the
+        intervals to hourly rows.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The DataFrame containing the charts of a stay with their stages, indexed by time.
+
+        Returns
+        -------
+        pd.DataFrame
+            The hourly intervals, indexed by the start hour of the intervals.
+        """
+        hour = pd.Timedelta("1h")
+        times = df.index.to_timestamp() if isinstance(df.index, PeriodIndex) else pd.DatetimeIndex(df.index)
+        hours = pd.DatetimeIndex(times.floor("1h"), name=df.index.name)
+
+        grouped = df.groupby(hours, sort=False)
+        intervals = grouped.last()
+        intervals[self._column] = grouped[self._column].sum(min_count=1)
+        starts = pd.DatetimeIndex(intervals.index)
+        intervals[INTERVAL_END] = starts + hour
+
+        # the hours until the next charted hour keep the stage without urine output
+        ends = starts[1:].append(starts[-1:] + hour)
+        gap = ends > starts + hour
+        gaps = intervals[gap].copy()
+        gaps[self._column] = np.nan
+        gaps[INTERVAL_END] = ends[gap]
+        gaps.index = gaps.index + hour
+        return pd.concat([intervals, gaps]).sort_index(kind="stable")
+
 
 class CreatinineBaselineMethod(StrEnum):
     """
@@ -235,6 +450,215 @@ class CreatinineBaselineMethod(StrEnum):
     CALCULATED = auto()
 
 
+def _cohort_df(datasets: list[Dataset], dtype: DatasetType, stay_identifier: str) -> Optional[pd.DataFrame]:
+    """
+    Helper function to find a dataset that allows calculations for the whole cohort.
+
+    Parameters
+    ----------
+    datasets : list[Dataset]
+        A list of Dataset objects containing the data of all stays.
+    dtype : DatasetType
+        The type of the dataset.
+    stay_identifier : str
+        The index level that identifies the stays.
+
+    Returns
+    -------
+    pd.DataFrame or None
+        The DataFrame of the dataset, or None if it is missing or not indexed by stay and time in sorted order.
+    """
+    df = next((df for _dtype, df in datasets if _dtype == dtype), None)
+    if df is None or df.index.nlevels != 2 or stay_identifier not in df.index.names:
+        return None
+    if not df.index.is_monotonic_increasing:
+        return None
+    return df
+
+
+def _align_to_hourly_grid(bins: pd.DataFrame, codes: np.ndarray, times: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Helper function to forward fill hourly bins of each stay onto the rows of the stay.
+
+    This mirrors a per stay `resample("1h")` followed by `ffill()` and an alignment on the row timestamps. Rows
+    which are not on the hourly grid, or lie before the first or after the last bin of their stay, are NaN.
+
+    Parameters
+    ----------
+    bins : pd.DataFrame
+        The DataFrame containing the stay `code`, the hourly bin `time` and the `value` of each bin.
+    codes : np.ndarray
+        The stay code of each row.
+    times : pd.DatetimeIndex
+        The timestamp of each row.
+
+    Returns
+    -------
+    np.ndarray
+        The values aligned to the rows.
+    """
+    # merge on nanoseconds, the rows may have any datetime unit
+    times = pd.DatetimeIndex(times).as_unit("ns")
+    bins = bins.assign(time=pd.DatetimeIndex(bins["time"]).as_unit("ns"))
+
+    rows = pd.DataFrame({"code": codes, "time": times, "position": np.arange(len(codes))})
+    merged = pd.merge_asof(
+        rows.sort_values("time", kind="stable"),
+        bins.sort_values("time", kind="stable"),
+        on="time",
+        by="code",
+        direction="backward",
+    ).sort_values("position")
+
+    last_bin = bins.groupby("code")["time"].max().reindex(codes).to_numpy()
+    on_grid = np.asarray((times == times.floor("1h")) & (times <= last_bin))
+    return np.where(on_grid, merged["value"].to_numpy(), np.nan)
+
+
+def _stay_codes_and_times(index: pd.Index, stay_identifier: Optional[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Helper function to split an index sorted by stay and time into stay codes and int64 timestamps.
+
+    Parameters
+    ----------
+    index : pd.Index
+        The index, either a time index of one stay or indexed by stay and time.
+    stay_identifier : str, optional
+        The index level that identifies the stays. If not provided, all rows belong to one stay.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The stay code of each row, numbered in order of appearance, and the timestamps in nanoseconds.
+    """
+    if stay_identifier is None or stay_identifier not in index.names:
+        codes = np.zeros(len(index), dtype=np.int64)
+        times = index if index.nlevels == 1 else index.get_level_values(-1)
+    else:
+        codes = pd.factorize(index.get_level_values(stay_identifier))[0].astype(np.int64)
+        times = index.get_level_values(1 - index.names.index(stay_identifier))
+    if isinstance(times, PeriodIndex):
+        times = times.to_timestamp()
+    return codes, np.asarray(times, dtype="datetime64[ns]").view(np.int64)
+
+
+def _window_starts(codes: np.ndarray, times: np.ndarray, window: int) -> np.ndarray:
+    """
+    Helper function to find the first row of the time window `(t - window, t]` ending at each row.
+
+    The rows must be sorted by stay and time. The windows do not extend beyond the stay of the row. Stays and
+    timestamps are combined into one sorted key by ranking the timestamps, so a single `searchsorted()` finds the
+    window starts of all stays without overflowing int64.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        The stay code of each row, increasing with the stays.
+    times : np.ndarray
+        The int64 timestamp of each row.
+    window : int
+        The length of the window, in the unit of the timestamps.
+
+    Returns
+    -------
+    np.ndarray
+        The position of the first row in the window of each row.
+    """
+    n = len(times)
+    ranks = np.unique(np.concatenate([times, times - window]), return_inverse=True)[1].reshape(-1)
+    keys = codes * (len(ranks) + 1)
+    return np.searchsorted(keys + ranks[:n], keys + ranks[n:], side="right")
+
+
+def _rolling_bins(codes: np.ndarray, times: np.ndarray, values: np.ndarray, window: int, how: str) -> pd.DataFrame:
+    """
+    Helper function to calculate hourly bins of a rolling aggregate over time windows for all stays at once.
+
+    This mirrors a per stay `rolling(window)` aggregate followed by the same aggregate in `resample("1h")`. For the
+    minimum both steps are fused: the windows of the rows within an hour overlap, so the minimum of the hour is a
+    single range minimum from the window start of its first row to its last row. For the mean, the windows are
+    differences of prefix sums and the hours are averaged with `np.add.reduceat()`.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        The stay code of each row, increasing with the stays.
+    times : np.ndarray
+        The int64 timestamp of each row in nanoseconds, sorted within the stays.
+    values : np.ndarray
+        The values of the rows.
+    window : int
+        The length of the rolling window in nanoseconds.
+    how : str
+        The aggregate, either "min" or "mean".
+
+    Returns
+    -------
+    pd.DataFrame
+        The stay `code`, the hourly bin `time` and the `value` of each bin with rows, as for `_align_to_hourly_grid()`.
+    """
+    hour = pd.Timedelta(hours=1).value
+    hours = times - times % hour
+
+    new_bin = np.ones(len(codes), dtype=bool)
+    new_bin[1:] = (codes[1:] != codes[:-1]) | (hours[1:] != hours[:-1])
+    firsts = np.flatnonzero(new_bin)
+    lasts = np.append(firsts[1:], len(codes)) - 1
+
+    starts = _window_starts(codes, times, window)
+    if how == "min":
+        aggregates = _range_reduce(values, starts[firsts], lasts, np.fmin)
+    elif how == "mean":
+        rows = np.arange(len(values))
+        sums = np.concatenate([[0.0], np.cumsum(values)])
+        rolling = (sums[rows + 1] - sums[starts]) / (rows + 1 - starts)
+        aggregates = np.add.reduceat(rolling, firsts) / (lasts - firsts + 1) if len(firsts) else rolling
+    else:
+        raise ValueError(f"Invalid aggregate: {how}")
+
+    return pd.DataFrame({"code": codes[firsts], "time": pd.DatetimeIndex(hours[firsts]), "value": aggregates})
+
+
+def _range_reduce(values: np.ndarray, starts: np.ndarray, ends: np.ndarray, ufunc: np.ufunc) -> np.ndarray:
+    """
+    Helper function to reduce the values of many ranges of rows with an idempotent ufunc, e.g. `np.fmin`.
+
+    The reductions of all ranges with a length of a power of two are tabulated in a sparse table, so that the
+    reduction of every range is the reduction of the two, possibly overlapping, tabulated ranges covering it.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The values to reduce.
+    starts : np.ndarray
+        The first row of each range.
+    ends : np.ndarray
+        The last row of each range, inclusive. Ranges must not be empty.
+    ufunc : np.ufunc
+        The idempotent binary ufunc, e.g. `np.fmin` or `np.fmax`.
+
+    Returns
+    -------
+    np.ndarray
+        The reduction of each range.
+    """
+    if len(values) == 0:
+        return values.astype(float)
+
+    lengths = ends - starts + 1
+    levels = np.log2(lengths).astype(np.int64)  # the largest power of two not exceeding each length
+    table = [values.astype(float)]
+    for level in range(1, int(levels.max()) + 1):
+        previous, half = table[-1], 1 << (level - 1)
+        table.append(ufunc(previous[:-half], previous[half:]))
+
+    result = np.empty(len(starts))
+    for level, reductions in enumerate(table):
+        mask = levels == level
+        result[mask] = ufunc(reductions[starts[mask]], reductions[ends[mask] - (1 << level) + 1])
+    return result
+
+
 class AbstractCreatinineProbe(Probe, metaclass=ABCMeta):
     """
     Abstract base class representing a creatinine probe.
@@ -243,6 +667,14 @@ class AbstractCreatinineProbe(Probe, metaclass=ABCMeta):
     It extends the `Probe` class and provides common functionality and attributes
     for creatinine probe implementations.
 
+    Attributes
+    ----------
+    COHORT_METHODS : set[CreatinineBaselineMethod]
+        The baseline methods that can be calculated for a whole cohort at once, see `cohort_creatinine_baseline()`.
+    EVENT_METHODS : set[CreatinineBaselineMethod]
+        The baseline methods that are calculated with time windows over the events of a sparse creatinine
+        dataset, see `event_creatinine_baseline()`.
+
     Parameters
     ----------
     column : str, default: "creat"
@@ -277,6 +709,22 @@ class AbstractCreatinineProbe(Probe, metaclass=ABCMeta):
     ```
     """
 
+    COHORT_METHODS: set[CreatinineBaselineMethod] = {
+        CreatinineBaselineMethod.ROLLING_MIN,
+        CreatinineBaselineMethod.ROLLING_MEAN,
+        CreatinineBaselineMethod.FIXED_MIN,
+        CreatinineBaselineMethod.FIXED_MEAN,
+        CreatinineBaselineMethod.OVERALL_FIRST,
+        CreatinineBaselineMethod.OVERALL_MIN,
+        CreatinineBaselineMethod.OVERALL_MEAN,
+    }
+    EVENT_METHODS: set[CreatinineBaselineMethod] = {
+        CreatinineBaselineMethod.ROLLING_FIRST,
+        CreatinineBaselineMethod.ROLLING_MIN,
+        CreatinineBaselineMethod.ROLLING_MEAN,
+        CreatinineBaselineMethod.FIXED_MIN,
+    }
+
     def __init__(
         self,
         column: str = "creat",
@@ -322,6 +770,9 @@ class AbstractCreatinineProbe(Probe, metaclass=ABCMeta):
         if isinstance(df.index, PeriodIndex):
             df.index = df.index.to_timestamp()
 
+        if INTERVAL_END in df.columns and self._method in self.EVENT_METHODS:
+            return self.event_creatinine_baseline(df)
+
         if self._method == CreatinineBaselineMethod.ROLLING_FIRST:
             return (
                 df[df[self._column] > 0]
@@ -458,6 +909,185 @@ class AbstractCreatinineProbe(Probe, metaclass=ABCMeta):
         )
         return values
 
+    def precompute(
+        self,
+        datasets: list[Dataset],
+        stay_identifier: str = "stay_id",
+        shared: Optional[dict[Any, Any]] = None,
+    ) -> dict[str, pd.Series | pd.DataFrame]:
+        """
+        Precompute the creatinine baseline values for all stays at once.
+
+        Parameters
+        ----------
+        datasets : list[Dataset]
+            A list of Dataset objects containing the data of all stays.
+        stay_identifier : str, default: "stay_id"
+            The index level that identifies the stays.
+        shared : dict, optional
+            A mapping to share intermediate results between probes with the same configuration.
+
+        Returns
+        -------
+        dict[str, pd.Series | pd.DataFrame]
+            The baseline values as `baseline` argument of `probe()`, or an empty mapping if the method is neither
+            in `COHORT_METHODS` nor, for sparse creatinine data, in `EVENT_METHODS`, or the creatinine data is not
+            indexed by stay and time in sorted order.
+        """
+        df = _cohort_df(datasets, DatasetType.CREATININE, stay_identifier)
+        if df is None:
+            return {}
+
+        events = INTERVAL_END in df.columns and self._method in self.EVENT_METHODS
+        if not events and not self.supports_cohort_baseline:
+            return {}
+
+        shared = {} if shared is None else shared
+        key = ("creatinine_baseline", self._column, self._method, self._baseline_timeframe, events)
+        if key not in shared:
+            if events:
+                shared[key] = self.event_creatinine_baseline(df, stay_identifier)
+            else:
+                shared[key] = self.cohort_creatinine_baseline(df, stay_identifier)
+        return {"baseline": shared[key]}
+
+    @property
+    def supports_cohort_baseline(self) -> bool:
+        """Whether the configured baseline method can be calculated for a whole cohort at once."""
+        return self._method in self.COHORT_METHODS
+
+    def cohort_creatinine_baseline(self, df: pd.DataFrame, stay_identifier: str = "stay_id") -> pd.Series:
+        """
+        Calculate the creatinine baseline values for all stays at once.
+
+        This method yields the same values as calling `creatinine_baseline()` for every stay, but computes them
+        as grouped reductions over the whole cohort. The result is aligned row by row with the provided DataFrame.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The DataFrame containing the creatinine data of all stays. It is expected to be indexed by the stay
+            identifier and the time, sorted by stay and time.
+        stay_identifier : str, default: "stay_id"
+            The index level that identifies the stays.
+
+        Returns
+        -------
+        pd.Series
+            The calculated creatinine baseline values, indexed like the provided DataFrame.
+
+        Raises
+        ------
+        ValueError
+            If the configured method is not in `COHORT_METHODS`.
+        """
+        if not self.supports_cohort_baseline:
+            raise ValueError(f"Cohort baseline calculation is not supported for method: {self._method}")
+
+        times = df.index.droplevel(stay_identifier)
+        if isinstance(times, PeriodIndex):
+            times = times.to_timestamp()
+        times = pd.DatetimeIndex(times)
+
+        values: pd.Series = df[self._column]
+        positive: pd.Series = values.where(values > 0)
+        stays = df.index.get_level_values(stay_identifier)
+
+        if self._method == CreatinineBaselineMethod.FIXED_MEAN:
+            start = pd.Series(times, index=df.index).groupby(stays, sort=False).transform("first")
+            in_timeframe = np.asarray(times <= start + pd.Timedelta(self._baseline_timeframe))
+            baseline = values.where(in_timeframe).groupby(stays, sort=False).transform("mean")
+        elif self._method == CreatinineBaselineMethod.OVERALL_FIRST:
+            baseline = positive.groupby(stays, sort=False).transform("first")
+        elif self._method == CreatinineBaselineMethod.OVERALL_MIN:
+            baseline = positive.groupby(stays, sort=False).transform("min")
+        elif self._method == CreatinineBaselineMethod.OVERALL_MEAN:
+            baseline = positive.groupby(stays, sort=False).transform("mean")
+        else:  # CreatinineBaselineMethod.ROLLING_MIN, ROLLING_MEAN or FIXED_MIN
+            codes, _ = pd.factorize(stays)
+            observed = np.asarray(values > 0)
+
+            bins = _rolling_bins(
+                codes[observed],
+                np.asarray(times[observed], dtype="datetime64[ns]").view(np.int64),
+                values.to_numpy(dtype=float)[observed],
+                pd.Timedelta(self._baseline_timeframe).value,
+                "mean" if self._method == CreatinineBaselineMethod.ROLLING_MEAN else "min",
+            )
+
+            aligned = _align_to_hourly_grid(bins, codes, times)
+
+            if self._method == CreatinineBaselineMethod.FIXED_MIN:
+                # the minimum of the first timeframe replaces all later hours, also those forward filled
+                end = bins.groupby("code")["time"].first() + pd.Timedelta(self._baseline_timeframe)
+                first_timeframe = bins["time"].to_numpy() <= end.reindex(bins["code"]).to_numpy()
+                fixed_min = bins["value"].where(first_timeframe).groupby(bins["code"]).min()
+                after = np.asarray(times, dtype="datetime64[ns]") > end.reindex(codes).to_numpy()
+                aligned = np.where(after & ~np.isnan(aligned), fixed_min.reindex(codes).to_numpy(), aligned)
+
+            baseline = pd.Series(aligned, index=df.index)
+
+        return baseline.rename(self._column)
+
+    def event_creatinine_baseline(self, df: pd.DataFrame, stay_identifier: Optional[str] = None) -> pd.Series:
+        """
+        Calculate the creatinine baseline values over the observed events of a sparse creatinine dataset.
+
+        The rolling windows are the baseline timeframe before each event with a positive value, and are found for
+        all stays at once with `searchsorted()`. Minimums are range queries on a sparse table and means differences
+        of prefix sums, so the baselines are not resampled to an hourly grid. Events without a positive value keep
+        the baseline of the previous event of their stay.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The DataFrame containing the creatinine events, sorted by stay and time.
+        stay_identifier : str, optional
+            The index level that identifies the stays. If not provided, all rows belong to one stay.
+
+        Returns
+        -------
+        pd.Series
+            The calculated creatinine baseline values, indexed like the provided DataFrame.
+
+        Raises
+        ------
+        ValueError
+            If the configured method is not in `EVENT_METHODS`.
+        """
+        if self._method not in self.EVENT_METHODS:
+            raise ValueError(f"Event baseline calculation is not supported for method: {self._method}")
+
+        stays, times = _stay_codes_and_times(df.index, stay_identifier)
+        values = df[self._column].to_numpy(dtype=float)
+        observed = values > 0
+        codes, times, values = stays[observed], times[observed], values[observed]
+
+        rows = np.arange(len(values))
+        timeframe = pd.Timedelta(self._baseline_timeframe).value
+        starts = _window_starts(codes, times, timeframe)
+
+        if self._method == CreatinineBaselineMethod.ROLLING_FIRST:
+            result = values[starts]
+        elif self._method == CreatinineBaselineMethod.ROLLING_MEAN:
+            sums = np.concatenate([[0.0], np.cumsum(values)])
+            result = (sums[rows + 1] - sums[starts]) / (rows + 1 - starts)
+        else:
+            result = _range_reduce(values, starts, rows, np.fmin)
+
+        if self._method == CreatinineBaselineMethod.FIXED_MIN:
+            # the minimum of the first timeframe replaces all later values
+            first = np.ones(len(codes), dtype=bool)
+            first[1:] = codes[1:] != codes[:-1]
+            start = times[np.maximum.accumulate(np.where(first, rows, 0))]
+            first_timeframe = times <= start + timeframe
+            fixed_min = pd.Series(values).where(first_timeframe).groupby(codes).transform("min").to_numpy()
+            result = np.where(first_timeframe, result, fixed_min)
+
+        baseline = np.full(len(df), np.nan)
+        baseline[observed] = result
+        return pd.Series(baseline, index=df.index, name=self._column).groupby(stays).ffill()
+
 
 class AbsoluteCreatinineProbe(AbstractCreatinineProbe):
     """
@@ -532,6 +1162,7 @@ class AbsoluteCreatinineProbe(AbstractCreatinineProbe):
         self,
         df: pd.DataFrame,
         patient: pd.DataFrame,
+        baseline: Optional[pd.Series] = None,
         **kwargs: Any,
     ) -> pd.DataFrame:
         """
@@ -547,6 +1178,9 @@ class AbsoluteCreatinineProbe(AbstractCreatinineProbe):
             with the name specified in the `column` attribute of the probe.
         patient : pd.DataFrame
             The DataFrame containing patient information. Should contain the patients weight in kg and the age.
+        baseline : pd.Series, optional
+            Precalculated creatinine baseline values aligned with the rows of `df`, e.g. taken from
+            `cohort_creatinine_baseline()`. If not provided, the baseline is calculated for the given stay.
 
         Returns
         -------
@@ -555,7 +1189,10 @@ class AbsoluteCreatinineProbe(AbstractCreatinineProbe):
         """
         df = df.copy()
 
-        baseline_values: pd.Series = self.creatinine_baseline(df, patient)
+        if baseline is None:
+            baseline_values: pd.Series = self.creatinine_baseline(df, patient)
+        else:
+            baseline_values = pd.Series(baseline.to_numpy(), index=df.index, name=self._column)
 
         df.loc[:, self.RESNAME] = 0
         df.loc[approx_gte((df[self._column] - baseline_values), 0.3), self.RESNAME] = 1
@@ -610,7 +1247,13 @@ class RelativeCreatinineProbe(AbstractCreatinineProbe):
 
     @dataset_as_df(df=DatasetType.CREATININE, patient=DatasetType.DEMOGRAPHICS)
     @df_to_dataset(DatasetType.CREATININE)
-    def probe(self, df: pd.DataFrame, patient: pd.DataFrame, **kwargs: Any) -> pd.DataFrame:
+    def probe(
+        self,
+        df: pd.DataFrame,
+        patient: pd.DataFrame,
+        baseline: Optional[pd.Series] = None,
+        **kwargs: Any,
+    ) -> pd.DataFrame:
         """
         Perform calculation of relative creatinine elevations on the provided DataFrame.
 
@@ -625,6 +1268,9 @@ class RelativeCreatinineProbe(AbstractCreatinineProbe):
             with the name specified in the `column` attribute of the probe.
         patient : pd.DataFrame
             The DataFrame containing patient information. Should contain the patients weight in kg and the age.
+        baseline : pd.Series, optional
+            Precalculated creatinine baseline values aligned with the rows of `df`, e.g. taken from
+            `cohort_creatinine_baseline()`. If not provided, the baseline is calculated for the given stay.
 
         Returns
         -------
@@ -633,7 +1279,10 @@ class RelativeCreatinineProbe(AbstractCreatinineProbe):
         """
         df = df.copy()
 
-        baseline_values: pd.Series = self.creatinine_baseline(df, patient)
+        if baseline is None:
+            baseline_values: pd.Series = self.creatinine_baseline(df, patient)
+        else:
+            baseline_values = pd.Series(baseline.to_numpy(), index=df.index, name=self._column)
 
         df.loc[:, self.RESNAME] = 0
         df.loc[approx_gte((df[self._column] / baseline_values), 1.5), self.RESNAME] = 1.0
@@ -0,0 +1,248 @@
+"""
+This module contains a persistent, memory-mapped store for preprocessed datasets.
+"""
+
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+
+from pyaki.utils import Dataset, DatasetType
+
+logger = logging.getLogger(__name__)
+
+
+class CohortStore:
+    """
+    Class for storing datasets on disk as memory-mapped NumPy arrays.
+
+    Every dataset is stored in its own directory, with one `.npy` file per column and index level, a
+    `meta.json` file describing the dtypes and a stay offset index. The offset index holds the position of
+    the first row of every stay, so that the rows of a stay can be sliced without a lookup. Reading the
+    store maps the column files into memory instead of parsing them, which allows to rerun an analysis
+    on a preprocessed cohort without repeating the preprocessing.
+
+    Parameters
+    ----------
+    path : str or Path
+        The directory of the store.
+
+    Examples
+    --------
+    Write the preprocessed datasets of an analyser once
+    ```pycon
+    >>> CohortStore("cohort").write(preprocessed_datasets)
+    ```
+
+    Reopen the datasets without copying the column data
+    ```pycon
+    >>> datasets = CohortStore("cohort").read()
+    ```
+    """
+
+    META_FILE: str = "meta.json"
+
+    def __init__(self, path: str | Path) -> None:
+        self._path: Path = Path(path)
+
+    @property
+    def path(self) -> Path:
+        """The directory of the store."""
+        return self._path
+
+    def exists(self) -> bool:
+        """Whether the store has been written."""
+        return (self._path / self.META_FILE).is_file()
+
+    def write(self, datasets: list[Dataset], stay_identifier: str = "stay_id") -> None:
+        """
+        Write the datasets to the store, replacing previously stored datasets.
+
+        Parameters
+        ----------
+        datasets : list[Dataset]
+            The datasets to store.
+        stay_identifier : str, default: "stay_id"
+            The index level that identifies the stays, used to build the stay offset index.
+
+        Raises
+        ------
+        TypeError
+            If a column or index level has a dtype that cannot be stored.
+        """
+        self._path.mkdir(parents=True, exist_ok=True)
+
+        for dtype, df in datasets:
+            dataset_path = self._path / dtype
+            if dataset_path.exists():
+                shutil.rmtree(dataset_path)
+            dataset_path.mkdir()
+
+            meta: dict[str, Any] = {"index": [], "columns": [], "offsets": None}
+            for i, name in enumerate(df.index.names):
+                values = df.index.get_level_values(i)
+                meta["index"].append(_save_array(dataset_path / f"index_{i}.npy", name, values))
+            for i, name in enumerate(df.columns):
+                meta["columns"].append(_save_array(dataset_path / f"column_{i}.npy", name, df.iloc[:, i]))
+
+            if stay_identifier in df.index.names:
+                stays = df.index.get_level_values(stay_identifier).to_numpy()
+                starts = np.flatnonzero(np.r_[True, stays[1:] != stays[:-1]])
+                if len(starts) == len(np.unique(stays)):  # rows of every stay are contiguous
+                    stay_ids = pd.Index(stays[starts])
+                    meta["offsets"] = _save_array(dataset_path / "stays.npy", stay_identifier, stay_ids)
+                    np.save(dataset_path / "offsets.npy", np.r_[starts, len(stays)])
+
+            with open(dataset_path / self.META_FILE, "w") as f:
+                json.dump(meta, f)
+
+        with open(self._path / self.META_FILE, "w") as f:
+            json.dump({"datasets": [dtype.value for dtype, _ in datasets]}, f)
+
+        logger.info("Wrote %d datasets to %s", len(datasets), self._path)
+
+    def read(self, mmap: bool = True) -> list[Dataset]:
+        """
+        Read the datasets from the store.
+
+        Parameters
+        ----------
+        mmap : bool, default: True
+            Flag indicating whether to memory-map the column data read-only instead of loading it into memory.
+
+        Returns
+        -------
+        list[Dataset]
+            The stored datasets, in the order they were written.
+        """
+        mmap_mode = "r" if mmap else None
+        with open(self._path / self.META_FILE) as f:
+            dtypes = [DatasetType(dtype) for dtype in json.load(f)["datasets"]]
+
+        datasets = []
+        for dtype in dtypes:
+            dataset_path = self._path / dtype
+            with open(dataset_path / self.META_FILE) as f:
+                meta = json.load(f)
+
+            levels = [
+                _load_array(dataset_path / f"index_{i}.npy", info, mmap_mode) for i, info in enumerate(meta["index"])
+            ]
+            columns = {
+                info["name"]: _load_array(dataset_path / f"column_{i}.npy", info, mmap_mode)
+                for i, info in enumerate(meta["columns"])
+            }
+
+            index: pd.Index
+            if len(levels) == 1:
+                index = pd.Index(levels[0], name=meta["index"][0]["name"])
+            else:
+                index = pd.MultiIndex.from_arrays(levels, names=[info["name"] for info in meta["index"]])
+
+            datasets.append(Dataset(dtype, pd.DataFrame(columns, index=index, copy=False)))
+
+        return datasets
+
+    def offsets(self, dataset_type: DatasetType) -> pd.DataFrame:
+        """
+        Read the stay offset index of a stored dataset.
+
+        Parameters
+        ----------
+        dataset_type : DatasetType
+            The type of the dataset.
+
+        Returns
+        -------
+        pd.DataFrame
+            The positions of the first (`start`) and behind the last (`stop`) row of every stay, indexed by stay.
+
+        Raises
+        ------
+        ValueError
+            If no offset index was stored for the dataset.
+        """
+        dataset_path = self._path / dataset_type
+        with open(dataset_path / self.META_FILE) as f:
+            info = json.load(f)["offsets"]
+        if info is None:
+            raise ValueError(f"No stay offsets stored for dataset of type {dataset_type}")
+
+        stays = _load_array(dataset_path / "stays.npy", info, None)
+        offsets = np.load(dataset_path / "offsets.npy")
+        return pd.DataFrame({"start": offsets[:-1], "stop": offsets[1:]}, index=pd.Index(stays, name=info["name"]))
+
+
+def _save_array(path: Path, name: Any, values: pd.Series | pd.Index) -> dict[str, Any]:
+    """
+    Helper function to save the values of a column or index level as `.npy` file.
+
+    Parameters
+    ----------
+    path : Path
+        The file to write.
+    name : Any
+        The name of the column or index level.
+    values : pd.Series or pd.Index
+        The values to save.
+
+    Returns
+    -------
+    dict[str, Any]
+        The meta information required to restore the values.
+    """
+    info: dict[str, Any] = {"name": name, "dtype": str(values.dtype)}
+
+    if isinstance(values.dtype, pd.PeriodDtype):
+        info["freq"] = values.dtype.freq.freqstr
+        array = pd.PeriodIndex(values).asi8  # type: ignore
+    elif is_datetime64_any_dtype(values.dtype):
+        index = pd.DatetimeIndex(values)
+        info["tz"] = None if index.tz is None else str(index.tz)
+        array = index.to_numpy() if index.tz is None else index.tz_convert(None).to_numpy()
+    elif isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufm":
+        array = values.to_numpy()
+    else:  # strings and other objects are stored as categorical codes
+        categorical = pd.Categorical(values)
+        if not all(isinstance(category, (str, int, float, bool)) for category in categorical.categories):
+            raise TypeError(f"Cannot store column {name} of dtype {values.dtype}")
+        info["categories"] = categorical.categories.tolist()
+        array = categorical.codes
+
+    np.save(path, array, allow_pickle=False)
+    return info
+
+
+def _load_array(path: Path, info: dict[str, Any], mmap_mode: Any) -> Any:
+    """
+    Helper function to load the values of a column or index level from a `.npy` file.
+
+    Parameters
+    ----------
+    path : Path
+        The file to read.
+    info : dict[str, Any]
+        The meta information written by `_save_array()`.
+    mmap_mode : Any
+        The memory-map mode passed to `np.load()`.
+
+    Returns
+    -------
+    Any
+        The restored values.
+    """
+    array = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+
+    if "freq" in info:
+        return pd.PeriodIndex.from_ordinals(array, freq=info["freq"])  # type: ignore
+    if "tz" in info and info["tz"] is not None:
+        return pd.DatetimeIndex(array).tz_localize("UTC").tz_convert(info["tz"])
+    if "categories" in info:
+        categorical = pd.Categorical.from_codes(array, categories=info["categories"])
+        return categorical if info["dtype"] == "category" else categorical.astype(info["dtype"])
+    return array
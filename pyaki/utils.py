@@ -12,6 +12,8 @@ import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+INTERVAL_END: str = "interval_end"  # name of the column holding the exclusive end of an interval
+
 
 class DatasetType(StrEnum):
     """
@@ -83,7 +85,9 @@ def dataset_as_df(**mapping: DatasetType) -> Callable:
     decorator : Callable
         A decorator that can be applied to methods in a class. The decorated
         method is expected to accept a list of `Dataset` objects and optional
-        additional arguments and keyword arguments.
+        additional arguments and keyword arguments. The dataset types the
+        method requires are exposed as `dataset_types` attribute of the method,
+        the mapping itself as `dataset_mapping` attribute.
 
     Examples
     --------
@@ -133,6 +137,8 @@ def dataset_as_df(**mapping: DatasetType) -> Callable:
             # return the updated datasets
             return [Dataset(dtype, _df if dtype == _dtype else df) for dtype, df in datasets]
 
+        wrapper.dataset_types = frozenset(in_mapping)  # type: ignore
+        wrapper.dataset_mapping = dict(mapping)  # type: ignore
         return wrapper
 
     return decorator
@@ -156,7 +162,8 @@ def df_to_dataset(dtype: DatasetType) -> Callable:
     decorator : Callable
         A decorated function that takes the original arguments, performs the wrapped
         function, converts the returned DataFrame into a Dataset object with the
-        specified type, and returns the converted dataset.
+        specified type, and returns the converted dataset. The type is exposed
+        as `dataset_type` attribute of the function.
 
     Examples
     --------
@@ -173,6 +180,7 @@ def df_to_dataset(dtype: DatasetType) -> Callable:
         def wrapper(self: Any, *args: Any, **kwargs: Any) -> Dataset:
             return Dataset(dtype, func(self, *args, **kwargs))
 
+        wrapper.dataset_type = dtype  # type: ignore
         return wrapper
 
     return decorator
@@ -190,3 +198,54 @@ def approx_gte(x: pd.Series, y: pd.Series | float) -> bool | np.ndarray:
         The series or float to compare with.
     """
     return np.logical_or(np.asarray(x >= y), np.isclose(x, y))
+
+
+def expand_intervals(df: pd.DataFrame, freq: str = "1h") -> pd.DataFrame:
+    """
+    Expand a DataFrame of intervals to one row per period.
+
+    Every row of the DataFrame represents an interval, indexed by its start and ending before the time in the
+    `INTERVAL_END` column. The values of an interval are repeated for every period within the interval.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The DataFrame of intervals, indexed by the start of the intervals.
+    freq : str, default: "1h"
+        The length of the periods.
+
+    Returns
+    -------
+    pd.DataFrame
+        The expanded DataFrame, indexed by the start of the periods and without the `INTERVAL_END` column.
+    """
+    period = pd.Timedelta(freq)
+    starts = pd.DatetimeIndex(df.index)
+    counts = ((pd.DatetimeIndex(df[INTERVAL_END]) - starts) // period).to_numpy()
+
+    positions = np.repeat(np.arange(len(df)), counts)
+    offsets = np.arange(len(positions)) - np.repeat(np.cumsum(counts) - counts, counts)
+    index = starts[positions] + pd.to_timedelta(offsets * period.value, unit="ns")
+
+    return df.drop(columns=INTERVAL_END).iloc[positions].set_axis(pd.DatetimeIndex(index, name=df.index.name))
+
+
+def fingerprint(obj: Any) -> str:
+    """
+    Describe the class and configuration of a probe or preprocessor.
+
+    The description consists of the qualified class name and the instance attributes, so that two objects
+    with the same description process data identically.
+
+    Parameters
+    ----------
+    obj : Any
+        The probe or preprocessor to describe.
+
+    Returns
+    -------
+    str
+        The description of the object.
+    """
+    cls = type(obj)
+    return f"{cls.__module__}.{cls.__qualname__}:{sorted(vars(obj).items())!r}"
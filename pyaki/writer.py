@@ -0,0 +1,309 @@
+"""
+This module contains a partitioned writer for the analysis results.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+from enum import StrEnum, auto
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class OutputFormat(StrEnum):
+    """
+    Enumeration class representing the file formats of the result shards.
+
+    Attributes
+    ----------
+    CSV : str
+        Comma-separated values.
+    PARQUET : str
+        Apache Parquet, requires pyarrow.
+    """
+
+    CSV = auto()
+    PARQUET = auto()
+
+
+class ShardWriter:
+    """
+    Class for writing analysis results as shards of stays.
+
+    Every shard is written to its own file by a background thread, so that processing further stays overlaps
+    with writing. Shards are written to a temporary file first and renamed when complete. After every shard,
+    the manifest is rewritten with the file, the number of rows and the first and last stay of all written
+    shards, so that the shards can be read in parallel and the manifest only refers to complete shards if
+    the process is interrupted.
+
+    The stays of every complete shard are appended to a progress ledger. If `resume` is set, the shards of the
+    ledger are kept and their stays are available as `completed_stays`, so that an interrupted run can continue
+    with the remaining stays. Incomplete entries are dropped from the ledger when resuming. The ledger is only
+    resumed if it was written with the same `config_hash`.
+
+    Parameters
+    ----------
+    path : str or Path
+        The output directory.
+    output_format : OutputFormat, default: OutputFormat.CSV
+        The file format of the shards.
+    stay_identifier : str, default: "stay_id"
+        The index level that identifies the stays.
+    max_pending : int, default: 4
+        The maximum number of shards waiting to be written before `write()` blocks.
+    config_hash : str, optional
+        The hash of the configuration that produced the results, see `Analyser.config_hash`.
+    resume : bool, default: False
+        Flag indicating whether to keep the shards of a previous run. Otherwise, previous shards are removed.
+
+    Examples
+    --------
+    ```pycon
+    >>> with ShardWriter("aki", OutputFormat.PARQUET) as writer:
+    ...     for df in analyser.process_chunks():
+    ...         writer.write(df)
+    ```
+
+    Resume an interrupted run
+    ```pycon
+    >>> with ShardWriter("aki", config_hash=analyser.config_hash, resume=True) as writer:
+    ...     for df in analyser.process_chunks(skip_stays=writer.completed_stays):
+    ...         writer.write(df)
+    ```
+    """
+
+    MANIFEST_FILE: str = "manifest.json"
+    LEDGER_FILE: str = "ledger.jsonl"
+
+    def __init__(
+        self,
+        path: str | Path,
+        output_format: OutputFormat = OutputFormat.CSV,
+        stay_identifier: str = "stay_id",
+        max_pending: int = 4,
+        config_hash: Optional[str] = None,
+        resume: bool = False,
+    ) -> None:
+        self._path: Path = Path(path)
+        self._output_format: OutputFormat = output_format
+        self._stay_identifier: str = stay_identifier
+        self._config_hash: Optional[str] = config_hash
+        self._resume: bool = resume
+
+        self._shards: list[dict[str, Any]] = []
+        self._completed_stays: set[Any] = set()
+        self._index: int = 0  # index of the next queued shard
+        self._queue: queue.Queue[Optional[tuple[int, pd.DataFrame]]] = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def shards(self) -> list[dict[str, Any]]:
+        """The manifest entries of the written shards."""
+        return list(self._shards)
+
+    @property
+    def completed_stays(self) -> set[Any]:
+        """The stays of the shards resumed from the ledger."""
+        return set(self._completed_stays)
+
+    def open(self) -> None:
+        """
+        Create the output directory, resume or remove previous shards and start the background writer.
+
+        Raises
+        ------
+        ValueError
+            If the shards to resume were written with another configuration or output format.
+        """
+        self._path.mkdir(parents=True, exist_ok=True)
+        if self._resume and (self._path / self.MANIFEST_FILE).is_file():
+            self._load_ledger()
+        else:
+            self._remove_shards()
+        self._index = 1 + max((int(Path(shard["file"]).stem.split("-")[1]) for shard in self._shards), default=-1)
+        self._write_manifest()
+
+        self._thread = threading.Thread(target=self._run, name="ShardWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Queue the analysis results of a shard for writing.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The analysis results of the stays of the shard.
+
+        Raises
+        ------
+        RuntimeError
+            If the writer is not open or writing a previous shard failed.
+        """
+        if self._thread is None:
+            raise RuntimeError("ShardWriter is not open")
+        self._raise_error()
+
+        self._queue.put((self._index, df))
+        self._index += 1
+
+    def close(self) -> None:
+        """
+        Wait until all queued shards are written and stop the background writer.
+
+        Raises
+        ------
+        RuntimeError
+            If writing a shard failed.
+        """
+        if self._thread is None:
+            return
+
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._raise_error()
+
+    def __enter__(self) -> "ShardWriter":
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        """Write queued shards until the writer is closed."""
+        while (item := self._queue.get()) is not None:
+            if self._error is not None:
+                continue  # drain the queue after a failure
+
+            index, df = item
+            try:
+                self._write_shard(index, df)
+            except Exception as e:
+                logger.error("Failed to write shard %d: %s", index, e)
+                self._error = e
+
+    def _write_shard(self, index: int, df: pd.DataFrame) -> None:
+        """
+        Write a shard and update the manifest.
+
+        Parameters
+        ----------
+        index : int
+            The index of the shard.
+        df : pd.DataFrame
+            The analysis results of the stays of the shard.
+        """
+        file = self._path / f"part-{index:05d}.{self._output_format}"
+        tmp_file = file.with_name(f".{file.name}.tmp")
+        if self._output_format == OutputFormat.PARQUET:
+            df.to_parquet(tmp_file)
+        else:
+            df.to_csv(tmp_file)
+        os.replace(tmp_file, file)
+
+        stays = df.index.get_level_values(self._stay_identifier).unique()
+        shard = {
+            "file": file.name,
+            "rows": len(df),
+            "first_stay": _to_json(stays[0]) if len(stays) else None,
+            "last_stay": _to_json(stays[-1]) if len(stays) else None,
+        }
+        with open(self._path / self.LEDGER_FILE, "a") as f:
+            f.write(json.dumps({**shard, "stays": [_to_json(stay) for stay in stays]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._shards.append(shard)
+        self._write_manifest()
+        logger.debug("Wrote shard %s with %d rows", file.name, len(df))
+
+    def _write_manifest(self) -> None:
+        """Atomically rewrite the manifest with the written shards."""
+        tmp_file = self._path / f".{self.MANIFEST_FILE}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(
+                {"format": self._output_format.value, "config_hash": self._config_hash, "shards": self._shards},
+                f,
+                indent=2,
+            )
+        os.replace(tmp_file, self._path / self.MANIFEST_FILE)
+
+    def _load_ledger(self) -> None:
+        """Load the complete shards of a previous run from the ledger."""
+        with open(self._path / self.MANIFEST_FILE) as f:
+            manifest = json.load(f)
+        if manifest.get("config_hash") != self._config_hash:
+            raise ValueError(f"Shards in {self._path} were written with another configuration, cannot resume")
+        if manifest.get("format") != self._output_format:
+            raise ValueError(f"Shards in {self._path} were written as {manifest.get('format')}, cannot resume")
+
+        ledger = self._path / self.LEDGER_FILE
+        entries = []
+        for line in ledger.read_text().splitlines() if ledger.is_file() else []:
+            try:
+                shard = json.loads(line)
+            except json.JSONDecodeError:  # entry interrupted while writing
+                continue
+            if (self._path / shard["file"]).is_file():
+                entries.append(line)
+                self._completed_stays.update(shard.pop("stays"))
+                self._shards.append(shard)
+
+        # rewrite the ledger with the valid entries, so that new entries do not continue an interrupted line
+        tmp_file = self._path / f".{self.LEDGER_FILE}.tmp"
+        with open(tmp_file, "w") as f:
+            f.writelines(entry + "\n" for entry in entries)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, ledger)
+
+        # shards written without ledger entry are processed again
+        files = {shard["file"] for shard in self._shards}
+        for file in self._path.glob("part-*"):
+            if file.name not in files:
+                file.unlink()
+
+        logger.info("Resume %d shards with %d stays from %s", len(self._shards), len(self._completed_stays), ledger)
+
+    def _remove_shards(self) -> None:
+        """Remove the shards, manifest and ledger of a previous run."""
+        for file in [*self._path.glob("part-*"), self._path / self.LEDGER_FILE, self._path / self.MANIFEST_FILE]:
+            file.unlink(missing_ok=True)
+
+    def _raise_error(self) -> None:
+        """Raise the error of the background writer, if any."""
+        if self._error is not None:
+            raise RuntimeError("Failed to write shard") from self._error
+
+
+def _to_json(value: Any) -> Any:
+    """
+    Helper function to convert a NumPy scalar to a JSON serializable value.
+
+    Parameters
+    ----------
+    value : Any
+        The value to convert.
+
+    Returns
+    -------
+    Any
+        The converted value.
+    """
+    return value.item() if isinstance(value, np.generic) else value
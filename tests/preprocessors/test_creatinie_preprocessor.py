@@ -4,7 +4,7 @@ import numpy as np
 import pandas as pd
 
 from pyaki.preprocessors import CreatininePreProcessor
-from pyaki.utils import Dataset, DatasetType
+from pyaki.utils import INTERVAL_END, Dataset, DatasetType
 
 
 class TestCreatininePreProcessor(TestCase):
@@ -87,3 +87,39 @@ class TestCreatininePreProcessor(TestCase):
             ),
             check_index=False,
         )
+
+    def test_sparse_preprocessor(self):
+        preprocessor = CreatininePreProcessor(threshold=12, sparse=True)
+
+        creat_df = pd.DataFrame(
+            data={
+                "stay_id": [1, 1, 1, 1, 1, 2],
+                "creat": [1, 3, 0, 2, np.nan, 1],
+            },
+            index=pd.to_datetime(
+                [
+                    "2023-01-01 00:00:00",
+                    "2023-01-01 00:15:00",
+                    "2023-01-01 05:00:00",
+                    "2023-01-01 10:30:00",
+                    "2023-01-02 23:00:00",
+                    "2023-01-01 03:00:00",
+                ]
+            ),
+        )
+
+        _, df = preprocessor.process([Dataset(DatasetType.CREATININE, creat_df)])[0]
+
+        pd.testing.assert_frame_equal(
+            df,
+            pd.DataFrame(
+                data={
+                    "creat": [2.0, 2.0, 1.0],
+                    INTERVAL_END: pd.to_datetime(["2023-01-01 10:00", "2023-01-01 23:00", "2023-01-01 04:00"]),
+                },
+                index=pd.MultiIndex.from_arrays(
+                    [[1, 1, 2], pd.to_datetime(["2023-01-01 00:00", "2023-01-01 10:00", "2023-01-01 03:00"])],
+                    names=("stay_id", "charttime"),
+                ),
+            ),
+        )
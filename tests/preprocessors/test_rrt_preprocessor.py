@@ -4,7 +4,7 @@ import numpy as np
 import pandas as pd
 
 from pyaki.preprocessors import RRTPreProcessor
-from pyaki.utils import Dataset, DatasetType
+from pyaki.utils import INTERVAL_END, Dataset, DatasetType
 
 
 class TestRRTPreProcessor(TestCase):
@@ -48,3 +48,39 @@ class TestRRTPreProcessor(TestCase):
             ),
             check_index=False,
         )
+
+    def test_intervals(self):
+        rrt_df = pd.DataFrame(
+            data={
+                "stay_id": [1, 1, 1, 1, 2],
+                "rrt_status": [0, 1, 1, np.nan, 1],
+            },
+            index=pd.to_datetime(
+                [
+                    "2023-01-01 00:00:00",
+                    "2023-01-01 15:30:00",
+                    "2023-01-01 18:00:00",
+                    "2023-01-01 23:00:00",
+                    "2023-01-01 00:00:00",
+                ]
+            ),
+        )
+
+        _, df = RRTPreProcessor(intervals=True).process([Dataset(DatasetType.RRT, rrt_df)])[0]
+
+        pd.testing.assert_frame_equal(
+            df,
+            pd.DataFrame(
+                data={
+                    "rrt_status": [0.0, 1.0, 1.0],
+                    INTERVAL_END: pd.to_datetime(["2023-01-01 15:00:00", "2023-01-02 00:00:00", "2023-01-01 01:00:00"]),
+                },
+                index=pd.MultiIndex.from_arrays(
+                    [
+                        [1, 1, 2],
+                        pd.to_datetime(["2023-01-01 00:00:00", "2023-01-01 15:00:00", "2023-01-01 00:00:00"]),
+                    ],
+                    names=("stay_id", "charttime"),
+                ),
+            ),
+        )
@@ -1,9 +1,17 @@
 from unittest import TestCase
+from unittest.mock import patch
 
 import pandas as pd
 
-from pyaki.preprocessors import TimeIndexCreator
+from pyaki.preprocessors import (
+    CreatininePreProcessor,
+    DemographicsPreProcessor,
+    RRTPreProcessor,
+    TimeIndexCreator,
+    UrineOutputPreProcessor,
+)
 from pyaki.utils import Dataset, DatasetType
+from tests.set_up import setup_validation_data
 
 
 class TestTimeIndexCreator(TestCase):
@@ -40,3 +48,79 @@ class TestTimeIndexCreator(TestCase):
             ),
             check_index=False,
         )
+
+    def test_sorting(self):
+        creatinine_df = pd.DataFrame(
+            data={
+                "stay_id": [2, 1, 1, 2],
+                "creat": [1.0, 2.0, 3.0, 4.0],
+                "charttime": ["01/01/2023 05:00", "01/01/2023 03:00", "01/01/2023 01:00", "01/01/2023 00:00"],
+            },
+        )
+
+        _, df = TimeIndexCreator(time_format="%d/%m/%Y %H:%M").process(
+            [Dataset(DatasetType.CREATININE, creatinine_df)]
+        )[0]
+
+        self.assertListEqual(df["creat"].tolist(), [3.0, 2.0, 4.0, 1.0])
+        self.assertListEqual(df.index.hour.tolist(), [1, 3, 0, 5])
+
+        # sorted data is left untouched
+        self.assertTrue(TimeIndexCreator._is_sorted(df.reset_index(), ["stay_id", "charttime"]))
+        self.assertFalse(TimeIndexCreator._is_sorted(creatinine_df, ["stay_id", "charttime"]))
+
+    def test_sort_once(self):
+        creatinine_df = pd.DataFrame(
+            data={
+                "stay_id": [2, 1, 1, 2],
+                "creat": [1.0, 2.0, 3.0, 4.0],
+                "charttime": ["2023-01-01 05:00", "2023-01-01 03:00", "2023-01-01 01:00", "2023-01-01 00:00"],
+            },
+        )
+
+        for data in [creatinine_df, creatinine_df.sort_values(["stay_id", "charttime"])]:
+            with (
+                self.subTest(data=data["stay_id"].tolist()),
+                patch.object(pd.DataFrame, "sort_values", autospec=True, side_effect=pd.DataFrame.sort_values) as sort,
+                patch.object(pd.DataFrame, "groupby", autospec=True, side_effect=pd.DataFrame.groupby) as groupby,
+            ):
+                datasets = self.preprocessor.process([Dataset(DatasetType.CREATININE, data.copy())])
+                _, df = CreatininePreProcessor(sparse=False).process(datasets)[0]
+
+                # the unsorted data is sorted once by the time index creator, the stays are not sorted again
+                self.assertEqual(sort.call_count, int(data is creatinine_df))
+                self.assertFalse(groupby.call_args_list[0].kwargs["sort"])
+                self.assertListEqual(df.index.get_level_values("stay_id").unique().tolist(), [1, 2])
+
+    def test_assume_sorted(self):
+        _, validation_data_unlabelled = setup_validation_data()
+        data = validation_data_unlabelled.reset_index()
+
+        def preprocess(assume_sorted: bool) -> list[Dataset]:
+            datasets = [
+                Dataset(DatasetType.URINEOUTPUT, data[["stay_id", "charttime", "urineoutput"]].dropna()),
+                Dataset(DatasetType.CREATININE, data[["stay_id", "charttime", "creat"]].dropna()),
+                Dataset(DatasetType.DEMOGRAPHICS, data[["stay_id", "weight"]].dropna()),
+                Dataset(DatasetType.RRT, data[["stay_id", "charttime", "rrt_status"]].dropna()),
+            ]
+            for preprocessor in [
+                TimeIndexCreator(assume_sorted=assume_sorted),
+                UrineOutputPreProcessor(assume_sorted=assume_sorted),
+                CreatininePreProcessor(assume_sorted=assume_sorted),
+                DemographicsPreProcessor(assume_sorted=assume_sorted),
+                RRTPreProcessor(assume_sorted=assume_sorted),
+            ]:
+                datasets = preprocessor.process(datasets)
+            return datasets
+
+        for (dtype, df), (_, expected) in zip(preprocess(True), preprocess(False)):
+            with self.subTest(dtype=dtype):
+                pd.testing.assert_frame_equal(df, expected)
+
+        # the stays are grouped in order of appearance instead of being sorted
+        rrt_df = pd.DataFrame(
+            data={"stay_id": [2, 1], "rrt_status": [1.0, 0.0]},
+            index=pd.to_datetime(["2023-01-01 00:00:00", "2023-01-01 00:00:00"]),
+        )
+        _, df = RRTPreProcessor(assume_sorted=True).process([Dataset(DatasetType.RRT, rrt_df)])[0]
+        self.assertListEqual(df.index.get_level_values("stay_id").tolist(), [2, 1])
@@ -89,3 +89,29 @@ class TestUrineOutputPreProcessor(TestCase):
             ),
             check_index=False,
         )
+
+    def test_resample_preprocessor(self):
+        preprocessor = UrineOutputPreProcessor(resample=False)
+
+        ou_df = pd.DataFrame(
+            data={
+                "stay_id": [1, 1, 2],
+                "urineoutput": [0, 3, 2],
+            },
+            index=pd.DatetimeIndex(
+                ["2023-01-01 00:00:00", "2023-01-01 00:15:00", "2023-01-01 15:00:00"], name="charttime"
+            ),
+        )
+
+        _, df = preprocessor.process([Dataset(DatasetType.URINEOUTPUT, ou_df)])[0]
+
+        pd.testing.assert_frame_equal(
+            df,
+            pd.DataFrame(
+                data={"urineoutput": [0, 3, 2]},
+                index=pd.MultiIndex.from_arrays(
+                    [[1, 1, 2], ou_df.index],
+                    names=("stay_id", "charttime"),
+                ),
+            ),
+        )
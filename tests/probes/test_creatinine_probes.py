@@ -1,3 +1,4 @@
+from itertools import product
 from unittest import TestCase
 
 import numpy as np
@@ -12,6 +13,7 @@ from pyaki.probes import (
     DatasetType,
     RelativeCreatinineProbe,
 )
+from pyaki.utils import INTERVAL_END
 from tests.set_up import setup_validation_data
 
 
@@ -258,3 +260,203 @@ class TestBaselineCreatinine(TestCase):
             series,
             check_index=False,
         )
+
+
+class TestCohortBaselineCreatinine(TestCase):
+    def setUp(self) -> None:
+        _, validation_data_unlabelled = setup_validation_data()
+        self.creatinine_df = validation_data_unlabelled[["creat"]]
+        self.patient_df = validation_data_unlabelled[["weight"]].groupby("stay_id").first()
+
+    def test_cohort_baseline(self):
+        # hourly random values with gaps of missing and zero values, some longer than the baseline timeframe
+        rng = np.random.default_rng(0)
+        hours = pd.date_range("2023-01-01 00:00", periods=24 * 8, freq="h")
+        values = rng.uniform(0.5, 1.5, size=(4, len(hours)))
+        values[0, 30:110] = np.nan
+        values[1, 20:90] = 0
+        values[2, rng.choice(len(hours), size=60, replace=False)] = np.nan
+        # the window at the end of the first timeframe misses its minimum, before a gap
+        values[3, 0] = 0.4
+        values[3, 49:53] = np.nan
+        gaps_df = pd.DataFrame(
+            data={"creat": values.reshape(-1)},
+            index=pd.MultiIndex.from_product([[1, 2, 3, 4], hours], names=("stay_id", "charttime")),
+        )
+
+        for creatinine_df, method in product([self.creatinine_df, gaps_df], AbstractCreatinineProbe.COHORT_METHODS):
+            probe = AbstractCreatinineProbe(baseline_timeframe="2d", method=method)
+
+            cohort_baseline = probe.cohort_creatinine_baseline(creatinine_df)
+
+            for stay_id, df in creatinine_df.groupby("stay_id"):
+                df = df.droplevel("stay_id")
+                pd.testing.assert_series_equal(
+                    cohort_baseline.loc[stay_id],
+                    probe.creatinine_baseline(df.copy(), pd.Series()).reindex(df.index),
+                    check_index=False,
+                    check_names=False,
+                    obj=f"{method} baseline of stay {stay_id}",
+                )
+
+    def test_irregular_rolling_baseline(self):
+        creatinine_df = pd.DataFrame(
+            data={"creat": [1.4, 0, 1.1, 1.3, 0.9, 1.2, 2.0, 1.5]},
+            index=pd.MultiIndex.from_arrays(
+                [
+                    [1, 1, 1, 1, 1, 2, 2, 2],
+                    pd.to_datetime(
+                        [
+                            "2023-01-01 00:00",
+                            "2023-01-01 00:40",
+                            "2023-01-01 01:00",
+                            "2023-01-02 01:00",
+                            "2023-01-02 01:50",
+                            "2023-01-01 08:00",
+                            "2023-01-01 08:30",
+                            "2023-01-03 12:00",
+                        ]
+                    ),
+                ],
+                names=("stay_id", "charttime"),
+            ),
+        )
+
+        for method in [
+            CreatinineBaselineMethod.ROLLING_MIN,
+            CreatinineBaselineMethod.ROLLING_MEAN,
+            CreatinineBaselineMethod.FIXED_MIN,
+        ]:
+            probe = AbstractCreatinineProbe(baseline_timeframe="1d", method=method)
+
+            cohort_baseline = probe.cohort_creatinine_baseline(creatinine_df)
+
+            for stay_id, df in creatinine_df.groupby("stay_id"):
+                df = df.droplevel("stay_id")
+                pd.testing.assert_series_equal(
+                    cohort_baseline.loc[stay_id],
+                    probe.creatinine_baseline(df.copy(), pd.Series()).reindex(df.index),
+                    check_index=False,
+                    check_names=False,
+                )
+
+        # rows off the hourly grid have no baseline, the hour after a day only has the later values in its windows
+        np.testing.assert_array_equal(
+            AbstractCreatinineProbe(baseline_timeframe="1d").cohort_creatinine_baseline(creatinine_df).to_numpy(),
+            [1.4, np.nan, 1.1, 0.9, np.nan, 1.2, np.nan, 1.5],
+        )
+
+    def test_second_resolution(self):
+        # e.g. timestamps read by pyarrow
+        creatinine_df = self.creatinine_df.set_axis(
+            self.creatinine_df.index.set_levels(self.creatinine_df.index.levels[1].as_unit("s"), level=1)
+        )
+
+        for method in [
+            CreatinineBaselineMethod.ROLLING_MIN,
+            CreatinineBaselineMethod.ROLLING_MEAN,
+            CreatinineBaselineMethod.FIXED_MIN,
+        ]:
+            probe = AbstractCreatinineProbe(baseline_timeframe="2d", method=method)
+            pd.testing.assert_series_equal(
+                probe.cohort_creatinine_baseline(creatinine_df),
+                probe.cohort_creatinine_baseline(self.creatinine_df),
+                check_index=False,
+            )
+
+    def test_unsupported_method(self):
+        probe = AbstractCreatinineProbe(method=CreatinineBaselineMethod.CONSTANT)
+
+        self.assertFalse(probe.supports_cohort_baseline)
+        with self.assertRaises(ValueError):
+            probe.cohort_creatinine_baseline(self.creatinine_df)
+
+    def test_analyser(self):
+        probe = RelativeCreatinineProbe(method=CreatinineBaselineMethod.FIXED_MIN)
+        analyser = Analyser(
+            [
+                Dataset(DatasetType.CREATININE, self.creatinine_df),
+                Dataset(DatasetType.DEMOGRAPHICS, self.patient_df),
+            ],
+            probes=[probe],
+            preprocessors=[],
+        )
+
+        df = analyser.process_stays()
+
+        for stay_id, creatinine_df in self.creatinine_df.groupby("stay_id"):
+            _, expected = probe.probe(
+                [
+                    Dataset(DatasetType.CREATININE, creatinine_df.droplevel("stay_id")),
+                    Dataset(DatasetType.DEMOGRAPHICS, pd.DataFrame()),
+                ]
+            )[0]
+            pd.testing.assert_series_equal(
+                df.loc[stay_id, "rel_creatinine_stage"],
+                expected["rel_creatinine_stage"],
+                check_index=False,
+            )
+
+
+class TestEventBaselineCreatinine(TestCase):
+    def setUp(self) -> None:
+        # lab draws every one to two days, each holding until the next draw
+        times = pd.to_datetime(
+            [
+                "2023-01-01 06:00",
+                "2023-01-02 06:00",
+                "2023-01-03 18:00",
+                "2023-01-04 06:00",
+                "2023-01-06 06:00",
+            ]
+        )
+        self.events = pd.DataFrame(
+            data={"creat": [1.2, 1.0, 1.6, 2.4, 1.8], INTERVAL_END: [*times[1:], times[-1] + pd.Timedelta("1h")]},
+            index=pd.DatetimeIndex(times, name="charttime"),
+        )
+
+    def test_event_baseline(self):
+        for method, expected in [
+            (CreatinineBaselineMethod.ROLLING_MIN, [1.2, 1.0, 1.0, 1.6, 1.8]),
+            (CreatinineBaselineMethod.ROLLING_FIRST, [1.2, 1.2, 1.0, 1.6, 1.8]),
+            (CreatinineBaselineMethod.ROLLING_MEAN, [1.2, 1.1, 1.3, 2.0, 1.8]),
+            (CreatinineBaselineMethod.FIXED_MIN, [1.2, 1.0, 1.0, 1.0, 1.0]),
+        ]:
+            with self.subTest(method=method):
+                probe = AbstractCreatinineProbe(baseline_timeframe="2d", method=method)
+                pd.testing.assert_series_equal(
+                    probe.creatinine_baseline(self.events.copy(), pd.Series()),
+                    pd.Series(expected, index=self.events.index, name="creat"),
+                )
+
+    def test_cohort_event_baseline(self):
+        events = pd.concat({1: self.events, 2: self.events.iloc[2:]}, names=["stay_id"])
+        for method in AbstractCreatinineProbe.EVENT_METHODS:
+            probe = AbstractCreatinineProbe(baseline_timeframe="2d", method=method)
+
+            cohort_baseline = probe.event_creatinine_baseline(events, "stay_id")
+
+            for stay_id, df in events.groupby("stay_id"):
+                pd.testing.assert_series_equal(
+                    cohort_baseline.loc[stay_id],
+                    probe.creatinine_baseline(df.droplevel("stay_id"), pd.Series()),
+                )
+
+    def test_analyser(self):
+        events = pd.concat({1: self.events}, names=["stay_id"])
+        analyser = Analyser(
+            [
+                Dataset(DatasetType.CREATININE, events),
+                Dataset(DatasetType.DEMOGRAPHICS, pd.DataFrame({"weight": [70]}, index=pd.Index([1], name="stay_id"))),
+            ],
+            probes=[RelativeCreatinineProbe(baseline_timeframe="2d")],
+            preprocessors=[],
+        )
+
+        df = analyser.process_stays()
+
+        # the stages of the events are projected onto hourly rows until the next event
+        np.testing.assert_array_equal(
+            df["rel_creatinine_stage"].to_numpy(),
+            np.repeat([0.0, 0.0, 1.0, 1.0, 0.0], [24, 36, 12, 48, 1]),
+        )
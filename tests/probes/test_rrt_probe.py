@@ -3,6 +3,13 @@ from unittest import TestCase
 import pandas as pd
 
 from pyaki.kdigo import Analyser
+from pyaki.preprocessors import (
+    CreatininePreProcessor,
+    DemographicsPreProcessor,
+    RRTPreProcessor,
+    TimeIndexCreator,
+    UrineOutputPreProcessor,
+)
 from pyaki.probes import Dataset, DatasetType, RRTProbe
 from tests.set_up import setup_validation_data
 
@@ -55,3 +62,26 @@ class TestRRTProbe(TestCase):
             true_labels,
             check_index=False,
         )
+
+    def test_intervals(self):
+        data = self.validation_data_unlabelled.reset_index()
+        datasets = [
+            Dataset(DatasetType.URINEOUTPUT, data[["stay_id", "charttime", "urineoutput"]].dropna()),
+            Dataset(DatasetType.CREATININE, data[["stay_id", "charttime", "creat"]].dropna()),
+            Dataset(DatasetType.DEMOGRAPHICS, data[["stay_id", "weight"]].dropna()),
+            Dataset(DatasetType.RRT, data[["stay_id", "charttime", "rrt_status"]].dropna()),
+        ]
+
+        def preprocessors(intervals):
+            return [
+                TimeIndexCreator(),
+                UrineOutputPreProcessor(),
+                CreatininePreProcessor(),
+                DemographicsPreProcessor(),
+                RRTPreProcessor(intervals=intervals),
+            ]
+
+        expected = Analyser(datasets, preprocessors=preprocessors(False)).process_stays()
+        result = Analyser(datasets, preprocessors=preprocessors(True)).process_stays()
+
+        pd.testing.assert_frame_equal(result, expected)
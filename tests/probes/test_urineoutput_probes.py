@@ -4,7 +4,8 @@ import numpy as np
 import pandas as pd
 
 from pyaki.kdigo import Analyser
-from pyaki.probes import Dataset, DatasetType, UrineOutputMethod, UrineOutputProbe
+from pyaki.probes import Dataset, DatasetType, RelativeCreatinineProbe, UrineOutputMethod, UrineOutputProbe
+from pyaki.utils import expand_intervals
 from tests.set_up import setup_validation_data
 
 
@@ -268,3 +269,135 @@ class TestUrineOutputProbe(TestCase):
             ),
             check_index=False,
         )
+
+    def test_irregular(self):
+        urine_output_df = pd.DataFrame(
+            data={"urineoutput": [100] + [25] * 24},
+            index=pd.period_range(start="2023-01-01 00:00:00", end="2023-01-02 00:00:00", freq="h"),
+        )
+
+        # on an hourly series, the time windows cover the same hours as the rolling windows
+        for method in UrineOutputMethod:
+            pd.testing.assert_frame_equal(
+                UrineOutputProbe(method=method, irregular=True).rolling_aggregates(urine_output_df),
+                UrineOutputProbe(method=method).rolling_aggregates(urine_output_df),
+            )
+
+        # charts every few hours with 30 ml/h until 10:00, then 20 ml/h
+        irregular_df = pd.DataFrame(
+            data={"urineoutput": [30, 60, 90, 75, 75, 80, 160]},
+            index=pd.DatetimeIndex(
+                data=[
+                    "2023-01-01 00:00:00",
+                    "2023-01-01 02:00:00",
+                    "2023-01-01 05:00:00",
+                    "2023-01-01 07:30:00",
+                    "2023-01-01 10:00:00",
+                    "2023-01-01 14:00:00",
+                    "2023-01-01 22:00:00",
+                ],
+                name="charttime",
+            ),
+        )
+
+        demographics = pd.Series(data={"weight": 50})
+
+        _, df = UrineOutputProbe(irregular=True).probe(
+            [
+                Dataset(DatasetType.URINEOUTPUT, irregular_df),
+                Dataset(DatasetType.DEMOGRAPHICS, demographics),
+            ]
+        )[0]
+
+        # the stages of the charts hold until the next charted hour, the volumes are kept in the charted hours
+        expanded = expand_intervals(df)
+        pd.testing.assert_series_equal(
+            expanded["urineoutput_stage"],
+            pd.Series(
+                data=[np.nan] * 5 + [0] * 9 + [1] * 8 + [2],
+                index=pd.date_range("2023-01-01 00:00:00", "2023-01-01 22:00:00", freq="h", name="charttime"),
+                name="urineoutput_stage",
+            ),
+            check_freq=False,
+        )
+        self.assertListEqual(expanded["urineoutput"].dropna().index.tolist(), irregular_df.index.floor("1h").tolist())
+        self.assertEqual(expanded["urineoutput"].sum(), irregular_df["urineoutput"].sum())
+
+    def test_irregular_duplicate_times(self):
+        times = pd.date_range("2023-01-01 00:00:00", periods=24, freq="h", name="charttime")
+        summed_df = pd.DataFrame(data={"urineoutput": [20.0] * 24}, index=times)
+        duplicated_df = pd.DataFrame(data={"urineoutput": [10.0] * 48}, index=times.repeat(2))
+        demographics = pd.Series(data={"weight": 50})
+
+        # charts at the same time are summed, instead of charting an infinite rate
+        for method in UrineOutputMethod:
+            probe = UrineOutputProbe(method=method, irregular=True)
+            with self.subTest(method=method):
+                aggregates = probe.rolling_aggregates(duplicated_df)
+                self.assertFalse(np.isinf(aggregates.to_numpy()).any())
+                pd.testing.assert_frame_equal(
+                    aggregates, probe.rolling_aggregates(summed_df).iloc[np.arange(48) // 2].set_axis(aggregates.index)
+                )
+
+                _, df = probe.probe(
+                    [
+                        Dataset(DatasetType.URINEOUTPUT, duplicated_df),
+                        Dataset(DatasetType.DEMOGRAPHICS, demographics),
+                    ]
+                )[0]
+                self.assertEqual(df["urineoutput_stage"].max(), 2)
+                self.assertEqual(df["urineoutput"].sum(), 480)
+
+    def test_irregular_analyser(self):
+        charttimes = pd.to_datetime(
+            [
+                "2023-01-01 00:00",
+                "2023-01-01 02:00",
+                "2023-01-01 05:00",
+                "2023-01-01 07:30",
+                "2023-01-01 10:00",
+                "2023-01-01 14:00",
+                "2023-01-01 22:00",
+            ]
+        )
+        hours = pd.date_range("2023-01-01 00:00", "2023-01-01 22:00", freq="h")
+        analyser = Analyser(
+            [
+                Dataset(
+                    DatasetType.URINEOUTPUT,
+                    pd.DataFrame(
+                        data={"urineoutput": [30, 60, 90, 75, 75, 80, 160]},
+                        index=pd.MultiIndex.from_product([[1], charttimes], names=("stay_id", "charttime")),
+                    ),
+                ),
+                Dataset(
+                    DatasetType.CREATININE,
+                    pd.DataFrame(
+                        data={"creat": [1.0] * len(hours)},
+                        index=pd.MultiIndex.from_product([[1], hours], names=("stay_id", "charttime")),
+                    ),
+                ),
+                Dataset(DatasetType.DEMOGRAPHICS, pd.DataFrame({"weight": [50]}, index=pd.Index([1], name="stay_id"))),
+            ],
+            probes=[UrineOutputProbe(irregular=True), RelativeCreatinineProbe()],
+            preprocessors=[],
+        )
+
+        # every hour combines the projected urine output stage with the creatinine stage
+        df = analyser.process_stays()
+        self.assertTrue(df.index.get_level_values("charttime").equals(pd.DatetimeIndex(hours, name="charttime")))
+        np.testing.assert_array_equal(df["stage"].to_numpy(), [0.0] * 14 + [1.0] * 8 + [2.0])
+        self.assertEqual(df["urineoutput"].sum(), 570)
+
+        episodes = analyser.process_episodes()
+        np.testing.assert_array_equal(episodes["stage"].to_numpy(), [0.0, 1.0, 2.0])
+        np.testing.assert_array_equal(
+            episodes["end"].to_numpy(),
+            pd.to_datetime(["2023-01-01 14:00", "2023-01-01 22:00", "2023-01-01 23:00"]).to_numpy(),
+        )
+
+        summary = analyser.summarize()
+        self.assertEqual(
+            summary.loc[1, ["hours_stage_0", "hours_stage_1", "hours_stage_2", "hours_stage_3"]].tolist(),
+            [14, 8, 1, 0],
+        )
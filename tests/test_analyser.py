@@ -1,9 +1,19 @@
 from unittest import TestCase
+from unittest.mock import patch
 
 import pandas as pd
 
-from pyaki.kdigo import Analyser
-from pyaki.probes import Dataset, DatasetType
+from pyaki.kdigo import Analyser, Backend
+from pyaki.probes import (
+    AbsoluteCreatinineProbe,
+    CreatinineBaselineMethod,
+    Dataset,
+    DatasetType,
+    Probe,
+    RelativeCreatinineProbe,
+    UrineOutputMethod,
+    UrineOutputProbe,
+)
 from tests.set_up import setup_validation_data
 
 
@@ -40,6 +50,39 @@ class TestAnalyser(TestCase):
                 preprocessors=[],
             )
 
+    def test_validation_data_columns(self):
+        creatinine_df = pd.DataFrame(
+            data={
+                "stay_id": [1, 1, 2],
+                "charttime": ["2023-01-01 00:00:00", "2023-01-01 01:00:00", "2023-01-01 00:00:00"],
+                "creat": [1.0, 1.2, -0.5],
+            },
+        )
+
+        with self.assertRaisesRegex(ValueError, r"column creat, e.g. at \(stay_id=2, charttime=2023-01-01 00:00:00\)"):
+            Analyser([Dataset(DatasetType.CREATININE, creatinine_df)], probes=[], preprocessors=[])
+
+        # identifiers and columns other than the measurements are not validated
+        creatinine_df["stay_id"] = -1
+        creatinine_df["creat"] = 1.0
+        creatinine_df["offset"] = -1.0
+        Analyser([Dataset(DatasetType.CREATININE, creatinine_df)], probes=[], preprocessors=[])
+
+    def test_validation_data_chunks(self):
+        creatinine_df = pd.DataFrame(
+            data={
+                "stay_id": [1] * 5 + [2] * 5,
+                "charttime": [f"2023-01-01 0{hour}:00:00" for hour in range(5)] * 2,
+                "creat": [1.0] * 7 + [-0.5, None, 1.0],
+            },
+        )
+
+        with patch.object(Analyser, "VALIDATION_CHUNK_SIZE", 3):
+            with self.assertRaisesRegex(
+                ValueError, r"column creat, e.g. at \(stay_id=2, charttime=2023-01-01 02:00:00\)"
+            ):
+                Analyser([Dataset(DatasetType.CREATININE, creatinine_df)], probes=[], preprocessors=[])
+
     def test_full_analyser(self):
         data = self.validation_data_unlabelled.copy()
         data.reset_index(inplace=True)
@@ -107,3 +150,147 @@ class TestAnalyser(TestCase):
                 self.validation_data[column],
                 check_index=False,
             )
+
+    def test_sweep(self):
+        datasets = [
+            Dataset(DatasetType.URINEOUTPUT, self.validation_data_unlabelled[["urineoutput"]]),
+            Dataset(DatasetType.CREATININE, self.validation_data_unlabelled[["creat"]]),
+            Dataset(
+                DatasetType.DEMOGRAPHICS,
+                self.validation_data_unlabelled[["weight"]].groupby("stay_id").first(),
+            ),
+        ]
+        configurations = {
+            f"{urine_method}_{creatinine_method}": [
+                UrineOutputProbe(method=urine_method),
+                AbsoluteCreatinineProbe(method=creatinine_method),
+                RelativeCreatinineProbe(method=creatinine_method),
+            ]
+            for urine_method in UrineOutputMethod
+            for creatinine_method in [CreatinineBaselineMethod.ROLLING_MIN, CreatinineBaselineMethod.OVERALL_MIN]
+        }
+
+        results = Analyser(datasets, preprocessors=[]).sweep(configurations)
+
+        self.assertEqual(results.index.names, ["configuration", "stay_id", "charttime"])
+        for name, probes in configurations.items():
+            pd.testing.assert_frame_equal(
+                results.loc[name],
+                Analyser(datasets, probes=probes, preprocessors=[]).process_stays(),
+            )
+
+    def test_backends(self):
+        analyser = Analyser(
+            [
+                Dataset(DatasetType.URINEOUTPUT, self.validation_data_unlabelled[["urineoutput"]]),
+                Dataset(DatasetType.CREATININE, self.validation_data_unlabelled[["creat"]]),
+                Dataset(
+                    DatasetType.DEMOGRAPHICS,
+                    self.validation_data_unlabelled[["weight"]].groupby("stay_id").first(),
+                ),
+                Dataset(DatasetType.RRT, self.validation_data_unlabelled[["rrt_status"]]),
+            ],
+            preprocessors=[],
+        )
+        expected = analyser.process_stays()
+
+        for backend in [Backend.THREADS, Backend.PROCESSES]:
+            pd.testing.assert_frame_equal(
+                analyser.process_stays(backend=backend, workers=2, chunk_size=4),
+                expected,
+            )
+
+    def test_episodes(self):
+        data = self.validation_data_unlabelled.reset_index()
+        analyser = Analyser(
+            [
+                Dataset(DatasetType.URINEOUTPUT, data[["stay_id", "charttime", "urineoutput"]].dropna()),
+                Dataset(DatasetType.CREATININE, data[["stay_id", "charttime", "creat"]].dropna()),
+                Dataset(DatasetType.DEMOGRAPHICS, data[["stay_id", "weight"]].dropna()),
+                Dataset(DatasetType.RRT, data[["stay_id", "charttime", "rrt_status"]].dropna()),
+            ]
+        )
+        results = analyser.process_stays()
+        episodes = analyser.process_episodes()
+
+        self.assertListEqual(list(episodes.columns), ["stay_id", "start", "end", "stage", "criterion"])
+        self.assertLess(len(episodes), len(results))
+
+        # expanding the episodes restores the hourly stages
+        hours = ((episodes["end"] - episodes["start"]) // pd.Timedelta("1h")).to_numpy()
+        stages = results["stage"].dropna()
+        self.assertEqual(hours.sum(), len(stages))
+        self.assertListEqual(episodes["stage"].repeat(hours).tolist(), stages.tolist())
+
+        self.assertTrue(episodes.loc[episodes["stage"] == 0, "criterion"].isna().all())
+        self.assertTrue(episodes.loc[episodes["stage"] > 0, "criterion"].notna().all())
+        self.assertTrue(
+            set(episodes["criterion"].dropna()) <= {"urineoutput", "abs_creatinine", "rel_creatinine", "rrt"}
+        )
+
+    def test_query(self):
+        data = self.validation_data_unlabelled.reset_index()
+        datasets = [
+            Dataset(DatasetType.URINEOUTPUT, data[["stay_id", "charttime", "urineoutput"]].dropna()),
+            Dataset(DatasetType.CREATININE, data[["stay_id", "charttime", "creat"]].dropna()),
+            Dataset(DatasetType.DEMOGRAPHICS, data[["stay_id", "weight"]].dropna()),
+            Dataset(DatasetType.RRT, data[["stay_id", "charttime", "rrt_status"]].dropna()),
+        ]
+        expected = Analyser(datasets).process_stays()
+
+        analyser = Analyser(datasets, columns=["urineoutput_stage"])
+        self.assertSetEqual({dtype for dtype, _ in analyser._data}, {DatasetType.URINEOUTPUT, DatasetType.DEMOGRAPHICS})
+
+        results = analyser.process_stays()
+        self.assertListEqual(list(results.columns), ["urineoutput_stage"])
+        pd.testing.assert_series_equal(results["urineoutput_stage"], expected.loc[results.index, "urineoutput_stage"])
+
+        results = Analyser(datasets, columns=["stage", "creat"]).process_stays()
+        pd.testing.assert_frame_equal(results, expected[["stage", "creat"]])
+
+        with self.assertRaisesRegex(ValueError, "Unknown columns: foo"):
+            Analyser(datasets, columns=["stage", "foo"])
+
+    def test_summarize(self):
+        data = self.validation_data_unlabelled.reset_index()
+        analyser = Analyser(
+            [
+                Dataset(DatasetType.URINEOUTPUT, data[["stay_id", "charttime", "urineoutput"]].dropna()),
+                Dataset(DatasetType.CREATININE, data[["stay_id", "charttime", "creat"]].dropna()),
+                Dataset(DatasetType.DEMOGRAPHICS, data[["stay_id", "weight"]].dropna()),
+                Dataset(DatasetType.RRT, data[["stay_id", "charttime", "rrt_status"]].dropna()),
+            ]
+        )
+        stages = analyser.process_stays()["stage"]
+        summary = analyser.summarize()
+
+        self.assertEqual(len(summary), stages.index.get_level_values("stay_id").nunique())
+        pd.testing.assert_series_equal(summary["max_stage"], stages.groupby(level="stay_id").max(), check_names=False)
+        for stage in range(4):
+            reached = stages[stages == stage].reset_index(level="charttime")["charttime"].groupby(level="stay_id")
+            pd.testing.assert_series_equal(
+                summary[f"hours_stage_{stage}"],
+                reached.size().reindex(summary.index, fill_value=0),
+                check_names=False,
+            )
+            pd.testing.assert_series_equal(
+                summary[f"first_stage_{stage}"].dropna(), reached.min(), check_names=False, check_index_type=False
+            )
+
+        pd.testing.assert_frame_equal(analyser.summarize(backend=Backend.THREADS, chunk_size=4), summary)
+
+    def test_undecorated_probe(self):
+        class ConstantProbe(Probe):
+            RESNAME = "constant_stage"
+
+            def probe(self, datasets, **kwargs):
+                return [Dataset(dtype, df.assign(constant_stage=1.0)) for dtype, df in datasets]
+
+        data = self.validation_data_unlabelled.reset_index()
+        results = Analyser(
+            [Dataset(DatasetType.URINEOUTPUT, data[["stay_id", "charttime", "urineoutput"]].dropna())],
+            probes=[ConstantProbe(), UrineOutputProbe()],
+        ).process_stays()
+
+        self.assertTrue((results["constant_stage"] == 1).all())
+        self.assertNotIn("urineoutput_stage", results.columns)  # skipped, as the demographics are missing
@@ -0,0 +1,64 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import pandas as pd
+
+from pyaki.cache import PreprocessingCache
+from pyaki.kdigo import Analyser
+from pyaki.preprocessors import CreatininePreProcessor, DemographicsPreProcessor, TimeIndexCreator
+from pyaki.probes import AbsoluteCreatinineProbe
+from pyaki.utils import Dataset, DatasetType
+from tests.set_up import setup_validation_data
+
+
+class TestPreprocessingCache(TestCase):
+    def setUp(self) -> None:
+        _, validation_data_unlabelled = setup_validation_data()
+        data = validation_data_unlabelled.reset_index()
+        self.datasets = [
+            Dataset(DatasetType.CREATININE, data[["stay_id", "charttime", "creat"]].dropna()),
+            Dataset(DatasetType.DEMOGRAPHICS, data[["stay_id", "weight"]].dropna()),
+        ]
+        self.tmp_dir = TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _process(self, cache, threshold=72):
+        return Analyser(
+            [Dataset(dtype, df.copy()) for dtype, df in self.datasets],
+            probes=[AbsoluteCreatinineProbe()],
+            preprocessors=[
+                TimeIndexCreator(),
+                CreatininePreProcessor(threshold=threshold),
+                DemographicsPreProcessor(),
+            ],
+            cache=cache,
+        ).process_stays()
+
+    def test_cache_hit(self):
+        cache = PreprocessingCache(self.tmp_dir.name)
+        expected = self._process(None)
+
+        pd.testing.assert_frame_equal(self._process(cache), expected)
+        with self.assertLogs("pyaki.cache", level="INFO") as logs:
+            pd.testing.assert_frame_equal(self._process(cache), expected)
+
+        self.assertIn("hit for 3 of 3 stages", logs.output[0])
+
+    def test_invalidation(self):
+        cache = PreprocessingCache(self.tmp_dir.name)
+        self._process(cache)
+
+        with self.assertLogs("pyaki.cache", level="INFO") as logs:
+            pd.testing.assert_frame_equal(self._process(cache, threshold=24), self._process(None, threshold=24))
+
+        self.assertIn("hit for 1 of 3 stages", logs.output[0])
+
+    def test_eviction(self):
+        cache = PreprocessingCache(self.tmp_dir.name, max_size=0)
+
+        self._process(cache)
+
+        with self.assertNoLogs("pyaki.cache", level="INFO"):
+            self._process(PreprocessingCache(self.tmp_dir.name, max_size=2**30))
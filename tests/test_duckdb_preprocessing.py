@@ -0,0 +1,119 @@
+from importlib.util import find_spec
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+
+import numpy as np
+import pandas as pd
+
+from pyaki.kdigo import Analyser
+from pyaki.preprocessors import (
+    CreatininePreProcessor,
+    DemographicsPreProcessor,
+    RRTPreProcessor,
+    TimeIndexCreator,
+    UrineOutputPreProcessor,
+)
+from pyaki.utils import Dataset, DatasetType
+from tests.set_up import setup_validation_data
+
+
+@skipUnless(find_spec("duckdb"), "requires duckdb")
+class TestDuckDBPreprocessing(TestCase):
+    def setUp(self) -> None:
+        _, validation_data_unlabelled = setup_validation_data()
+        self.data = validation_data_unlabelled.reset_index()
+
+    def sources(self) -> list[tuple[DatasetType, pd.DataFrame]]:
+        return [
+            (DatasetType.URINEOUTPUT, self.data[["stay_id", "charttime", "urineoutput"]].dropna()),
+            (DatasetType.CREATININE, self.data[["stay_id", "charttime", "creat"]].dropna()),
+            (DatasetType.DEMOGRAPHICS, self.data[["stay_id", "weight"]].dropna()),
+            (DatasetType.RRT, self.data[["stay_id", "charttime", "rrt_status"]].dropna()),
+        ]
+
+    def assertParity(self, sources, **kwargs) -> None:
+        from pyaki.duckdb_preprocessing import DuckDBPreprocessing
+
+        expected = Analyser([Dataset(dtype, df) for dtype, df in self.sources()], **kwargs).process_stays()
+        datasets = DuckDBPreprocessing(**kwargs).process(sources)
+        results = Analyser(datasets, preprocessors=[]).process_stays()
+
+        # the preprocessed datasets do not repeat the stay identifier as value column
+        pd.testing.assert_frame_equal(results, expected.drop(columns=["stay_id"], errors="ignore"))
+
+    def test_dataframes(self):
+        self.assertParity(self.sources())
+
+    def test_preprocessors(self):
+        self.assertParity(
+            self.sources(),
+            preprocessors=[
+                TimeIndexCreator(),
+                UrineOutputPreProcessor(interpolate=False),
+                CreatininePreProcessor(ffill=False),
+                DemographicsPreProcessor(),
+                RRTPreProcessor(),
+            ],
+        )
+
+    def test_files(self):
+        with TemporaryDirectory() as tmpdir:
+            sources = []
+            for i, (dtype, df) in enumerate(self.sources()):
+                path = Path(tmpdir) / (f"{dtype}.parquet" if i % 2 else f"{dtype}.csv")
+                if i % 2:
+                    df.to_parquet(path, index=False)
+                else:
+                    df.to_csv(path, index=False)
+                sources.append((dtype, path))
+
+            self.assertParity(sources)
+
+    def test_unsupported(self):
+        from pyaki.duckdb_preprocessing import DuckDBPreprocessing
+
+        with self.assertRaisesRegex(ValueError, "does not support RRT intervals"):
+            DuckDBPreprocessing(preprocessors=[RRTPreProcessor(intervals=True)])
+
+    def test_demographics_order(self):
+        from pyaki.duckdb_preprocessing import DuckDBPreprocessing
+
+        # many rows per stay in a Parquet file, which is scanned and aggregated in parallel
+        rng = np.random.default_rng(0)
+        demographics_df = pd.DataFrame(
+            {"stay_id": rng.integers(0, 1000, 500_000), "weight": rng.uniform(40, 120, 500_000)}
+        )
+        expected = DemographicsPreProcessor().process([Dataset(DatasetType.DEMOGRAPHICS, demographics_df.copy())])
+
+        preprocessing = DuckDBPreprocessing(preprocessors=[DemographicsPreProcessor()])
+        preprocessing._config["threads"] = 8
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "demographics.parquet"
+            demographics_df.to_parquet(path, row_group_size=50_000)
+            for _ in range(3):
+                (_, df), *_ = preprocessing.process([(DatasetType.DEMOGRAPHICS, path)])
+                pd.testing.assert_frame_equal(df, expected[0].df)
+
+    def test_time_format(self):
+        from pyaki.duckdb_preprocessing import DuckDBPreprocessing
+
+        time_format = "%Y-%m-%d'T'%H:%M"
+        creatinine_df = pd.DataFrame(
+            {
+                "stay_id": [1, 1, 1],
+                "charttime": ["2023-01-01'T'00:00", "2023-01-01'T'01:30", "2023-01-01'T'04:00"],
+                "creat": [1.0, 1.5, 2.0],
+            }
+        )
+        preprocessors = [TimeIndexCreator(time_format=time_format), CreatininePreProcessor()]
+
+        (_, df), *_ = DuckDBPreprocessing(preprocessors=preprocessors).process(
+            [(DatasetType.CREATININE, creatinine_df)]
+        )
+        datasets = [Dataset(DatasetType.CREATININE, creatinine_df.copy())]
+        for preprocessor in preprocessors:
+            datasets = preprocessor.process(datasets)
+        (_, expected), *_ = datasets
+
+        pd.testing.assert_frame_equal(df, expected.drop(columns=["stay_id"]))
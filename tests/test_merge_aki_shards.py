@@ -0,0 +1,60 @@
+import csv
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import pandas as pd
+
+from pyaki.bin.merge_aki_shards import main
+from pyaki.bin.process_aki_stages import shard_name
+from pyaki.kdigo import Analyser
+from pyaki.utils import Dataset, DatasetType
+from pyaki.writer import ShardWriter
+from tests.set_up import setup_validation_data
+
+
+class TestMergeAkiShards(TestCase):
+    def setUp(self) -> None:
+        _, validation_data_unlabelled = setup_validation_data()
+        data = validation_data_unlabelled.reset_index()
+        stays = data["stay_id"].unique()
+
+        # the first partition has no creatinine, so its results lack the creatinine columns
+        partitions = [data[data["stay_id"].isin(stays[:5])], data[data["stay_id"].isin(stays[5:])]]
+        self.results = [
+            Analyser(
+                [
+                    Dataset(DatasetType.URINEOUTPUT, partitions[0][["stay_id", "charttime", "urineoutput"]].dropna()),
+                    Dataset(DatasetType.DEMOGRAPHICS, partitions[0][["stay_id", "weight"]].dropna()),
+                ]
+            ).process_stays(),
+            Analyser(
+                [
+                    Dataset(DatasetType.CREATININE, partitions[1][["stay_id", "charttime", "creat"]].dropna()),
+                    Dataset(DatasetType.URINEOUTPUT, partitions[1][["stay_id", "charttime", "urineoutput"]].dropna()),
+                    Dataset(DatasetType.DEMOGRAPHICS, partitions[1][["stay_id", "weight"]].dropna()),
+                ]
+            ).process_stays(),
+        ]
+
+    def test_different_columns(self):
+        self.assertNotEqual(list(self.results[0].columns), list(self.results[1].columns))
+
+        with TemporaryDirectory() as tmp_dir:
+            self.results[0].to_csv(Path(tmp_dir) / f"{shard_name(0, 2)}.csv")
+            with ShardWriter(Path(tmp_dir) / shard_name(1, 2)) as writer:
+                for _, df in self.results[1].groupby(level="stay_id"):
+                    writer.write(df)
+
+            main(tmp_dir, 2)
+            results = pd.read_csv(Path(tmp_dir) / "aki.csv", index_col=[0, 1], parse_dates=["charttime"])
+            with open(Path(tmp_dir) / "aki.csv", newline="") as f:
+                header = next(csv.reader(f))
+
+        # the stay identifier is repeated as value column
+        self.assertEqual(header.count("stay_id"), 2)
+        results.columns = header[2:]
+
+        expected = pd.concat(self.results)
+        self.assertSetEqual(set(results.columns), set(expected.columns))
+        pd.testing.assert_frame_equal(results[expected.columns], expected, check_dtype=False)
@@ -0,0 +1,73 @@
+from importlib.util import find_spec
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+
+import pandas as pd
+
+from pyaki.kdigo import Analyser
+from pyaki.partitioned import PartitionedAnalyser
+from pyaki.utils import Dataset, DatasetType
+from tests.set_up import setup_validation_data
+
+
+class TestPartitionedAnalyser(TestCase):
+    def setUp(self) -> None:
+        _, validation_data_unlabelled = setup_validation_data()
+        data = validation_data_unlabelled.reset_index()
+        self.datasets = [
+            Dataset(DatasetType.URINEOUTPUT, data[["stay_id", "charttime", "urineoutput"]].dropna()),
+            Dataset(DatasetType.CREATININE, data[["stay_id", "charttime", "creat"]].dropna()),
+            Dataset(DatasetType.DEMOGRAPHICS, data[["stay_id", "weight"]].dropna()),
+            Dataset(DatasetType.RRT, data[["stay_id", "charttime", "rrt_status"]].dropna()),
+        ]
+        self.columns = ["urineoutput_stage", "abs_creatinine_stage", "rel_creatinine_stage", "rrt_stage", "stage"]
+        self.expected = Analyser([Dataset(dtype, df.copy()) for dtype, df in self.datasets]).process_stays()
+
+        stays = data["stay_id"].unique()
+        self.partitions = [stays[:5], stays[5:10], stays[10:]]
+
+    def test_dataframes(self):
+        partitions = [[df[df["stay_id"].isin(stays)] for _, df in self.datasets] for stays in self.partitions]
+        analyser = PartitionedAnalyser([dtype for dtype, _ in self.datasets], partitions, columns=self.columns)
+
+        results = list(analyser.process_partitions())
+        self.assertEqual(len(results), 3)
+        pd.testing.assert_frame_equal(pd.concat(results), self.expected[self.columns])
+
+        with self.assertRaises(ValueError):
+            PartitionedAnalyser([DatasetType.URINEOUTPUT], partitions)
+
+    @skipUnless(find_spec("pyarrow"), "requires pyarrow")
+    def test_parquet(self):
+        with TemporaryDirectory() as tmp_dir:
+            for dtype, df in self.datasets:
+                (Path(tmp_dir) / dtype).mkdir()
+                for i, stays in enumerate(self.partitions):
+                    df[df["stay_id"].isin(stays)].to_parquet(Path(tmp_dir) / dtype / f"part-{i}.parquet")
+
+            results = PartitionedAnalyser.from_parquet(tmp_dir, columns=self.columns).process_stays()
+
+        pd.testing.assert_frame_equal(results, self.expected[self.columns])
+
+    @skipUnless(find_spec("dask"), "requires dask")
+    def test_dask(self):
+        import dask
+        import dask.dataframe as dd
+
+        divisions = [self.partitions[0][0], self.partitions[1][0], self.partitions[2][0], self.partitions[2][-1]]
+        analyser = PartitionedAnalyser.from_dask(
+            [
+                (
+                    dtype,
+                    dd.from_pandas(df.set_index("stay_id").sort_index(), npartitions=1)
+                    .repartition(divisions=divisions)
+                    .reset_index(),
+                )
+                for dtype, df in self.datasets
+            ],
+            columns=self.columns,
+        )
+
+        results = dask.compute(*analyser.to_delayed(), scheduler="synchronous")
+        pd.testing.assert_frame_equal(pd.concat(results), self.expected[self.columns])
@@ -0,0 +1,106 @@
+from importlib.util import find_spec
+from unittest import TestCase, skipUnless
+
+import pandas as pd
+
+from pyaki.kdigo import Analyser, Backend, Engine
+from pyaki.preprocessors import (
+    CreatininePreProcessor,
+    DemographicsPreProcessor,
+    RRTPreProcessor,
+    TimeIndexCreator,
+    UrineOutputPreProcessor,
+)
+from pyaki.probes import (
+    AbsoluteCreatinineProbe,
+    CreatinineBaselineMethod,
+    RelativeCreatinineProbe,
+    RRTProbe,
+    UrineOutputMethod,
+    UrineOutputProbe,
+)
+from pyaki.utils import Dataset, DatasetType
+from tests.set_up import setup_validation_data
+
+
+@skipUnless(find_spec("polars"), "requires polars")
+class TestPolarsEngine(TestCase):
+    def setUp(self) -> None:
+        _, validation_data_unlabelled = setup_validation_data()
+        self.data = validation_data_unlabelled.reset_index()
+
+    def datasets(self) -> list[Dataset]:
+        return [
+            Dataset(DatasetType.URINEOUTPUT, self.data[["stay_id", "charttime", "urineoutput"]].dropna()),
+            Dataset(DatasetType.CREATININE, self.data[["stay_id", "charttime", "creat"]].dropna()),
+            Dataset(DatasetType.DEMOGRAPHICS, self.data[["stay_id", "weight"]].dropna()),
+            Dataset(DatasetType.RRT, self.data[["stay_id", "charttime", "rrt_status"]].dropna()),
+        ]
+
+    def assertParity(self, **kwargs) -> None:
+        expected = Analyser(self.datasets(), **kwargs).process_stays()
+        results = Analyser(self.datasets(), engine=Engine.POLARS, **kwargs).process_stays()
+
+        # the polars engine does not repeat the stay identifier as value column
+        pd.testing.assert_frame_equal(results, expected.drop(columns=["stay_id"], errors="ignore"))
+
+    def test_default(self):
+        self.assertParity()
+
+    def test_probes(self):
+        for urineoutput_method in UrineOutputMethod:
+            for creatinine_method in [
+                CreatinineBaselineMethod.ROLLING_MIN,
+                CreatinineBaselineMethod.ROLLING_MEAN,
+                CreatinineBaselineMethod.FIXED_MEAN,
+                CreatinineBaselineMethod.OVERALL_FIRST,
+                CreatinineBaselineMethod.OVERALL_MIN,
+                CreatinineBaselineMethod.OVERALL_MEAN,
+            ]:
+                with self.subTest(urineoutput_method=urineoutput_method, creatinine_method=creatinine_method):
+                    self.assertParity(
+                        probes=[
+                            UrineOutputProbe(method=urineoutput_method),
+                            AbsoluteCreatinineProbe(method=creatinine_method),
+                            RelativeCreatinineProbe(method=creatinine_method),
+                            RRTProbe(),
+                        ]
+                    )
+
+    def test_preprocessors(self):
+        self.assertParity(
+            preprocessors=[
+                TimeIndexCreator(),
+                UrineOutputPreProcessor(interpolate=False),
+                CreatininePreProcessor(ffill=False),
+                DemographicsPreProcessor(),
+                RRTPreProcessor(),
+            ]
+        )
+
+    def test_query(self):
+        self.assertParity(columns=["urineoutput_stage"])
+        self.assertParity(columns=["stage", "creat"])
+
+    def test_backends(self):
+        analyser = Analyser(self.datasets(), engine=Engine.POLARS)
+        expected = analyser.process_stays()
+
+        for backend in [Backend.THREADS, Backend.PROCESSES]:
+            pd.testing.assert_frame_equal(analyser.process_stays(backend=backend, workers=2, chunk_size=4), expected)
+
+        stay_id = expected.index[0][0]
+        pd.testing.assert_frame_equal(analyser.process_stay(stay_id), expected.loc[[stay_id]])
+        pd.testing.assert_frame_equal(analyser.summarize(), Analyser(self.datasets()).summarize())
+
+    def test_unsupported(self):
+        with self.assertRaisesRegex(ValueError, "does not support RRT intervals"):
+            Analyser(self.datasets(), preprocessors=[RRTPreProcessor(intervals=True)], engine=Engine.POLARS)
+        with self.assertRaisesRegex(ValueError, "does not support the creatinine baseline method"):
+            Analyser(
+                self.datasets(),
+                probes=[AbsoluteCreatinineProbe(method=CreatinineBaselineMethod.ROLLING_FIRST)],
+                engine=Engine.POLARS,
+            )
+        with self.assertRaisesRegex(ValueError, "requires the pandas engine"):
+            Analyser(self.datasets(), engine=Engine.POLARS).sweep({})
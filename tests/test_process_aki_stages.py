@@ -0,0 +1,55 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from pyaki.bin.process_aki_stages import in_shard, main, shard_name
+from tests.set_up import setup_validation_data
+
+
+class TestProcessAkiStages(TestCase):
+    def setUp(self) -> None:
+        _, validation_data_unlabelled = setup_validation_data()
+        self.data = validation_data_unlabelled.reset_index()
+
+    def test_in_shard_float_stays(self):
+        stays = pd.Series([30849778, 123, 2**40])
+        floats = pd.Series([30849778, 123, 2**40, np.nan])
+
+        for shard_index in range(3):
+            np.testing.assert_array_equal(in_shard(floats, shard_index, 3), [*in_shard(stays, shard_index, 3), False])
+
+    def test_shards_mixed_files(self):
+        with TemporaryDirectory() as tmp_dir:
+            urineoutput = self.data[["stay_id", "charttime", "urineoutput"]].dropna()
+            # a row without stay identifier turns the identifiers of the urine output file into floats
+            pd.concat([urineoutput, pd.DataFrame({"charttime": [urineoutput["charttime"].iloc[0]]})]).to_csv(
+                Path(tmp_dir) / "urineoutput.csv", index=False
+            )
+            self.data[["stay_id", "charttime", "creat"]].dropna().to_csv(Path(tmp_dir) / "creatinine.csv", index=False)
+            self.data[["stay_id", "weight"]].dropna().drop_duplicates("stay_id").to_csv(
+                Path(tmp_dir) / "demographics.csv", index=False
+            )
+
+            main(tmp_dir)
+            expected = pd.read_csv(Path(tmp_dir) / "aki.csv", index_col=[0, 1], parse_dates=["charttime"])
+
+            # chunks smaller than the files are filtered separately
+            with patch("pyaki.bin.process_aki_stages.READ_CHUNK_SIZE", 100):
+                for shard_index in range(2):
+                    main(tmp_dir, shard_index=shard_index, num_shards=2)
+            shards = [
+                pd.read_csv(
+                    Path(tmp_dir) / f"{shard_name(shard_index, 2)}.csv", index_col=[0, 1], parse_dates=["charttime"]
+                )
+                for shard_index in range(2)
+            ]
+
+        stays = [set(shard.index.unique("stay_id")) for shard in shards]
+        self.assertTrue(all(stays))
+        self.assertFalse(stays[0] & stays[1])
+        results = pd.concat(shards).sort_index()
+        pd.testing.assert_frame_equal(results[expected.columns], expected.sort_index(), check_dtype=False)
@@ -0,0 +1,84 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from pyaki.kdigo import Analyser
+from pyaki.store import CohortStore
+from pyaki.utils import Dataset, DatasetType
+from tests.set_up import setup_validation_data
+
+
+class TestCohortStore(TestCase):
+    def setUp(self) -> None:
+        _, self.validation_data_unlabelled = setup_validation_data()
+        self.tmp_dir = TemporaryDirectory()
+        self.store = CohortStore(self.tmp_dir.name)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        demographics_df = pd.DataFrame(
+            data={"weight": [80.0, 65.5], "gender": ["M", "F"]},
+            index=pd.Index([1, 2], name="stay_id"),
+        )
+        rrt_df = pd.DataFrame(
+            data={"rrt_status": [0, 1, 1]},
+            index=pd.MultiIndex.from_arrays(
+                [[1, 1, 2], pd.period_range(start="2023-01-01 00:00:00", periods=3, freq="h")],
+                names=("stay_id", "charttime"),
+            ),
+        )
+
+        self.store.write([Dataset(DatasetType.DEMOGRAPHICS, demographics_df), Dataset(DatasetType.RRT, rrt_df)])
+        datasets = self.store.read()
+
+        self.assertEqual([dtype for dtype, _ in datasets], [DatasetType.DEMOGRAPHICS, DatasetType.RRT])
+        pd.testing.assert_frame_equal(datasets[0].df.copy(), demographics_df)
+        pd.testing.assert_frame_equal(datasets[1].df.copy(), rrt_df)
+        self.assertIsInstance(datasets[1].df["rrt_status"].values, np.memmap)
+
+    def test_offsets(self):
+        df = self.validation_data_unlabelled[["creat"]]
+
+        self.store.write([Dataset(DatasetType.CREATININE, df)])
+        offsets = self.store.offsets(DatasetType.CREATININE)
+
+        for stay_id, (start, stop) in offsets.iterrows():
+            pd.testing.assert_frame_equal(df.iloc[start:stop], df.loc[[stay_id]])
+
+    def test_analyser(self):
+        datasets = [
+            Dataset(DatasetType.URINEOUTPUT, self.validation_data_unlabelled[["urineoutput"]]),
+            Dataset(DatasetType.CREATININE, self.validation_data_unlabelled[["creat"]]),
+            Dataset(DatasetType.DEMOGRAPHICS, self.validation_data_unlabelled[["weight"]].groupby("stay_id").first()),
+            Dataset(DatasetType.RRT, self.validation_data_unlabelled[["rrt_status"]]),
+        ]
+        analyser = Analyser(datasets, preprocessors=[])
+
+        analyser.to_store(self.tmp_dir.name)
+
+        stored = Analyser.from_store(self.tmp_dir.name)
+
+        # stays of the time series are sliced by their offsets
+        self.assertSetEqual(set(stored._offsets), {DatasetType.URINEOUTPUT, DatasetType.CREATININE, DatasetType.RRT})
+        pd.testing.assert_frame_equal(stored.process_stays(), analyser.process_stays())
+
+    def test_analyser_string_stays(self):
+        df = self.validation_data_unlabelled.rename(index=lambda stay_id: f"s{stay_id}", level="stay_id")
+        datasets = [
+            Dataset(DatasetType.URINEOUTPUT, df[["urineoutput"]]),
+            Dataset(DatasetType.DEMOGRAPHICS, df[["weight"]].groupby("stay_id", sort=False).first()),
+        ]
+        analyser = Analyser(datasets, preprocessors=[])
+
+        analyser.to_store(self.tmp_dir.name)
+        stored = Analyser.from_store(self.tmp_dir.name)
+
+        self.assertListEqual(
+            self.store.offsets(DatasetType.URINEOUTPUT).index.tolist(),
+            df.index.get_level_values("stay_id").unique().tolist(),
+        )
+        pd.testing.assert_frame_equal(stored.process_stays(), analyser.process_stays())
@@ -0,0 +1,122 @@
+import json
+from importlib.util import find_spec
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+
+import pandas as pd
+
+from pyaki.kdigo import Analyser
+from pyaki.utils import Dataset, DatasetType
+from pyaki.writer import OutputFormat, ShardWriter
+from tests.set_up import setup_validation_data
+
+
+class TestShardWriter(TestCase):
+    def setUp(self) -> None:
+        _, validation_data_unlabelled = setup_validation_data()
+        data = validation_data_unlabelled.reset_index()
+        self.analyser = Analyser(
+            [
+                Dataset(DatasetType.URINEOUTPUT, data[["stay_id", "charttime", "urineoutput"]].dropna()),
+                Dataset(DatasetType.DEMOGRAPHICS, data[["stay_id", "weight"]].dropna()),
+            ],
+            columns=["urineoutput", "urineoutput_stage", "stage"],
+        )
+        self.tmp_dir = TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "aki"
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_csv(self):
+        with ShardWriter(self.path) as writer:
+            for df in self.analyser.process_chunks(chunk_size=4):
+                writer.write(df)
+
+        with open(self.path / ShardWriter.MANIFEST_FILE) as f:
+            manifest = json.load(f)
+
+        expected = self.analyser.process_stays()
+        stays = expected.index.get_level_values("stay_id").unique()
+
+        self.assertEqual(manifest["format"], "csv")
+        self.assertEqual(len(manifest["shards"]), 4)
+        self.assertEqual(manifest["shards"][0]["first_stay"], stays[0])
+        self.assertEqual(manifest["shards"][-1]["last_stay"], stays[-1])
+        self.assertEqual(sum(shard["rows"] for shard in manifest["shards"]), len(expected))
+
+        results = pd.concat(
+            pd.read_csv(self.path / shard["file"], index_col=[0, 1], parse_dates=["charttime"])
+            for shard in manifest["shards"]
+        )
+        pd.testing.assert_frame_equal(results, expected, check_names=False)
+
+    @skipUnless(find_spec("pyarrow"), "requires pyarrow")
+    def test_parquet(self):
+        with ShardWriter(self.path, OutputFormat.PARQUET) as writer:
+            for df in self.analyser.process_chunks(chunk_size=8):
+                writer.write(df)
+
+        results = pd.concat(pd.read_parquet(self.path / shard["file"]) for shard in writer.shards)
+        pd.testing.assert_frame_equal(results, self.analyser.process_stays())
+
+    def test_error(self):
+        writer = ShardWriter(self.path)
+        with self.assertRaises(RuntimeError):
+            writer.write(pd.DataFrame())
+
+        with self.assertRaises(RuntimeError):
+            with ShardWriter(self.path) as writer:
+                (self.path / "part-00000.csv").mkdir()  # shard cannot be replaced
+                writer.write(next(self.analyser.process_chunks(chunk_size=4)))
+
+    def test_resume(self):
+        chunks = list(self.analyser.process_chunks(chunk_size=4))
+        with ShardWriter(self.path, config_hash=self.analyser.config_hash) as writer:
+            for df in chunks[:2]:
+                writer.write(df)
+
+        with open(self.path / ShardWriter.LEDGER_FILE, "a") as f:
+            f.write('{"file": "part-00002.csv", "stays": [')  # interrupted while writing
+
+        with ShardWriter(self.path, config_hash=self.analyser.config_hash, resume=True) as writer:
+            completed = writer.completed_stays
+            self.assertSetEqual(
+                completed, set(pd.concat(chunks[:2]).index.get_level_values("stay_id").unique().tolist())
+            )
+            remaining = list(self.analyser.process_chunks(chunk_size=4, skip_stays=completed))
+            for df in remaining:
+                writer.write(df)
+
+        self.assertEqual(len(remaining), 2)
+        self.assertListEqual([shard["file"] for shard in writer.shards], [f"part-0000{i}.csv" for i in range(4)])
+        results = pd.concat(
+            pd.read_csv(self.path / shard["file"], index_col=[0, 1], parse_dates=["charttime"])
+            for shard in writer.shards
+        )
+        pd.testing.assert_frame_equal(results, self.analyser.process_stays(), check_names=False)
+
+        # another configuration must not resume the shards
+        with self.assertRaises(ValueError):
+            ShardWriter(self.path, config_hash="other", resume=True).open()
+
+    def test_resume_twice(self):
+        chunks = list(self.analyser.process_chunks(chunk_size=4))
+        with ShardWriter(self.path, config_hash=self.analyser.config_hash) as writer:
+            writer.write(chunks[0])
+
+        with open(self.path / ShardWriter.LEDGER_FILE, "a") as f:
+            f.write('{"file": "part-00001.csv", "stays": [')  # interrupted while writing
+
+        for chunk in chunks[1:3]:
+            with ShardWriter(self.path, config_hash=self.analyser.config_hash, resume=True) as writer:
+                writer.write(chunk)
+
+        with ShardWriter(self.path, config_hash=self.analyser.config_hash, resume=True) as writer:
+            completed = writer.completed_stays
+
+        self.assertSetEqual(completed, set(pd.concat(chunks[:3]).index.get_level_values("stay_id").unique().tolist()))
+        self.assertListEqual([shard["file"] for shard in writer.shards], [f"part-0000{i}.csv" for i in range(3)])
+        lines = (self.path / ShardWriter.LEDGER_FILE).read_text().splitlines()
+        self.assertListEqual([json.loads(line)["file"] for line in lines], [f"part-0000{i}.csv" for i in range(3)])